@@ -0,0 +1,250 @@
+"""Headless alerting: evaluate every province at once and write a compact alert file.
+
+Meant to run from cron (inside the same Docker image) after the weekly
+update; the dashboard only reads the file. Exceedance alerts give, for every
+province and horizon, the probability that cases exceed a multiple of the
+endemic channel median, read from the forecast sample paths.
+
+Usage:
+    python alerts.py run                          # writes DENGUE_ALERTS_PATH
+    python alerts.py run --output /tmp/alerts.parquet
+    python alerts.py show
+    python alerts.py exceedance --multiplier 2    # P(cases > 2x seasonal median) per horizon
+"""
+
+import argparse
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ALERTS_PATH = os.environ.get('DENGUE_ALERTS_PATH', 'data/alerts.parquet')
+
+# Alert levels in increasing severity; files store the index into this tuple
+ALERT_LEVELS = ('success', 'info', 'warning')
+
+ALERT_TEXT = {
+    'success': ("Stable", "Cases within expected range"),
+    'info': ("Increasing Trend", "Forecasted rise in cases"),
+    'warning': ("Elevated Risk", "Cases above seasonal baseline")
+}
+
+# Cases (or forecast) above this multiple of the endemic channel median raise a warning
+BASELINE_MULTIPLIER = 1.5
+
+# Forecast above this multiple of the current week flags an increasing trend
+RISE_MULTIPLIER = 1.2
+
+# A raised level is kept until its ratio drops below (1 - HYSTERESIS) x its entry threshold
+HYSTERESIS = 0.1
+
+# Exceedance probabilities at or above these raise a warning / info level
+WARNING_PROBABILITY = 0.5
+WATCH_PROBABILITY = 0.2
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+class AlertRules:
+    """Array alert classifier with configurable thresholds and hysteresis.
+
+    Inputs broadcast against each other, so one call classifies any number
+    of provinces, horizons or backtest origins. With ``previous`` levels a
+    raised level only drops once its ratio falls below (1 - hysteresis) x
+    its entry threshold, which stops alerts flapping around a threshold.
+    """
+
+    def __init__(self, baseline_multiplier=BASELINE_MULTIPLIER, rise_multiplier=RISE_MULTIPLIER, hysteresis=HYSTERESIS):
+        self.baseline_multiplier = baseline_multiplier
+        self.rise_multiplier = rise_multiplier
+        self.hysteresis = hysteresis
+
+    def classify(self, current, forecast, baseline, previous=None):
+        """Alert level codes (int8 indices into ALERT_LEVELS)"""
+        current, forecast, baseline = (np.asarray(a, dtype=np.float64) for a in (current, forecast, baseline))
+        peak = np.maximum(current, forecast)
+        warning_at = baseline * self.baseline_multiplier
+        rising_at = current * self.rise_multiplier
+        if previous is not None:
+            # Held levels are checked against their lowered exit thresholds
+            keep = 1 - self.hysteresis
+            warning_at = np.where(previous == 2, warning_at * keep, warning_at)
+            rising_at = np.where(previous >= 1, rising_at * keep, rising_at)
+        return np.where(peak > warning_at, 2, np.where(forecast > rising_at, 1, 0)).astype(np.int8)
+
+    def classify_series(self, current, forecast, baseline, axis=-1, initial=None):
+        """Levels along a time ``axis`` with hysteresis carried from step to step.
+
+        Steps run in order, but each one is a single vectorized call over
+        every other dimension (provinces, horizons, ...).
+        """
+        current, forecast, baseline = (np.moveaxis(a, axis, 0) for a in np.broadcast_arrays(current, forecast, baseline))
+        levels = np.empty(current.shape, dtype=np.int8)
+        previous = initial
+        for t in range(len(current)):
+            previous = levels[t] = self.classify(current[t], forecast[t], baseline[t], previous)
+        return np.moveaxis(levels, 0, axis)
+
+
+DEFAULT_RULES = AlertRules()
+
+
+def alert_categories(levels):
+    """Level codes as an ordered pandas Categorical of ALERT_LEVELS"""
+    return pd.Categorical.from_codes(np.asarray(levels), categories=list(ALERT_LEVELS), ordered=True)
+
+
+def evaluate_alerts(features, registry, channel, provinces=None, rules=DEFAULT_RULES, previous=None):
+    """Alert table for every province: latest week, its endemic channel median and next-week forecast"""
+    provinces = features.provinces if provinces is None else list(provinces)
+    slots = np.array([features.index[p] for p in provinces])
+    current = features.cases[slots, features.lengths[slots] - 1]
+    weeks = features.last_weeks(provinces)
+    baseline = channel.lookup_many(provinces, pd.DatetimeIndex(weeks).isocalendar().week.to_numpy())
+    forecast = registry.batch(provinces, features).forecast(features, 1)['predicted_mean'].to_numpy()
+    return pd.DataFrame({
+        'province': provinces,
+        'epi_week': weeks,
+        'current_cases': current.astype(np.int32),
+        'baseline': baseline.astype(np.float32),
+        'forecast_mean': forecast.astype(np.float32),
+        'level': rules.classify(current, forecast, baseline, previous)
+    })
+
+
+def exceedance_levels(probabilities, warning=WARNING_PROBABILITY, watch=WATCH_PROBABILITY):
+    """Alert level codes of exceedance probabilities"""
+    return np.where(probabilities >= warning, 2, np.where(probabilities >= watch, 1, 0)).astype(np.int8)
+
+
+class ExceedanceAlerts:
+    """P(cases > endemic median x multiplier) of every province and horizon from forecast sample paths.
+
+    The channel medians of the paths' target weeks are looked up once, so a
+    new multiplier is one comparison over the stored paths: no model run and
+    no new simulation.
+    """
+
+    def __init__(self, paths, channel):
+        self.paths = paths
+        self.provinces = paths.provinces
+        n_prov, n_horizons = paths.weeks.shape
+        week_nums = pd.DatetimeIndex(paths.weeks.ravel()).isocalendar().week.to_numpy()
+        self.baseline = channel.lookup_many(np.repeat(self.provinces, n_horizons), week_nums).reshape(n_prov, n_horizons)
+
+    def probabilities(self, multiplier=BASELINE_MULTIPLIER):
+        """(provinces, horizons) probability that cases exceed the threshold"""
+        return self.paths.exceedance(self.baseline * multiplier)
+
+    def levels(self, multiplier=BASELINE_MULTIPLIER, warning=WARNING_PROBABILITY, watch=WATCH_PROBABILITY):
+        """Alert level codes (int8 indices into ALERT_LEVELS) per province and horizon"""
+        return exceedance_levels(self.probabilities(multiplier), warning, watch)
+
+    def table(self, multiplier=BASELINE_MULTIPLIER):
+        """Long table (province x horizon): target week, threshold, exceedance probability and level"""
+        p = self.probabilities(multiplier)
+        n_horizons = p.shape[1]
+        return pd.DataFrame({
+            'province': np.repeat(self.provinces, n_horizons),
+            'horizon': np.tile(np.arange(1, n_horizons + 1), len(self.provinces)),
+            'epi_week': self.paths.weeks.ravel(),
+            'threshold': (self.baseline * multiplier).astype(np.float32).ravel(),
+            'probability': p.astype(np.float32).ravel(),
+            'level': exceedance_levels(p).ravel(),
+            'origins': np.repeat(self.paths.origins, n_horizons)
+        })
+
+# ============================================================================
+# ALERT FILE
+# ============================================================================
+
+def write_alerts(alerts, path, dataset_version):
+    """Write the alert table as one small Parquet file, atomically"""
+    table = pa.Table.from_pandas(alerts, preserve_index=False)
+    table = table.replace_schema_metadata({
+        'dataset_version': str(dataset_version),
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def read_alerts(path):
+    """(alerts indexed by province, metadata dict) from an alert file"""
+    table = pq.read_table(path)
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items() if not k.startswith(b'pandas')}
+    return table.to_pandas().set_index('province'), metadata
+
+
+def describe(level):
+    """(level name, title, message) of a level code"""
+    name = ALERT_LEVELS[int(level)]
+    return (name,) + ALERT_TEXT[name]
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+    from endemic import build_channel, reference_key
+    from features import FeatureStore
+    from forecasting import HORIZONS, ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Batch alerting for every province')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='evaluate all provinces and write the alert file')
+    run.add_argument('--output', default=ALERTS_PATH)
+    run.add_argument('--baseline-multiplier', type=float, default=BASELINE_MULTIPLIER)
+    run.add_argument('--rise-multiplier', type=float, default=RISE_MULTIPLIER)
+    run.add_argument('--hysteresis', type=float, default=HYSTERESIS,
+                     help='levels from the previous alert file are held until this far below their threshold')
+    show = sub.add_parser('show', help='print the current alert file')
+    show.add_argument('--path', default=ALERTS_PATH)
+    exceedance = sub.add_parser('exceedance', help='print P(cases > multiplier x seasonal median) per province and horizon')
+    exceedance.add_argument('--multiplier', type=float, default=BASELINE_MULTIPLIER)
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        alerts, metadata = read_alerts(args.path)
+        alerts['level'] = [ALERT_LEVELS[code] for code in alerts['level']]
+        print(f"dataset {metadata.get('dataset_version')}, generated {metadata.get('generated_at')}")
+        print(alerts.to_string())
+        return
+
+    source = source_from_env()
+    features = FeatureStore().get(source)
+    if args.command == 'exceedance':
+        paths = ModelRegistry().batch(features.provinces, features).sample_paths(features, len(HORIZONS))
+        table = ExceedanceAlerts(paths, build_channel(source, reference_key(features))).table(args.multiplier)
+        pivot = table.pivot(index='province', columns='horizon', values='probability').round(2)
+        pivot['origins'] = table.groupby('province')['origins'].first()
+        print(pivot.to_string())
+        return
+
+    rules = AlertRules(args.baseline_multiplier, args.rise_multiplier, args.hysteresis)
+
+    # Last run's levels feed the hysteresis
+    previous = None
+    if os.path.exists(args.output):
+        last, _ = read_alerts(args.output)
+        previous = last['level'].reindex(features.provinces).fillna(0).to_numpy(dtype=np.int8)
+    alerts = evaluate_alerts(features, ModelRegistry(), build_channel(source, reference_key(features)), rules=rules, previous=previous)
+    write_alerts(alerts, args.output, source.version)
+    counts = np.bincount(alerts['level'], minlength=len(ALERT_LEVELS))
+    summary = ', '.join(f"{n} {ALERT_TEXT[name][0].lower()}" for name, n in zip(ALERT_LEVELS, counts))
+    print(f"{len(alerts)} provinces as of {alerts['epi_week'].max():%Y-%m-%d}: {summary} -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
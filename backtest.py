@@ -0,0 +1,214 @@
+"""Blocked forward-chaining backtests for every province and horizon.
+
+The second half of each province's history is cut into contiguous test
+blocks. Fold k trains on every target week before block k (exactly as the
+deployed boosters are trained, including the hold-out error scale) and
+forecasts the weeks of block k. Folds run on a process pool; each fold's
+out-of-sample forecasts are cached on disk under a key of (dataset version,
+model config, fold layout), so reruns and the dashboard only read files.
+
+Usage:
+    python backtest.py run                      # every province of the configured source
+    python backtest.py run --workers 4 --folds 5
+    python backtest.py show Bangkok
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datasource import fingerprint
+from features import FeatureStore, supervised_pairs
+from forecasting import HORIZONS, MODEL_CONFIG, config_key, fit_horizon, province_slug
+from scoring import coverage, crps_gaussian, interval_score, pit_gaussian, pit_histogram
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+N_FOLDS = 5
+
+# Share of each province's history that only ever serves as training data
+MIN_TRAIN_FRACTION = 0.5
+
+CACHE_DIR = os.environ.get('DENGUE_CACHE_DIR', '.cache')
+
+# ============================================================================
+# FOLDS
+# ============================================================================
+
+def fold_blocks(n_weeks, n_folds=N_FOLDS, min_train_fraction=MIN_TRAIN_FRACTION):
+    """(origin, stop) week positions of each contiguous test block"""
+    edges = np.linspace(int(n_weeks * min_train_fraction), n_weeks, n_folds + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def run_fold(values, cases, origin, stop, horizons=HORIZONS, config=MODEL_CONFIG):
+    """Out-of-sample forecasts of one fold: train on target weeks < origin, test on [origin, stop)"""
+    columns = {'horizon': [], 'y': [], 'mu': [], 'sigma': []}
+    for h in horizons:
+        X_test, y_test = supervised_pairs(values, cases, h, end=stop, start=origin)
+        if not len(y_test):
+            continue
+        booster, sigma, _, _ = fit_horizon(*supervised_pairs(values, cases, h, end=origin), config)
+        columns['horizon'].append(np.full(len(y_test), h, dtype=np.int8))
+        columns['y'].append(y_test)
+        columns['mu'].append(np.maximum(0.0, booster.inplace_predict(X_test)).astype(np.float32))
+        columns['sigma'].append(np.full(len(y_test), sigma, dtype=np.float32))
+    return {k: np.concatenate(v) for k, v in columns.items()}
+
+
+def forecast_metrics(y, mu, sigma):
+    """Point and probabilistic skill of out-of-sample forecasts"""
+    y, mu = y.astype(np.float64), mu.astype(np.float64)
+    err = y - mu
+    positive = y > 0
+    lower, upper = np.maximum(0, mu - 1.96 * sigma), mu + 1.96 * sigma
+    return {
+        'MAE': round(float(np.mean(np.abs(err))), 1),
+        'RMSE': round(float(np.sqrt(np.mean(err ** 2))), 1),
+        'R2': float(1 - np.sum(err ** 2) / np.sum((y - y.mean()) ** 2)),
+        'MedAE': round(float(np.median(np.abs(err))), 1),
+        'MAPE': float(np.mean(np.abs(err[positive]) / y[positive]) * 100),
+        'Correlation': float(np.corrcoef(y, mu)[0, 1]),
+        'CRPS': round(float(np.mean(crps_gaussian(mu, sigma, y))), 2),
+        'Coverage95': float(coverage(lower, upper, y)),
+        'IntervalScore95': round(float(np.mean(interval_score(lower, upper, y))), 1),
+        'PIT': pit_histogram(pit_gaussian(mu, sigma, y)).tolist(),
+        'n': int(len(y))
+    }
+
+# ============================================================================
+# RUNNER AND CACHE
+# ============================================================================
+
+def _fold_task(args):
+    path, values, cases, origin, stop, horizons, config = args
+    result = run_fold(values, cases, origin, stop, horizons, config)
+    tmp = f"{path}.tmp-{os.getpid()}.npz"
+    np.savez(tmp, **result)
+    os.replace(tmp, path)
+    return path
+
+
+class Backtester:
+    """Runs and caches backtests; results live under CACHE_DIR/backtest/<key>/<province>/"""
+
+    def __init__(self, cache_dir=CACHE_DIR, config=MODEL_CONFIG, n_folds=N_FOLDS, horizons=HORIZONS):
+        self.cache_dir = cache_dir
+        self.config = config
+        self.n_folds = n_folds
+        self.horizons = list(horizons)
+
+    def root(self, version):
+        key = fingerprint(version, config_key(self.config), self.n_folds, MIN_TRAIN_FRACTION, self.horizons)
+        return os.path.join(self.cache_dir, 'backtest', key)
+
+    def _fold_path(self, version, province, fold):
+        return os.path.join(self.root(version), province_slug(province), f'fold{fold}.npz')
+
+    def _metrics_path(self, version, province):
+        return os.path.join(self.root(version), province_slug(province), 'metrics.json')
+
+    def run(self, features, provinces=None, workers=None):
+        """Compute the folds missing from the cache, then write each province's metrics.
+
+        Backtests describe the bulk-built dataset (``features.base_version``);
+        weeks appended since by the weekly ingest join at the next full build.
+        """
+        provinces = features.provinces if provinces is None else provinces
+        workers = workers or os.cpu_count() or 1
+        version = features.base_version
+        tasks = []
+        for province in provinces:
+            values, cases = features.series(province, base=True)
+            os.makedirs(os.path.dirname(self._fold_path(version, province, 0)), exist_ok=True)
+            for fold, (origin, stop) in enumerate(fold_blocks(len(cases), self.n_folds)):
+                path = self._fold_path(version, province, fold)
+                if not os.path.exists(path):
+                    tasks.append((path, values, cases, origin, stop, self.horizons, self.config))
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_fold_task, tasks))
+        else:
+            for task in tasks:
+                _fold_task(task)
+
+        for province in provinces:
+            self._write_metrics(version, province)
+        return len(tasks)
+
+    def results(self, version, province):
+        """Out-of-sample forecasts of every fold as one frame (fold, horizon, y, mu, sigma)"""
+        frames = []
+        for fold in range(self.n_folds):
+            with np.load(self._fold_path(version, province, fold)) as data:
+                frame = pd.DataFrame({k: data[k] for k in data.files})
+            frame.insert(0, 'fold', fold)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def _write_metrics(self, version, province):
+        results = self.results(version, province)
+        metrics = {
+            'province': province,
+            'folds': self.n_folds,
+            'horizons': {
+                str(h): forecast_metrics(group['y'].to_numpy(), group['mu'].to_numpy(), group['sigma'].to_numpy())
+                for h, group in results.groupby('horizon')
+            }
+        }
+        path = self._metrics_path(version, province)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(metrics, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        return metrics
+
+    def metrics(self, version, province):
+        """Precomputed metrics of one province keyed by horizon, or None if not backtested yet"""
+        try:
+            with open(self._metrics_path(version, province)) as f:
+                metrics = json.load(f)
+        except FileNotFoundError:
+            return None
+        return {int(h): m for h, m in metrics['horizons'].items()}
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+
+    parser = argparse.ArgumentParser(description='Blocked forward-chaining backtests')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='backtest every province of the configured data source')
+    run.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    run.add_argument('--folds', type=int, default=N_FOLDS)
+    run.add_argument('--cache-dir', default=CACHE_DIR)
+    show = sub.add_parser('show', help='print the cached metrics of one province')
+    show.add_argument('province')
+    show.add_argument('--folds', type=int, default=N_FOLDS)
+    show.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    source = source_from_env()
+    backtester = Backtester(args.cache_dir, n_folds=args.folds)
+    if args.command == 'run':
+        features = FeatureStore().get(source)
+        computed = backtester.run(features, workers=args.workers)
+        print(f"{computed} folds computed, results in {backtester.root(source.version)}")
+    else:
+        metrics = backtester.metrics(source.version, args.province)
+        if metrics is None:
+            raise SystemExit(f"no backtest for {args.province}; run `python backtest.py run` first")
+        print(pd.DataFrame(metrics).T.to_string())
+
+
+if __name__ == '__main__':
+    main()
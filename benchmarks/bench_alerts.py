@@ -0,0 +1,75 @@
+"""Alert evaluation throughput at ~1M evaluations: scalar branching vs the array classifier.
+
+The workload is a district-level backtest: units x horizons x origins
+(928 x 8 x 135 = 1,002,240 evaluations). The scalar baseline is the
+original create_risk_alert called once per evaluation.
+
+Usage:
+    python benchmarks/bench_alerts.py --shape 928 8 135
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import AlertRules
+
+
+def scalar_risk_alert(current_cases, forecast_mean, historical_avg):
+    """create_risk_alert as it was before the array classifier"""
+    if current_cases > historical_avg * 1.5 or forecast_mean > historical_avg * 1.5:
+        return "warning", "Elevated Risk", "Cases above seasonal average"
+    elif forecast_mean > current_cases * 1.2:
+        return "info", "Increasing Trend", "Forecasted rise in cases"
+    else:
+        return "success", "Stable", "Cases within expected range"
+
+
+def scalar_loop(current, forecast, baseline):
+    codes = {'success': 0, 'info': 1, 'warning': 2}
+    return np.array([
+        codes[scalar_risk_alert(c, f, b)[0]]
+        for c, f, b in zip(current.ravel().tolist(), forecast.ravel().tolist(), baseline.ravel().tolist())
+    ], dtype=np.int8).reshape(current.shape)
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shape', type=int, nargs=3, default=[928, 8, 135], metavar=('UNITS', 'HORIZONS', 'ORIGINS'))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shape = tuple(args.shape)
+    baseline = rng.gamma(4.0, 12.0, size=shape[:1] + (1, 1))
+    current = rng.poisson(np.broadcast_to(baseline, shape) * rng.lognormal(0, 0.4, size=shape)).astype(np.float64)
+    forecast = current * rng.lognormal(0.05, 0.2, size=shape)
+    baseline = np.broadcast_to(baseline, shape)
+    rules = AlertRules(hysteresis=0.1)
+    n = current.size
+
+    scalar_s, scalar = timed(scalar_loop, current, forecast, baseline)
+    array_s, levels = timed(AlertRules(hysteresis=0).classify, current, forecast, baseline)
+    series_s, held = timed(rules.classify_series, current, forecast, baseline, axis=-1)
+    assert np.array_equal(scalar, levels)
+
+    flips = lambda x: int(np.count_nonzero(np.diff(x, axis=-1)))
+    print(f"{n:,} evaluations ({' x '.join(map(str, shape))})")
+    print(f"{'method':<34} | {'ms':>8} | {'evals/s':>12} | {'level changes':>13}")
+    print(f"{'scalar create_risk_alert':<34} | {scalar_s * 1000:>8.1f} | {n / scalar_s:>12,.0f} | {flips(scalar):>13,}")
+    print(f"{'AlertRules.classify':<34} | {array_s * 1000:>8.1f} | {n / array_s:>12,.0f} | {flips(levels):>13,}")
+    print(f"{'classify_series (hysteresis 0.1)':<34} | {series_s * 1000:>8.1f} | {n / series_s:>12,.0f} | {flips(held):>13,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Forecast throughput vs unit count: per-province booster calls vs one batched forest evaluation.
+
+Boosters are trained for a few provinces and tiled across the units (a
+district-level deployment would have one forest per unit of the same shape);
+each unit gets its own latest feature row from a synthetic table of that size.
+
+Usage:
+    python benchmarks/bench_batch_forecast.py --units 5 77 928 --weeks-ahead 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasource import SyntheticSource
+from features import FeatureStore
+from forecasting import ForecastBatch, ModelRegistry
+from synthetic import province_catalog
+
+
+def looped_forecast(models, X, weeks_ahead):
+    """One inplace_predict per province and horizon, as the single-province path did"""
+    return np.array([
+        [max(0.0, float(m.boosters[h].inplace_predict(X[i:i + 1])[0])) for h in range(1, weeks_ahead + 1)]
+        for i, m in enumerate(models)
+    ])
+
+
+def best_of(fn, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--units', type=int, nargs='+', default=[5, 77, 928])
+    parser.add_argument('--weeks-ahead', type=int, default=8)
+    parser.add_argument('--trained', type=int, default=5, help='provinces actually trained and tiled')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = SyntheticSource(province_catalog(args.trained))
+        registry = ModelRegistry(tmp)
+        features = FeatureStore().get(source)
+        trained = [registry.get(p, features) for p in source.provinces()]
+
+        print(f"{'units':>5} | {'looped fc/s':>11} | {'stack ms':>8} | {'batched fc/s':>12} | {'speedup':>7} | {'max diff':>8}")
+        for n in args.units:
+            units = SyntheticSource(province_catalog(n))
+            X = FeatureStore().get(units).latest_rows(units.provinces())
+            models = [trained[i % len(trained)] for i in range(n)]
+            forecasts = n * args.weeks_ahead
+
+            looped_s, looped = best_of(looped_forecast, models, X, args.weeks_ahead)
+            stack_s, batch = best_of(ForecastBatch, models, repeat=1)
+            batched_s, batched = best_of(batch.predict, X, args.weeks_ahead)
+            diff = np.abs(looped - batched).max()
+            print(f"{n:>5} | {forecasts / looped_s:>11,.0f} | {stack_s * 1000:>8.1f} | "
+                  f"{forecasts / batched_s:>12,.0f} | {looped_s / batched_s:>6.0f}x | {diff:>8.1e}")
+
+
+if __name__ == '__main__':
+    main()
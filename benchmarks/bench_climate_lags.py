@@ -0,0 +1,71 @@
+"""National climate-lag correlations: Series.corr(shift) loops vs the batched FFT engine.
+
+"pandas" is the previous approach extended to the full request: one
+``cases.corr(climate.shift(lag))`` per province, variable and lag. "FFT" is
+ClimateLags.build over the feature matrix. Both run on the full history;
+the largest difference between them is reported.
+
+Usage:
+    python benchmarks/bench_climate_lags.py
+    python benchmarks/bench_climate_lags.py --provinces 77 1000 --pandas-provinces 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from climate_lags import CLIMATE_VARIABLES, MAX_LAG, ClimateLags, frame_arrays
+from datasource import SyntheticSource
+from features import RAW_COLUMNS, FeatureMatrix
+from synthetic import DEFAULT_END, province_catalog
+
+
+def pandas_lags(source, provinces):
+    """(provinces, variables, lags) r from one Series.corr call per cell"""
+    out = np.empty((len(provinces), len(CLIMATE_VARIABLES), MAX_LAG + 1))
+    for i, (_, df) in enumerate(zip(provinces, source.scan(provinces))):
+        cases, climate = frame_arrays(df.reset_index(drop=True))
+        cases = pd.Series(cases)
+        for v, series in enumerate(climate):
+            series = pd.Series(series)
+            out[i, v] = [cases.corr(series.shift(lag)) for lag in range(MAX_LAG + 1)]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[77, 1000])
+    parser.add_argument('--pandas-provinces', type=int, default=77,
+                        help='provinces timed with the pandas loop (scaled linearly to the total)')
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    args = parser.parse_args()
+
+    print(f"{len(CLIMATE_VARIABLES)} climate variables x lags 0-{MAX_LAG}")
+    print(f"{'provinces':>9} | {'weeks':>5} | {'pandas s':>8} | {'FFT ms':>7} | {'speedup':>7} | {'max |diff|':>10}")
+    for n in args.provinces:
+        source = SyntheticSource(province_catalog(n), start=args.start, end=args.end)
+        features = FeatureMatrix(source.load(columns=['province', 'epi_week'] + RAW_COLUMNS), source.version)
+
+        t0 = time.perf_counter()
+        lags = ClimateLags.build(features)
+        fft_seconds = time.perf_counter() - t0
+
+        sample = features.provinces[:min(n, args.pandas_provinces)]
+        t0 = time.perf_counter()
+        reference = pandas_lags(source, sample)
+        pandas_seconds = (time.perf_counter() - t0) * n / len(sample)
+
+        diff = np.nanmax(np.abs(reference - lags.r[:len(sample)]))
+        print(f"{n:>9} | {features.cases.shape[1]:>5} | {pandas_seconds:>8.1f} | {fft_seconds * 1000:>7.1f} | "
+              f"{pandas_seconds / fft_seconds:>6.0f}x | {diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Comparative Analysis summary + heatmap: raw weeks vs precomputed aggregate cubes.
+
+"raw" is the previous per-rerun path: load the year for every province,
+loop over provinces for sum/mean/max/std/min, then pivot_table the weeks by
+month. "cubes" reads the same numbers from CaseCubes. Also reports the cost
+of building the cubes and of folding one ingested week into them.
+
+Usage:
+    python benchmarks/bench_cubes.py
+    python benchmarks/bench_cubes.py --provinces 77 1000 --start 2004-01-05
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cubes import CaseCubes
+from datasource import SyntheticSource
+from synthetic import DEFAULT_END, province_catalog
+
+
+def raw_path(source, year):
+    df = source.load(years=(year, year), columns=['province', 'epi_week', 'year', 'cases'])
+    rows = []
+    for prov, group in df.groupby('province', observed=True, sort=True):
+        cases = group['cases']
+        rows.append((prov, cases.sum(), cases.mean(), cases.max(), cases.std(), cases.min()))
+    heatmap = df.assign(month=df['epi_week'].dt.month).pivot_table(
+        values='cases', index='province', columns='month', aggfunc='sum', observed=True
+    ).fillna(0)
+    return rows, heatmap
+
+
+def cube_path(cubes, year):
+    return cubes.year_summary(year), cubes.monthly_totals(year)
+
+
+def median_ms(fn, *args, repeat=7):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[77, 1000])
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    args = parser.parse_args()
+
+    print(f"{'provinces':>9} | {'rows':>10} | {'raw ms':>7} | {'cubes ms':>8} | {'build ms':>8} | {'+1 week ms':>10} | {'cells read':>10}")
+    for n in args.provinces:
+        source = SyntheticSource(province_catalog(n), start=args.start, end=args.end)
+        df = source.load(columns=['province', 'epi_week', 'year', 'cases'])
+        year = int(df['year'].max())
+
+        t0 = time.perf_counter()
+        cubes = CaseCubes.build(df, source.version)
+        build = (time.perf_counter() - t0) * 1000
+
+        # Same numbers either way
+        summary, heatmap = cube_path(cubes, year)
+        rows, pivot = raw_path(source, year)
+        assert np.allclose(summary[['total', 'mean', 'max', 'std', 'min']].to_numpy(), np.array([r[1:] for r in rows], dtype=float))
+        assert np.array_equal(heatmap.to_numpy(), pivot.to_numpy())
+
+        # Fold the last week back in on top of the cubes built without it
+        last = df['epi_week'].max()
+        head = df[df['epi_week'] < last]
+        partial = CaseCubes.build(head, source.version)
+        t0 = time.perf_counter()
+        partial.append(df[df['epi_week'] == last])
+        append = (time.perf_counter() - t0) * 1000
+
+        cells = len(summary) * 6 + heatmap.size
+        print(f"{n:>9} | {len(df):>10,} | {median_ms(raw_path, source, year):>7.1f} | "
+              f"{median_ms(cube_path, cubes, year):>8.2f} | {build:>8.1f} | {append:>10.2f} | {cells:>10,}")
+
+
+if __name__ == '__main__':
+    main()
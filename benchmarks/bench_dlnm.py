@@ -0,0 +1,71 @@
+"""DLNM fit of every province: one IRLS per province vs the batched solver, and the weekly refresh.
+
+"loop" fits the same penalized quasi-Poisson model one province at a time
+(the shape of a per-province GLM call); "batched" is DlnmFit.fit. "refresh"
+appends one week to the feature matrix and refits through DlnmStore, which
+keeps the knots and warm-starts from the previous coefficients. The largest
+coefficient difference between loop and batched is reported.
+
+Usage:
+    python benchmarks/bench_dlnm.py
+    python benchmarks/bench_dlnm.py --provinces 77 1000 --loop-provinces 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasource import SyntheticSource
+from dlnm import DlnmFit, DlnmStore
+from features import RAW_COLUMNS, FeatureMatrix
+from synthetic import DEFAULT_END, province_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[77, 1000])
+    parser.add_argument('--loop-provinces', type=int, default=77,
+                        help='provinces timed one at a time (scaled linearly to the total)')
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    args = parser.parse_args()
+
+    print(f"{'provinces':>9} | {'weeks':>5} | {'params':>6} | {'loop s':>7} | {'batched s':>9} | {'speedup':>7} | "
+          f"{'refresh s':>9} | {'iters':>5} | {'max |diff|':>10}")
+    for n in args.provinces:
+        source = SyntheticSource(province_catalog(n), start=args.start, end=args.end)
+        df = source.load(columns=['province', 'epi_week'] + RAW_COLUMNS)
+        last = df['epi_week'].max()
+        features = FeatureMatrix(df[df['epi_week'] < last], 'v1')
+
+        store = DlnmStore()
+        t0 = time.perf_counter()
+        fit = store.get(features)
+        batched = time.perf_counter() - t0
+
+        sample = min(n, args.loop_provinces)
+        t0 = time.perf_counter()
+        loop = DlnmFit.fit(features, fit.bases, chunk=1) if sample == n else None
+        if loop is None:
+            subset = FeatureMatrix(df[(df['epi_week'] < last) & df['province'].isin(features.provinces[:sample])], 'v1')
+            loop = DlnmFit.fit(subset, fit.bases, chunk=1)
+        loop_seconds = (time.perf_counter() - t0) * n / sample
+        diff = np.abs(loop.beta - fit.beta[:sample]).max()
+
+        # One new week for every province, then the refit the dashboard would trigger
+        features.append(df[df['epi_week'] == last], 'v2')
+        t0 = time.perf_counter()
+        refreshed = store.get(features)
+        refresh = time.perf_counter() - t0
+
+        print(f"{n:>9} | {int(features.lengths.max()):>5} | {fit.beta.shape[1]:>6} | {loop_seconds:>7.1f} | {batched:>9.2f} | "
+              f"{loop_seconds / batched:>6.1f}x | {refresh:>9.2f} | {refreshed.iterations:>5} | {diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Multi-province chart over long histories: every point vs LTTB + Scattergl.
+
+Builds the comparison-tab line chart for all provinces over a long span at
+full resolution and downsampled to the point budget, and reports build and
+serialization time, JSON payload and how much of each series' peak survives.
+
+Usage:
+    python benchmarks/bench_downsample.py
+    python benchmarks/bench_downsample.py --start 2004-01-05 --budget 5000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import POINT_BUDGET, downsample_frame, scatter_trace
+from synthetic import DEFAULT_END, generate_surveillance_data, province_catalog
+
+
+def build_figure(df, downsampled):
+    fig = go.Figure()
+    for province, group in df.groupby('province', observed=True, sort=False):
+        fig.add_trace(scatter_trace(downsampled, x=group['epi_week'], y=group['cases'], mode='lines', name=province))
+    fig.update_layout(height=500, hovermode='x unified')
+    return fig
+
+
+def peak_retention(full, reduced):
+    """Mean over provinces of (largest kept value / largest value)"""
+    peaks = full.groupby('province', observed=True)['cases'].max()
+    kept = reduced.groupby('province', observed=True)['cases'].max()
+    return float((kept / peaks.replace(0, np.nan)).mean())
+
+
+def measure(df, budget):
+    t0 = time.perf_counter()
+    reduced, downsampled = downsample_frame(df, 'epi_week', 'cases', 'province', budget)
+    t1 = time.perf_counter()
+    fig = build_figure(reduced, downsampled)
+    t2 = time.perf_counter()
+    payload = pio.to_json(fig, validate=False)
+    t3 = time.perf_counter()
+    return {
+        'points': len(reduced), 'lttb_ms': (t1 - t0) * 1000, 'build_ms': (t2 - t1) * 1000,
+        'json_ms': (t3 - t2) * 1000, 'kb': len(payload) / 1024, 'peak': peak_retention(df, reduced)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, default=77)
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--budget', type=int, nargs='+', default=[POINT_BUDGET // 2, POINT_BUDGET])
+    args = parser.parse_args()
+
+    df = generate_surveillance_data(province_catalog(args.provinces), start=args.start, end=args.end)
+    df = df[['province', 'epi_week', 'cases']]
+    print(f"{args.provinces} provinces x {df['epi_week'].nunique()} weeks = {len(df):,} points")
+    print(f"{'mode':<18} | {'points':>7} | {'LTTB ms':>7} | {'build ms':>8} | {'JSON ms':>7} | {'KB':>7} | {'peak kept':>9}")
+    rows = [('full (Scatter)', measure(df, len(df)))]
+    rows += [(f"budget {budget:,}", measure(df, budget)) for budget in args.budget]
+    for name, r in rows:
+        print(f"{name:<18} | {r['points']:>7,} | {r['lttb_ms']:>7.1f} | {r['build_ms']:>8.1f} | "
+              f"{r['json_ms']:>7.1f} | {r['kb']:>7.0f} | {r['peak']:>9.1%}")
+
+
+if __name__ == '__main__':
+    main()
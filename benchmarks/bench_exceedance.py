@@ -0,0 +1,88 @@
+"""Exceedance alerts: re-evaluating a new threshold multiplier from stored paths vs simulating again.
+
+The endemic channel is built from the synthetic source; forecast means
+(around each province's seasonal median) and hold-out residuals are
+synthetic, so no boosters have to be trained. "stored" is
+ExceedanceAlerts.probabilities on paths drawn once, i.e. what a slider move
+costs in the dashboard; "re-simulate" draws the paths again first, and still
+leaves out the model evaluation a full re-run would add.
+
+Usage:
+    python benchmarks/bench_exceedance.py
+    python benchmarks/bench_exceedance.py --provinces 77 1000 --samples 1000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import ExceedanceAlerts
+from datasource import SyntheticSource
+from endemic import EndemicChannel
+from ensemble import SamplePaths, bootstrap_paths
+from synthetic import DEFAULT_END, province_catalog
+
+HORIZONS = 8
+MULTIPLIERS = np.round(np.arange(1.0, 3.01, 0.1), 1)
+
+
+def synthetic_paths(channel, rng, n_samples):
+    provinces = channel.provinces
+    n = len(provinces)
+    last = np.datetime64('2024-11-11')
+    weeks = np.broadcast_to(last + np.arange(1, HORIZONS + 1) * np.timedelta64(7, 'D'), (n, HORIZONS)).astype('datetime64[ns]')
+    week_nums = (np.arange(HORIZONS) + 46) % 52 + 1
+    means = channel.values[:, week_nums - 1, 0] * rng.uniform(0.8, 1.8, (n, 1))
+    origins = rng.integers(20, 220, n)
+    residuals = (rng.normal(0, 0.25, (n, origins.max(), 1))
+                 + rng.normal(0, 0.15, (n, origins.max(), HORIZONS))).astype(np.float32)
+    residuals[np.arange(origins.max())[None, :] >= origins[:, None]] = np.nan
+    return provinces, weeks, means, residuals
+
+
+def median_ms(fn, repeat=len(MULTIPLIERS)):
+    times = []
+    for multiplier in MULTIPLIERS[:repeat]:
+        t0 = time.perf_counter()
+        fn(multiplier)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[77, 1000])
+    parser.add_argument('--samples', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{HORIZONS} horizons x {args.samples} samples, multipliers {MULTIPLIERS[0]}-{MULTIPLIERS[-1]}")
+    print(f"{'provinces':>9} | {'setup ms':>8} | {'stored ms':>9} | {'re-simulate ms':>14} | {'warning cells @1.5x':>19}")
+    for n in args.provinces:
+        source = SyntheticSource(province_catalog(n), start='2018-01-01', end=DEFAULT_END)
+        channel = EndemicChannel.build(source.load(columns=['province', 'epi_week', 'week_num', 'cases']))
+        provinces, weeks, means, residuals = synthetic_paths(channel, rng, args.samples)
+        paths = SamplePaths(provinces, weeks, means, bootstrap_paths(provinces, means, residuals, args.samples))
+
+        t0 = time.perf_counter()
+        alerts = ExceedanceAlerts(paths, channel)
+        setup = (time.perf_counter() - t0) * 1000
+        stored = median_ms(alerts.probabilities)
+
+        def resimulate(multiplier):
+            fresh = SamplePaths(provinces, weeks, means, bootstrap_paths(provinces, means, residuals, args.samples))
+            return fresh.exceedance(alerts.baseline * multiplier)
+        again = median_ms(resimulate, repeat=5)
+
+        warning = int((alerts.levels(1.5) == 2).sum())
+        print(f"{n:>9} | {setup:>8.1f} | {stored:>9.1f} | {again:>14.1f} | {warning:>19,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Peak memory of a large export: whole table in memory vs streamed in batches.
+
+Each run is a fresh process that exports the same synthetic rows, generated
+a block of units at a time so the input itself is never resident. "in
+memory" collects the rows and serializes them into one buffer (what a
+download button holding the file does); the other modes stream through
+export.write_frames to a file. Peak RSS is the process high-water mark.
+
+Usage:
+    python benchmarks/bench_export.py                    # 10M rows
+    python benchmarks/bench_export.py --rows 1000000 10000000 --batch-rows 100000
+"""
+
+import argparse
+import io
+import math
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+import pyarrow.csv as pacsv
+
+from export import arrow_table, write_frames
+from synthetic import DEFAULT_END, generate_surveillance_data, province_catalog
+
+MODES = {
+    'in memory (CSV)': None,
+    'stream CSV': ('csv', 'none'),
+    'stream CSV + zstd': ('csv', 'zstd'),
+    'stream CSV + gzip': ('csv', 'gzip'),
+    'stream Parquet + zstd': ('parquet', 'zstd'),
+}
+
+
+def generated_frames(n_units, start, end, block=100):
+    """Synthetic rows for ``n_units`` units, ``block`` units at a time"""
+    catalog = list(province_catalog(n_units).items())
+    for i in range(0, len(catalog), block):
+        yield generate_surveillance_data(dict(catalog[i:i + block]), start, end)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(mode, n_units, args, path, results):
+    sys.path.insert(0, ROOT)
+    baseline = peak_rss_mb()
+    t0 = time.perf_counter()
+    frames = generated_frames(n_units, args.start, args.end)
+    if MODES[mode] is None:
+        table = arrow_table(pd.concat(frames, ignore_index=True))
+        buffer = io.BytesIO()
+        pacsv.write_csv(table, buffer)
+        n_rows, n_bytes = table.num_rows, buffer.tell()
+    else:
+        fmt, compression = MODES[mode]
+        n_rows = write_frames(frames, path, fmt, compression, args.batch_rows)
+        n_bytes = os.path.getsize(path)
+        os.remove(path)
+    results.put((n_rows, n_bytes, time.perf_counter() - t0, baseline, peak_rss_mb()))
+
+
+def run(mode, n_units, args, path):
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=worker, args=(mode, n_units, args, path, results))
+    proc.start()
+    result = results.get(timeout=3600)
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000_000])
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--batch-rows', type=int, default=100_000)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    n_weeks = len(pd.date_range(args.start, args.end, freq='W-MON'))
+    print(f"{'rows':>11} | {'mode':<22} | {'MB out':>7} | {'seconds':>7} | {'base MB':>7} | {'peak RSS MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            n_units = math.ceil(rows / n_weeks)
+            for mode in args.modes:
+                n_rows, n_bytes, seconds, baseline, peak = run(mode, n_units, args, os.path.join(tmp, 'export'))
+                print(f"{n_rows:>11,} | {mode:<22} | {n_bytes / 1024 ** 2:>7.0f} | {seconds:>7.1f} | "
+                      f"{baseline:>7.0f} | {peak:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Rerun latency of a horizon click: full script rerun vs the forecast fragment alone.
+
+Starts the dashboard on a local Streamlit server and drives it over its
+websocket like a browser would. Each horizon button is clicked alternately
+as a full rerun and as a rerun scoped to the fragment that owns it; the
+latency is from sending the click to the server's script-finished message.
+
+Usage:
+    python benchmarks/bench_fragment_rerun.py --clicks 10
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', os.path.join(ROOT, 'dashboard.py'),
+         '--server.headless', 'true', '--server.port', str(port), '--server.enableXsrfProtection', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(600):
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1)
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('streamlit server did not start')
+
+
+async def rerun(ws, trigger=None, fragment_id=None):
+    """(seconds, deltas, bytes, delta messages) of one rerun request"""
+    msg = BackMsg()
+    msg.rerun_script.query_string = ''
+    if trigger:
+        widget = msg.rerun_script.widget_states.widgets.add()
+        widget.id = trigger
+        widget.trigger_value = True
+    if fragment_id:
+        msg.rerun_script.fragment_id = fragment_id
+    t0 = time.perf_counter()
+    await ws.send(msg.SerializeToString())
+    deltas, n_bytes = [], 0
+    while True:
+        raw = await ws.recv()
+        n_bytes += len(raw)
+        forward = ForwardMsg()
+        forward.ParseFromString(raw)
+        kind = forward.WhichOneof('type')
+        if kind == 'delta':
+            deltas.append(forward.delta)
+        elif kind == 'script_finished':
+            return time.perf_counter() - t0, len(deltas), n_bytes, deltas
+
+
+async def run(port, clicks):
+    async with websockets.connect(f'ws://127.0.0.1:{port}/_stcore/stream', subprotocols=['streamlit'], max_size=None) as ws:
+        *_, deltas = await rerun(ws)
+        buttons = [
+            (d.new_element.button.id, d.fragment_id) for d in deltas
+            if d.new_element.WhichOneof('type') == 'button' and '-horizon_' in d.new_element.button.id
+        ]
+        assert buttons and all(fragment for _, fragment in buttons), 'horizon buttons are not inside a fragment'
+        # Warm the forecast cache for every horizon
+        for button, _ in buttons:
+            await rerun(ws, button)
+
+        results = {'full rerun': [], 'fragment rerun': []}
+        for i in range(clicks):
+            button, fragment = buttons[i % len(buttons)]
+            results['full rerun'].append(await rerun(ws, button))
+            results['fragment rerun'].append(await rerun(ws, button, fragment))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clicks', type=int, default=10)
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_server(port)
+    try:
+        results = asyncio.run(run(port, args.clicks))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"{args.clicks} horizon clicks each")
+    print(f"{'rerun':<15} | {'median ms':>9} | {'p90 ms':>7} | {'deltas':>6} | {'KB sent':>7}")
+    for name, runs in results.items():
+        ms = sorted(r[0] * 1000 for r in runs)
+        print(f"{name:<15} | {statistics.median(ms):>9.1f} | {ms[int(0.9 * (len(ms) - 1))]:>7.1f} | "
+              f"{statistics.median(r[1] for r in runs):>6.0f} | {statistics.median(r[2] for r in runs) / 1024:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Cold-start benchmark: row-dict generator vs columnar generator.
+
+Usage:
+    python benchmarks/bench_generate.py
+    python benchmarks/bench_generate.py --provinces 5 77 1000 --start 2004-01-05
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import DEFAULT_END, DEFAULT_START, generate_surveillance_data, province_catalog
+
+
+def legacy_generate(provinces_info, start, end):
+    """The original dashboard generator: one Python dict per province-week"""
+    start_date = pd.date_range(start=start, end=end, freq='W-MON')
+    n_weeks = len(start_date)
+    data_list = []
+
+    for province, params in provinces_info.items():
+        weeks_of_year = np.arange(n_weeks) % 52
+        seasonal = params['baseline'] + params['amplitude'] * np.sin(2 * np.pi * weeks_of_year / 52 - np.pi/2)
+        trend = np.linspace(0, params['trend'], n_weeks)
+        noise = np.random.normal(0, params['baseline'] * 0.2, n_weeks)
+
+        outbreak_weeks = np.random.choice(n_weeks, size=5, replace=False)
+        outbreak_factor = np.ones(n_weeks)
+        for week in outbreak_weeks:
+            outbreak_factor[max(0, week-2):min(n_weeks, week+3)] *= np.random.uniform(1.5, 2.5)
+
+        cases = np.maximum(0, (seasonal + trend + noise) * outbreak_factor).astype(int)
+        temp_mean = 27 + 3 * np.sin(2 * np.pi * weeks_of_year / 52) + np.random.normal(0, 1.5, n_weeks)
+        humidity = 70 + 10 * np.sin(2 * np.pi * weeks_of_year / 52 + np.pi/4) + np.random.normal(0, 5, n_weeks)
+        rainfall = np.maximum(0, 50 + 80 * np.sin(2 * np.pi * weeks_of_year / 52) + np.random.normal(0, 30, n_weeks))
+        chikungunya = np.maximum(0, (seasonal * 0.15 + np.random.normal(0, 5, n_weeks))).astype(int)
+        hfmd = np.maximum(0, 30 + 20 * np.sin(2 * np.pi * weeks_of_year / 52 + np.pi/3) + np.random.normal(0, 8, n_weeks)).astype(int)
+
+        for i, date in enumerate(start_date):
+            data_list.append({
+                'province': province,
+                'epi_week': date,
+                'year': date.year,
+                'week_num': date.isocalendar()[1],
+                'cases': cases[i],
+                'temp_mean': round(temp_mean[i], 1),
+                'humidity': round(humidity[i], 1),
+                'rainfall': round(rainfall[i], 1),
+                'chikungunya': chikungunya[i],
+                'hfmd': hfmd[i]
+            })
+
+    return pd.DataFrame(data_list)
+
+
+def measure(fn, *args):
+    """Wall time (s) of an untraced cold call, then peak traced allocation (MB) of a second call"""
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - t0
+
+    # tracemalloc slows Python-level allocation, so time and memory are separate runs
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[5, 77, 1000])
+    parser.add_argument('--start', default=DEFAULT_START)
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--skip-legacy-above', type=int, default=None,
+                        help='only run the row-dict generator up to this many provinces')
+    args = parser.parse_args()
+
+    print(f"{'provinces':>9} {'rows':>10} | {'legacy s':>9} {'legacy MB':>10} {'frame MB':>9} | "
+          f"{'columnar s':>10} {'columnar MB':>11} {'frame MB':>9} | {'speedup':>7}")
+    for n in args.provinces:
+        info = province_catalog(n)
+        t_new, mem_new, df_new = measure(generate_surveillance_data, info, args.start, args.end)
+        size_new = df_new.memory_usage(deep=True).sum() / 1e6
+
+        if args.skip_legacy_above is not None and n > args.skip_legacy_above:
+            print(f"{n:>9} {len(df_new):>10,} | {'-':>9} {'-':>10} {'-':>9} | "
+                  f"{t_new:>10.3f} {mem_new:>11.1f} {size_new:>9.1f} | {'-':>7}")
+            continue
+
+        t_old, mem_old, df_old = measure(legacy_generate, info, args.start, args.end)
+        size_old = df_old.memory_usage(deep=True).sum() / 1e6
+        print(f"{n:>9} {len(df_new):>10,} | {t_old:>9.3f} {mem_old:>10.1f} {size_old:>9.1f} | "
+              f"{t_new:>10.3f} {mem_new:>11.1f} {size_new:>9.1f} | {t_old / t_new:>6.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Sample-path forecasts: simulating once vs per query, and float32 vs float64 storage.
+
+Means and hold-out residuals are synthetic (random levels, origin counts and
+horizon-correlated log errors), so no boosters have to be trained. "simulate"
+draws every province's paths once; "from paths" then reads five quantiles,
+an exceedance probability and the CRPS from the stored array, against
+"re-simulate", which draws the paths again for each of those queries.
+
+Usage:
+    python benchmarks/bench_sample_paths.py
+    python benchmarks/bench_sample_paths.py --provinces 77 1000 --samples 1000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ensemble import SamplePaths, bootstrap_paths
+
+HORIZONS = 8
+LEVELS = [0.025, 0.25, 0.5, 0.75, 0.975]
+
+
+def synthetic_inputs(n, rng):
+    means = rng.gamma(2.0, 60.0, (n, HORIZONS))
+    origins = rng.integers(20, 220, n)
+    # Errors correlated across horizons through a shared origin shock
+    shock = rng.normal(0, 0.25, (n, origins.max(), 1))
+    residuals = (shock + rng.normal(0, 0.15, (n, origins.max(), HORIZONS)) * np.sqrt(np.arange(1, HORIZONS + 1))).astype(np.float32)
+    residuals[np.arange(origins.max())[None, :] >= origins[:, None]] = np.nan
+    return [f"P{i}" for i in range(n)], means, residuals
+
+
+def queries(paths, observed):
+    paths.quantiles(LEVELS)
+    paths.exceedance(paths.means * 1.5)
+    paths.crps(observed)
+
+
+def resimulated(provinces, means, residuals, samples, observed):
+    for query in (lambda p: p.quantiles(LEVELS), lambda p: p.exceedance(p.means * 1.5), lambda p: p.crps(observed)):
+        query(SamplePaths(provinces, None, means, bootstrap_paths(provinces, means, residuals, samples)))
+
+
+def median_ms(fn, *args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[77, 1000])
+    parser.add_argument('--samples', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{HORIZONS} horizons x {args.samples} samples")
+    print(f"{'provinces':>9} | {'simulate ms':>11} | {'from paths ms':>13} | {'re-simulate ms':>14} | {'float32 MB':>10} | {'float64 MB':>10}")
+    for n in args.provinces:
+        provinces, means, residuals = synthetic_inputs(n, rng)
+        observed = rng.poisson(means).astype(np.float64)
+        simulate = median_ms(bootstrap_paths, provinces, means, residuals, args.samples)
+        paths = SamplePaths(provinces, None, means, bootstrap_paths(provinces, means, residuals, args.samples))
+        stored = median_ms(queries, paths, observed)
+        again = median_ms(resimulated, provinces, means, residuals, args.samples, observed)
+        print(f"{n:>9} | {simulate:>11.1f} | {stored:>13.1f} | {again:>14.1f} | "
+              f"{paths.samples.nbytes / 1024 ** 2:>10.1f} | {paths.samples.nbytes * 2 / 1024 ** 2:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
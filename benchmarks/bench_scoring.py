@@ -0,0 +1,67 @@
+"""Scoring throughput for a backtest-sized array: one vectorized pass vs a loop per series.
+
+Scores (provinces x origins x horizons) Gaussian forecasts and an ensemble
+of samples per forecast with every metric in scoring.py. The loop baseline
+calls the same functions once per (province, horizon) series, as a
+per-province backtest report would.
+
+Usage:
+    python benchmarks/bench_scoring.py --shape 77 500 8 --samples 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import coverage, crps_ensemble, crps_gaussian, interval_score, pit_ensemble, pit_gaussian, pit_histogram
+
+
+def score_gaussian(mu, sigma, y):
+    lower, upper = mu - 1.96 * sigma, mu + 1.96 * sigma
+    return (crps_gaussian(mu, sigma, y), interval_score(lower, upper, y), coverage(lower, upper, y, axis=1),
+            pit_histogram(pit_gaussian(mu, sigma, y), axis=1))
+
+
+def score_gaussian_looped(mu, sigma, y):
+    n_prov, _, n_h = y.shape
+    return [score_gaussian(mu[p, :, h][None, :, None], sigma[p, :, h][None, :, None], y[p, :, h][None, :, None])
+            for p in range(n_prov) for h in range(n_h)]
+
+
+def score_ensemble(samples, y):
+    return crps_ensemble(samples, y), pit_histogram(pit_ensemble(samples, y), axis=1)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shape', type=int, nargs=3, default=[77, 500, 8], metavar=('PROVINCES', 'ORIGINS', 'HORIZONS'))
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mu = rng.gamma(4.0, 15.0, size=args.shape)
+    sigma = np.full(args.shape, 15.0)
+    y = rng.normal(mu, sigma)
+    samples = (mu[..., None] + sigma[..., None] * rng.standard_normal(tuple(args.shape) + (args.samples,))).astype(np.float32)
+
+    n = int(np.prod(args.shape))
+    print(f"{n:,} forecasts ({' x '.join(map(str, args.shape))}), {args.samples} samples each")
+    print(f"{'workload':<40} | {'ms':>8}")
+    print(f"{'gaussian: CRPS, IS, coverage, PIT (loop)':<40} | {timed(score_gaussian_looped, mu, sigma, y):>8.1f}")
+    print(f"{'gaussian: CRPS, IS, coverage, PIT':<40} | {timed(score_gaussian, mu, sigma, y):>8.1f}")
+    print(f"{'ensemble: CRPS, PIT':<40} | {timed(score_ensemble, samples, y):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
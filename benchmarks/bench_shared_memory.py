@@ -0,0 +1,90 @@
+"""Host memory vs worker count: private in-process tables vs one memory-mapped Arrow file.
+
+Each worker stands in for a Streamlit server process. It either generates
+its own copy of the table or maps the shared file, touches every column,
+and reports its proportional set size (PSS, Linux only) while all workers
+are alive, so shared pages are split between them.
+
+Usage:
+    python benchmarks/bench_shared_memory.py --provinces 77 --start 2004-01-05 --workers 1 2 4 8
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datasource import MappedSource, write_shared_table
+from synthetic import DEFAULT_END, DEFAULT_START, generate_surveillance_data, province_catalog
+
+
+def memory_mb():
+    """(PSS, RSS) of the current process in MB"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Pss:', 'Rss:'):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values['Pss'], values['Rss']
+
+
+def worker(mode, args, path, barrier, results):
+    sys.path.insert(0, ROOT)
+    baseline_pss, _ = memory_mb()
+    if mode == 'private':
+        df = generate_surveillance_data(province_catalog(args.provinces), args.start, args.end)
+    else:
+        df = MappedSource(path).frame
+    # Touch one byte per page of every column so mapped pages are faulted in
+    for column in df.columns[1:]:
+        df[column].to_numpy().view(np.uint8)[::4096].sum()
+    barrier.wait()
+    pss, rss = memory_mb()
+    results.put((pss - baseline_pss, rss))
+    barrier.wait()
+
+
+def run(mode, n_workers, args, path):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, args, path, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get(timeout=600) for _ in procs]
+    for p in procs:
+        p.join()
+    return sum(s[0] for s in samples), max(s[1] for s in samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, default=77)
+    parser.add_argument('--start', default=DEFAULT_START)
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'surveillance.arrow')
+        df = generate_surveillance_data(province_catalog(args.provinces), args.start, args.end)
+        write_shared_table(df, path)
+        print(f"{len(df):,} rows, {os.path.getsize(path) / 1e6:.1f} MB on disk")
+        del df
+
+        print(f"{'workers':>7} | {'private data PSS MB':>20} | {'mapped data PSS MB':>19}")
+        for n in args.workers:
+            private, _ = run('private', n, args, path)
+            mapped, _ = run('mapped', n, args, path)
+            print(f"{n:>7} | {private:>20.1f} | {mapped:>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
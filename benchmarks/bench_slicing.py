@@ -0,0 +1,77 @@
+"""Rerun slicing latency vs province count: boolean-mask scans vs the province/year index.
+
+The workload is the slicing one dashboard rerun does: the selected
+province's history and year range, then one year of every province for
+the comparison tab (trace loop and summary loop).
+
+Usage:
+    python benchmarks/bench_slicing.py --provinces 5 77 1000 --start 2004-01-05
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasource import SyntheticSource
+from synthetic import DEFAULT_END, province_catalog
+
+
+def masked_rerun(df, province, year_range):
+    """Slicing as main() did it before the index: full-table masks per province"""
+    history = df[df['province'] == province].copy()
+    view = df[(df['province'] == province) & (df['year'] >= year_range[0]) & (df['year'] <= year_range[1])].copy()
+    year_df = df[df['year'] == year_range[1]].copy()
+    for prov in sorted(df['province'].unique()):
+        year_df[year_df['province'] == prov]
+        df[(df['province'] == prov) & (df['year'] == year_range[1])]
+    return history, view
+
+
+def indexed_rerun(source, province, year_range):
+    """Slicing through the index: positional views and one grouped pass"""
+    history = source.load(provinces=[province])
+    view = source.load(provinces=[province], years=year_range)
+    year_df = source.load(years=(year_range[1], year_range[1]), columns=['province', 'epi_week', 'year', 'cases'])
+    groups = dict(tuple(year_df.groupby('province', observed=True, sort=True)))
+    for prov in groups:
+        groups[prov]
+    return history, view
+
+
+def best_of(fn, *args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provinces', type=int, nargs='+', default=[5, 77, 1000])
+    parser.add_argument('--start', default='2004-01-05')
+    parser.add_argument('--end', default=DEFAULT_END)
+    args = parser.parse_args()
+
+    print(f"{'provinces':>9} {'rows':>10} | {'index build ms':>14} | {'masked ms':>9} | {'indexed ms':>10} | {'speedup':>7}")
+    for n in args.provinces:
+        source = SyntheticSource(province_catalog(n), args.start, args.end)
+        df = source.frame
+        t0 = time.perf_counter()
+        source.index
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        province = source.provinces()[0]
+        years = source.years()
+        year_range = (years[-2], years[-1])
+        masked = best_of(masked_rerun, df, province, year_range)
+        indexed = best_of(indexed_rerun, source, province, year_range)
+        print(f"{n:>9} {len(df):>10,} | {build_ms:>14.1f} | {masked:>9.1f} | {indexed:>10.1f} | {masked / indexed:>6.0f}x")
+
+
+if __name__ == '__main__':
+    main()
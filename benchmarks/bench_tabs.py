@@ -0,0 +1,67 @@
+"""Server CPU time and payload per rerun: all five tabs rendered vs only the selected one.
+
+Each tab is selected in turn in a headless AppTest session. CPU time is the
+process time of one warm rerun (caches already filled); payload is the
+serialized size of every element the rerun sends to the browser.
+
+Usage:
+    python benchmarks/bench_tabs.py --repeats 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+TAB_NAMES = ["Forecast & Trends", "Climate Drivers", "Comparative Analysis", "Syndromic Context", "Model Performance"]
+
+
+def payload_bytes(node):
+    """Serialized size of every element under an AppTest tree node"""
+    children = getattr(node, 'children', None)
+    if children:
+        return sum(payload_bytes(child) for child in children.values())
+    proto = getattr(node, 'proto', None)
+    return proto.ByteSize() if proto is not None else 0
+
+
+def measure(lazy, repeats):
+    os.environ['DENGUE_LAZY_TABS'] = '1' if lazy else '0'
+    app = AppTest.from_file(os.path.join(ROOT, 'dashboard.py'), default_timeout=300)
+    app.run()  # fill the caches
+    rows = []
+    for tab in TAB_NAMES:
+        app.session_state['tab'] = tab
+        cpu = []
+        for _ in range(repeats):
+            t0 = time.process_time()
+            app.run()
+            cpu.append(time.process_time() - t0)
+        assert not app.exception, app.exception
+        rows.append((tab, statistics.median(cpu), payload_bytes(app._tree), len(app.get('plotly_chart'))))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    eager = measure(False, args.repeats)
+    lazy = measure(True, args.repeats)
+    print(f"{'selected tab':<22} | {'all tabs ms':>11} | {'lazy ms':>8} | {'all tabs KB':>11} | {'lazy KB':>8} | {'charts':>6}")
+    for (tab, e_cpu, e_bytes, e_charts), (_, l_cpu, l_bytes, l_charts) in zip(eager, lazy):
+        print(f"{tab:<22} | {e_cpu * 1000:>11.1f} | {l_cpu * 1000:>8.1f} | {e_bytes / 1024:>11.1f} | {l_bytes / 1024:>8.1f} | {e_charts:>2} -> {l_charts:<2}")
+    mean = lambda rows, i: statistics.mean(r[i] for r in rows)
+    print(f"{'mean':<22} | {mean(eager, 1) * 1000:>11.1f} | {mean(lazy, 1) * 1000:>8.1f} | "
+          f"{mean(eager, 2) / 1024:>11.1f} | {mean(lazy, 2) / 1024:>8.1f} |")
+
+
+if __name__ == '__main__':
+    main()
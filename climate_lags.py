@@ -0,0 +1,186 @@
+"""Climate-dengue lag correlations for every province, variable and lag in one pass.
+
+The Pearson r of cases[t] with a climate series at t - lag, over the weeks
+where both are present (as ``Series.corr(Series.shift(lag))``), needs six
+moment sums per lag: pair count, both sums, both sums of squares and the
+cross product. Each is a cross-correlation of zero-filled series with each
+other or with their presence masks, so all lags of all (province, variable)
+pairs come out of a handful of batched FFTs. Results are cached per dataset
+version; the national optimal-lag table is a lookup into them.
+
+Usage:
+    python climate_lags.py show              # optimal lag of every province and variable
+    python climate_lags.py show Bangkok      # r at every lag for one province
+"""
+
+import argparse
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import fft
+
+from features import FEATURE_NAMES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+MAX_LAG = 26
+
+# Feature matrix column -> label; the 2- and 4-week rainfall sums are the cumulative features
+CLIMATE_VARIABLES = {
+    'temp_mean': 'Temperature',
+    'humidity': 'Humidity',
+    'rainfall_1w': 'Rainfall',
+    'rainfall_2w': 'Rainfall (2w sum)',
+    'rainfall_4w': 'Rainfall (4w sum)'
+}
+
+# Provinces per FFT batch; bounds the spectra held at once
+CHUNK_PROVINCES = 128
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+def lag_correlations(y, X, max_lag=MAX_LAG):
+    """Pearson r of y[..., t] with X[..., v, t - lag] for lag 0..max_lag over complete pairs.
+
+    ``y`` is (..., weeks) and ``X`` is (..., variables, weeks), NaN where
+    missing; returns (..., variables, max_lag + 1).
+    """
+    y = np.asarray(y, dtype=np.float64)[..., None, :]
+    X = np.asarray(X, dtype=np.float64)
+    n_weeks = X.shape[-1]
+    present_y, present_x = ~np.isnan(y), ~np.isnan(X)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-missing series
+        # Centring each series keeps the moment sums well conditioned
+        y = np.where(present_y, y - np.nanmean(y, axis=-1, keepdims=True), 0.0)
+        X = np.where(present_x, X - np.nanmean(X, axis=-1, keepdims=True), 0.0)
+
+    # Zero padding to n_weeks + max_lag keeps lagged products from wrapping around
+    size = fft.next_fast_len(n_weeks + max_lag, real=True)
+    spectra = {
+        name: fft.rfft(values, size, axis=-1)
+        for name, values in (('y', y), ('yy', y * y), ('my', present_y.astype(np.float64)),
+                             ('x', X), ('xx', X * X), ('mx', present_x.astype(np.float64)))
+    }
+
+    def xcorr(a, b):
+        """sum_t a[t] * b[t - lag] for lag 0..max_lag"""
+        return fft.irfft(spectra[a] * np.conj(spectra[b]), size, axis=-1)[..., :max_lag + 1]
+
+    n = np.rint(xcorr('my', 'mx'))
+    sy, syy = xcorr('y', 'mx'), xcorr('yy', 'mx')
+    sx, sxx = xcorr('my', 'x'), xcorr('my', 'xx')
+    sxy = xcorr('y', 'x')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        r = cov / np.sqrt(var_x * var_y)
+    # Constant or too-short overlaps are undefined (FFT round-off would make them noise)
+    degenerate = (n < 2) | (var_x <= 1e-9 * np.abs(sxx)) | (var_y <= 1e-9 * np.abs(syy))
+    r[degenerate] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def frame_arrays(df):
+    """(cases, climate) arrays of one province's weekly rows, climate ordered as CLIMATE_VARIABLES"""
+    rain = df['rainfall'].astype(np.float64)
+    columns = {
+        'temp_mean': df['temp_mean'],
+        'humidity': df['humidity'],
+        'rainfall_1w': rain,
+        'rainfall_2w': rain.rolling(2).sum(),
+        'rainfall_4w': rain.rolling(4).sum()
+    }
+    climate = np.stack([np.asarray(columns[c], dtype=np.float64) for c in CLIMATE_VARIABLES])
+    return df['cases'].to_numpy(dtype=np.float64), climate
+
+# ============================================================================
+# NATIONAL TABLE
+# ============================================================================
+
+class ClimateLags:
+    """r at every lag for every (province, climate variable) of a feature matrix"""
+
+    def __init__(self, provinces, r, version=None):
+        self.provinces = list(provinces)
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.r = r
+        self.version = version
+
+    @classmethod
+    def build(cls, features, max_lag=MAX_LAG, chunk=CHUNK_PROVINCES):
+        columns = [FEATURE_NAMES.index(c) for c in CLIMATE_VARIABLES]
+        r = np.empty((len(features.provinces), len(columns), max_lag + 1))
+        for start in range(0, len(features.provinces), chunk):
+            rows = slice(start, start + chunk)
+            # Weeks past a province's end are NaN padding and drop out as missing pairs
+            climate = features.values[rows][:, :, columns].transpose(0, 2, 1)
+            r[rows] = lag_correlations(features.cases[rows], climate, max_lag)
+        return cls(features.provinces, r, features.version)
+
+    @property
+    def lags(self):
+        return np.arange(self.r.shape[-1])
+
+    def province(self, province):
+        """(lags x variables) r of one province"""
+        return pd.DataFrame(
+            self.r[self.index[province]].T, index=pd.Index(self.lags, name='lag'),
+            columns=list(CLIMATE_VARIABLES.values())
+        )
+
+    def optimal(self):
+        """Lag of the strongest |r| and its r for every province and variable (NaN where undefined)"""
+        strength = np.where(np.isnan(self.r), -1.0, np.abs(self.r))
+        best = strength.argmax(axis=-1)
+        r = np.take_along_axis(self.r, best[..., None], axis=-1)[..., 0]
+        lag = np.where(np.isnan(r), np.nan, best)
+        labels = list(CLIMATE_VARIABLES.values())
+        return (pd.DataFrame(lag, index=self.provinces, columns=labels),
+                pd.DataFrame(r, index=self.provinces, columns=labels))
+
+
+class ClimateLagStore:
+    """The lag correlations of the current feature-matrix version, shared by every caller"""
+
+    def __init__(self):
+        self.lags = None
+        self._lock = threading.Lock()
+
+    def get(self, features):
+        with self._lock:
+            if self.lags is None or self.lags.version != features.version:
+                self.lags = ClimateLags.build(features)
+            return self.lags
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+    from features import FeatureStore
+
+    parser = argparse.ArgumentParser(description='Climate-dengue lag correlations')
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('show', help='print optimal lags, or one province at every lag')
+    show.add_argument('province', nargs='?')
+    args = parser.parse_args()
+
+    lags = ClimateLags.build(FeatureStore().get(source_from_env()))
+    if args.province:
+        print(lags.province(args.province).round(3).to_string())
+    else:
+        lag, r = lags.optimal()
+        print(lag.astype('Int64').astype(str).add(' (r=').add(r.round(2).astype(str)).add(')').to_string())
+
+
+if __name__ == '__main__':
+    main()
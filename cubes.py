@@ -0,0 +1,269 @@
+"""Aggregate cubes of weekly cases: province x year x month and province x year.
+
+Every cell holds the count, sum, sum of squares, min and max of the weekly
+case counts that fall in it (by the row's year and the month of its
+epi-week), so totals, means, standard deviations and extremes of any cell
+are a few arithmetic operations. The cubes are built in one bincount pass,
+stored next to file-backed data, and newly ingested weeks are folded into
+them instead of rescanning the table.
+
+Usage:
+    python cubes.py build                # (re)build for the configured source
+    python cubes.py show 2024
+"""
+
+import argparse
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+STATISTICS = ['count', 'sum', 'sumsq', 'min', 'max']
+
+MONTHS = 12
+
+# ============================================================================
+# CUBES
+# ============================================================================
+
+def _fold(cells, values, n_cells):
+    """Statistics of ``values`` grouped by flat cell index, one array per statistic"""
+    minimum = np.full(n_cells, np.inf)
+    maximum = np.full(n_cells, -np.inf)
+    np.minimum.at(minimum, cells, values)
+    np.maximum.at(maximum, cells, values)
+    return {
+        'count': np.bincount(cells, minlength=n_cells).astype(np.float64),
+        'sum': np.bincount(cells, weights=values, minlength=n_cells),
+        'sumsq': np.bincount(cells, weights=values * values, minlength=n_cells),
+        'min': minimum,
+        'max': maximum
+    }
+
+
+class CaseCubes:
+    """Weekly case statistics per (province, year, month) cell and per (province, year)"""
+
+    def __init__(self, provinces, years, monthly, last_weeks, dataset_version=None):
+        self.provinces = list(provinces)
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.years = np.asarray(years, dtype=np.int32)
+        # Appends update cells in place, so every cube must be a writable C-contiguous array
+        self.monthly = {s: np.require(v, np.float64, ['C', 'W']) for s, v in monthly.items()}
+        self.last_weeks = np.asarray(last_weeks, dtype='datetime64[ns]')
+        self.version = dataset_version
+        self._roll_up()
+
+    @classmethod
+    def build(cls, df, dataset_version=None):
+        """Cubes of a (province, epi_week, year, cases) table"""
+        names = list(df['province'].cat.categories)
+        codes = df['province'].cat.codes.to_numpy()
+        present = np.unique(codes)
+        slot = np.full(len(names), -1)
+        slot[present] = np.arange(len(present))
+
+        year = df['year'].to_numpy()
+        years = np.arange(year.min(), year.max() + 1)
+        cells = cls._cells(slot[codes], year - years[0], df['epi_week'], len(years))
+        monthly = _fold(cells, df['cases'].to_numpy(dtype=np.float64), len(present) * len(years) * MONTHS)
+        monthly = {s: v.reshape(len(present), len(years), MONTHS) for s, v in monthly.items()}
+
+        last_weeks = df['epi_week'].groupby(slot[codes]).max().to_numpy(dtype='datetime64[ns]')
+        return cls([names[c] for c in present], years, monthly, last_weeks, dataset_version)
+
+    @staticmethod
+    def _cells(slots, year_offsets, epi_weeks, n_years):
+        months = pd.DatetimeIndex(epi_weeks).month.to_numpy() - 1
+        return (slots * n_years + year_offsets) * MONTHS + months
+
+    def _roll_up(self):
+        """Province x year cube from the monthly one"""
+        self.yearly = {
+            'count': self.monthly['count'].sum(axis=2),
+            'sum': self.monthly['sum'].sum(axis=2),
+            'sumsq': self.monthly['sumsq'].sum(axis=2),
+            'min': self.monthly['min'].min(axis=2),
+            'max': self.monthly['max'].max(axis=2)
+        }
+
+    def append(self, rows, version=None):
+        """Fold newly arrived weeks into the cubes.
+
+        Rows must be later weeks of known provinces (KeyError / ValueError
+        otherwise), so nothing is counted twice.
+        """
+        if not len(rows):
+            return
+        slots = np.array([self.index[p] for p in rows['province'].astype(str)])
+        weeks = rows['epi_week'].to_numpy(dtype='datetime64[ns]')
+        if np.any(weeks <= self.last_weeks[slots]):
+            raise ValueError("appended rows must be later than each province's last week")
+
+        # New years extend the year axis with empty cells
+        year = rows['year'].to_numpy()
+        if year.min() < self.years[0]:
+            raise ValueError("appended rows must not precede the first year")
+        if year.max() > self.years[-1]:
+            n_new = int(year.max() - self.years[-1])
+            empty = {'count': 0.0, 'sum': 0.0, 'sumsq': 0.0, 'min': np.inf, 'max': -np.inf}
+            for s, v in self.monthly.items():
+                self.monthly[s] = np.concatenate([v, np.full((len(self.provinces), n_new, MONTHS), empty[s])], axis=1)
+            self.years = np.arange(self.years[0], year.max() + 1, dtype=np.int32)
+            self._roll_up()
+
+        n_years = len(self.years)
+        cells = self._cells(slots, year - self.years[0], rows['epi_week'], n_years)
+        values = rows['cases'].to_numpy(dtype=np.float64)
+        # Only the touched cells of both cubes are updated, in place through flat views
+        for cube, cube_cells in ((self.monthly, cells), (self.yearly, cells // MONTHS)):
+            flat = {s: v.reshape(-1) for s, v in cube.items()}
+            np.add.at(flat['count'], cube_cells, 1.0)
+            np.add.at(flat['sum'], cube_cells, values)
+            np.add.at(flat['sumsq'], cube_cells, values * values)
+            np.minimum.at(flat['min'], cube_cells, values)
+            np.maximum.at(flat['max'], cube_cells, values)
+        np.maximum.at(self.last_weeks, slots, weeks)
+        if version is not None:
+            self.version = version
+
+    def year_summary(self, year):
+        """Weekly case statistics per province in ``year`` (provinces with data only)"""
+        if year not in self.years:
+            return pd.DataFrame(columns=['weeks', 'total', 'mean', 'std', 'min', 'max'])
+        y = int(year - self.years[0])
+        cells = {s: v[:, y] for s, v in self.yearly.items()}
+        n = cells['count']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = cells['sum'] / n
+            # Sample variance (ddof=1) from the moments, clipped against rounding below zero
+            var = np.maximum(cells['sumsq'] - cells['sum'] * mean, 0) / (n - 1)
+        summary = pd.DataFrame({
+            'weeks': n.astype(np.int64),
+            'total': cells['sum'],
+            'mean': mean,
+            'std': np.where(n > 1, np.sqrt(var), np.nan),
+            'min': cells['min'],
+            'max': cells['max']
+        }, index=pd.Index(self.provinces, name='province'))
+        return summary[n > 0]
+
+    def monthly_totals(self, year):
+        """Province x month case totals in ``year``; months without any data are left out"""
+        if year not in self.years:
+            return pd.DataFrame()
+        y = int(year - self.years[0])
+        count, total = self.monthly['count'][:, y], self.monthly['sum'][:, y]
+        provinces, months = count.sum(axis=1) > 0, np.flatnonzero(count.sum(axis=0) > 0)
+        return pd.DataFrame(
+            total[provinces][:, months],
+            index=pd.Index(np.array(self.provinces)[provinces], name='province'),
+            columns=pd.Index(months + 1, name='month')
+        )
+
+    def frame(self):
+        """Long monthly table: province, year, month and one column per statistic"""
+        shape = self.monthly['count'].shape
+        table = pd.DataFrame({s: self.monthly[s].ravel() for s in STATISTICS})
+        table.insert(0, 'month', np.tile(np.arange(1, MONTHS + 1, dtype=np.int8), shape[0] * shape[1]))
+        table.insert(0, 'year', np.tile(np.repeat(self.years, MONTHS), shape[0]))
+        table.insert(0, 'province', np.repeat(self.provinces, shape[1] * MONTHS))
+        return table
+
+    def save(self, path):
+        table = pa.Table.from_pandas(self.frame(), preserve_index=False)
+        table = table.append_column('last_week', pa.array(np.repeat(self.last_weeks, len(self.years) * MONTHS)))
+        table = table.replace_schema_metadata({'dataset_version': str(self.version)})
+        tmp = f"{path}.tmp-{os.getpid()}"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        table = pq.read_table(path)
+        version = table.schema.metadata[b'dataset_version'].decode()
+        df = table.to_pandas()
+        provinces = list(dict.fromkeys(df['province']))
+        years = np.unique(df['year'].to_numpy())
+        shape = (len(provinces), len(years), MONTHS)
+        monthly = {s: df[s].to_numpy(dtype=np.float64).reshape(shape) for s in STATISTICS}
+        last_weeks = df['last_week'].to_numpy(dtype='datetime64[ns]')[::len(years) * MONTHS]
+        return cls(provinces, years, monthly, last_weeks, version)
+
+
+def build_cubes(source):
+    """Cubes of a data source, read from their stored copy when that matches the data"""
+    path = source.sidecar_path('case_cubes')
+    if path and os.path.exists(path):
+        cubes = CaseCubes.load(path)
+        if cubes.version == source.version:
+            return cubes
+    cubes = CaseCubes.build(source.load(columns=['province', 'epi_week', 'year', 'cases']), source.version)
+    if path:
+        cubes.save(path)
+    return cubes
+
+
+class CubeStore:
+    """The cubes of the current dataset version, shared by every caller.
+
+    Like FeatureStore, ``append`` folds newly ingested weeks in and moves the
+    cubes to the version the source reached instead of rebuilding them.
+    """
+
+    def __init__(self):
+        self.cubes = None
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        with self._lock:
+            if self.cubes is None or self.cubes.version != source.version:
+                self.cubes = build_cubes(source)
+            return self.cubes
+
+    def append(self, rows, version, path=None):
+        """Fold in newly arrived weeks; False (and a rebuild on next get) if they do not fit"""
+        with self._lock:
+            if self.cubes is None:
+                return False
+            try:
+                self.cubes.append(rows, version)
+            except (KeyError, ValueError):
+                self.cubes = None
+                return False
+            if path:
+                self.cubes.save(path)
+            return True
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+
+    parser = argparse.ArgumentParser(description='Aggregate case cubes (province x year x month)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='build and store the cubes of the configured source')
+    show = sub.add_parser('show', help='print the per-province summary of one year')
+    show.add_argument('year', type=int)
+    args = parser.parse_args()
+
+    source = source_from_env()
+    cubes = build_cubes(source)
+    if args.command == 'build':
+        where = source.sidecar_path('case_cubes') or 'memory only (synthetic source)'
+        print(f"{len(cubes.provinces)} provinces x {len(cubes.years)} years x {MONTHS} months -> {where}")
+    else:
+        print(cubes.year_summary(args.year).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,61 @@
+import os
+from datetime import datetime
+
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
 from plotly.subplots import make_subplots
 
+from alerts import (ALERTS_PATH, BASELINE_MULTIPLIER, DEFAULT_RULES, WARNING_PROBABILITY, WATCH_PROBABILITY,
+                    ExceedanceAlerts, describe, evaluate_alerts, exceedance_levels, read_alerts)
+from backtest import Backtester
+from climate_lags import CLIMATE_VARIABLES, MAX_LAG, ClimateLagStore, frame_arrays, lag_correlations
+from cubes import CubeStore
+from datasource import file_signature, fingerprint, source_from_env
+from dlnm import MAX_LAG as DLNM_MAX_LAG, MIN_WEEKS as DLNM_MIN_WEEKS, DLNM_VARIABLES, DlnmStore
+from downsample import downsample_frame, scatter_trace
+from endemic import EndemicStore
+from ensemble import PathStore
+from export import (COMPRESSIONS, FORMATS, alert_frames, export_file, forecast_frames,
+                    surveillance_frames)
+from features import FeatureStore
+from figcache import FigureCache
+from forecasting import HORIZONS, ModelRegistry
+from ingest import WeeklyIngest
+from perf import all_cache_stats, cache_stats, timed_cache_call
+
+# Diagnostics panel: DENGUE_DEBUG=1 or ?debug=1 in the URL
+DEBUG = os.environ.get('DENGUE_DEBUG') == '1'
+
+# Compute and send only the selected tab (DENGUE_LAZY_TABS=0 renders all five on every rerun)
+LAZY_TABS = os.environ.get('DENGUE_LAZY_TABS', '1') != '0'
+
+# Streamlit refuses to serve larger static files; bigger exports fall back to a download button
+STATIC_FILE_LIMIT_MB = 200
+
+# Lag-correlation line (color, dash) of each climate variable
+CORR_STYLES = {
+    'temp_mean': ('#f97316', 'solid'),
+    'humidity': ('#06b6d4', 'solid'),
+    'rainfall_1w': ('#8b5cf6', 'solid'),
+    'rainfall_2w': ('#8b5cf6', 'dash'),
+    'rainfall_4w': ('#8b5cf6', 'dot')
+}
+
+# Forecast interval methods (ensemble.INTERVALS) as offered in the forecast controls
+INTERVAL_LABELS = {
+    'paths': "Sample paths (bootstrapped errors)",
+    'gaussian': "Gaussian (hold-out RMSE)"
+}
+
+TAB_NAMES = [
+    "Forecast & Trends",
+    "Climate Drivers",
+    "Comparative Analysis",
+    "Syndromic Context",
+    "Model Performance"
+]
+
 # ============================================================================
 # PAGE CONFIG & STYLING
 # ============================================================================
@@ -531,366 +581,335 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ============================================================================
-# SYNTHETIC DATA GENERATION
+# DATA & MODELS
 # ============================================================================
 
-@st.cache_data
-def generate_sample_data():
-    """Generate synthetic dengue surveillance data for demonstration"""
-    
-    # Date range: 2022-2024 weekly data
-    start_date = pd.date_range(start='2022-01-03', end='2024-11-11', freq='W-MON')
-    n_weeks = len(start_date)
-    
-    # Provinces with realistic characteristics
-    provinces_info = {
-        'Bangkok': {'baseline': 80, 'amplitude': 60, 'trend': 25},
-        'Chiang Mai': {'baseline': 45, 'amplitude': 35, 'trend': 15},
-        'Phuket': {'baseline': 30, 'amplitude': 25, 'trend': 10},
-        'Khon Kaen': {'baseline': 55, 'amplitude': 40, 'trend': 18},
-        'Songkhla': {'baseline': 40, 'amplitude': 30, 'trend': 12}
-    }
-    
-    data_list = []
-    
-    for province, params in provinces_info.items():
-        # Seasonal pattern with noise
-        weeks_of_year = np.arange(n_weeks) % 52
-        seasonal = params['baseline'] + params['amplitude'] * np.sin(2 * np.pi * weeks_of_year / 52 - np.pi/2)
-        
-        # Add trend and realistic noise
-        trend = np.linspace(0, params['trend'], n_weeks)
-        noise = np.random.normal(0, params['baseline'] * 0.2, n_weeks)
-        
-        # Occasional outbreak spikes
-        outbreak_weeks = np.random.choice(n_weeks, size=5, replace=False)
-        outbreak_factor = np.ones(n_weeks)
-        for week in outbreak_weeks:
-            outbreak_factor[max(0, week-2):min(n_weeks, week+3)] *= np.random.uniform(1.5, 2.5)
-        
-        cases = np.maximum(0, (seasonal + trend + noise) * outbreak_factor).astype(int)
-        
-        # Weather data with realistic patterns
-        temp_mean = 27 + 3 * np.sin(2 * np.pi * weeks_of_year / 52) + np.random.normal(0, 1.5, n_weeks)
-        humidity = 70 + 10 * np.sin(2 * np.pi * weeks_of_year / 52 + np.pi/4) + np.random.normal(0, 5, n_weeks)
-        rainfall = np.maximum(0, 50 + 80 * np.sin(2 * np.pi * weeks_of_year / 52) + np.random.normal(0, 30, n_weeks))
-        
-        # Control diseases
-        chikungunya = np.maximum(0, (seasonal * 0.15 + np.random.normal(0, 5, n_weeks))).astype(int)
-        hfmd = np.maximum(0, 30 + 20 * np.sin(2 * np.pi * weeks_of_year / 52 + np.pi/3) + np.random.normal(0, 8, n_weeks)).astype(int)
-        
-        for i, date in enumerate(start_date):
-            data_list.append({
-                'province': province,
-                'epi_week': date,
-                'year': date.year,
-                'week_num': date.isocalendar()[1],
-                'cases': cases[i],
-                'temp_mean': round(temp_mean[i], 1),
-                'humidity': round(humidity[i], 1),
-                'rainfall': round(rainfall[i], 1),
-                'chikungunya': chikungunya[i],
-                'hfmd': hfmd[i]
-            })
-    
-    return pd.DataFrame(data_list)
+@st.cache_resource
+def get_data_source():
+    """Surveillance backend selected by DENGUE_DATA_SOURCE (synthetic, parquet or mmap)"""
+    return source_from_env()
+
+@st.cache_resource
+def get_feature_store():
+    """Feature matrices for all provinces, built once per dataset version"""
+    return FeatureStore()
+
+@st.cache_resource
+def get_endemic_store():
+    """Week-of-year case quantiles per province, built (or read from beside the data) once per reference window"""
+    return EndemicStore()
+
+@st.cache_resource
+def get_climate_lag_store():
+    """Lag correlations of every province and climate variable, recomputed per feature version"""
+    return ClimateLagStore()
+
+@st.cache_resource
+def get_dlnm_store():
+    """DLNM fit of every province, refitted (warm-started) per feature version"""
+    return DlnmStore()
+
+@st.cache_resource
+def get_cube_store():
+    """Province x year (x month) case cubes, folded forward by the weekly ingest"""
+    return CubeStore()
+
+@st.cache_resource
+def get_path_store():
+    """Forecast sample paths of every province, simulated once per feature version"""
+    return PathStore()
+
+@st.cache_resource
+def get_figure_cache():
+    """Built Plotly figures shared by all sessions, LRU-evicted above DENGUE_FIGURE_CACHE_MB"""
+    return FigureCache()
+
+@st.cache_resource
+def get_ingest():
+    """Weekly ingest that appends new epi-weeks to the shared source and features in place"""
+    return WeeklyIngest(get_data_source(), get_feature_store(), get_cube_store())
+
+@st.cache_resource
+def get_model_registry():
+    """Forecasting boosters, loaded once per process and kept resident"""
+    return ModelRegistry()
+
+def generate_forecast_data(features, province, weeks_ahead=4, intervals='paths'):
+    """Forecast one province from the shared feature matrix, cached without hashing the matrix"""
+    return timed_cache_call(
+        cache_stats('forecast'), _cached_forecast,
+        features.province_version(province), province, weeks_ahead, intervals, _features=features
+    )
+
+@st.cache_data(max_entries=2048)
+def _cached_forecast(province_version, province, weeks_ahead, intervals, _features, _probe):
+    """XGBoost forecast with 95% intervals (Gaussian or sample-path) from the province's resident boosters.
+
+    Only the small leading arguments form the cache key; the feature matrix
+    and the miss probe are underscore arguments, which Streamlit does not hash.
+    The province version changes only when that province ingests a new week,
+    so other provinces' entries stay warm.
+    """
+    _probe.start()
+    model = get_model_registry().get(province, _features)
+    forecast = model.forecast(_features, weeks_ahead, intervals)
+    _probe.stop()
+    return forecast
+
+def generate_batch_forecast(features, provinces, weeks_ahead=1):
+    """Forecast many provinces in one vectorized evaluation, cached like the single-province path"""
+    return timed_cache_call(
+        cache_stats('batch_forecast'), _cached_batch_forecast,
+        features.version, tuple(provinces), weeks_ahead, _features=features
+    )
 
 @st.cache_data
-def generate_forecast_data(historical_df, province, weeks_ahead=4):
-    """Generate sample forecast data with improved realism"""
-    
-    province_data = historical_df[historical_df['province'] == province].copy()
-    last_date = province_data['epi_week'].max()
-    last_cases = province_data[province_data['epi_week'] == last_date]['cases'].values[0]
-    
-    # Get recent trend
-    recent_cases = province_data.tail(8)['cases'].values
-    trend_slope = np.polyfit(range(len(recent_cases)), recent_cases, 1)[0]
-    
-    forecast_dates = pd.date_range(start=last_date + timedelta(weeks=1), periods=weeks_ahead, freq='W-MON')
-    
-    forecasts = []
-    for i, date in enumerate(forecast_dates):
-        # Combine recent value with trend
-        base_pred = last_cases + trend_slope * (i + 1)
-        seasonal_adjust = 1 + 0.1 * np.sin(2 * np.pi * (i + 1) / 52)
-        mean_pred = base_pred * seasonal_adjust + np.random.normal(0, 3)
-        mean_pred = max(0, mean_pred)
-        
-        # Uncertainty increases with forecast horizon
-        uncertainty = 15 + i * 5
-        
-        forecasts.append({
-            'epi_week': date,
-            'predicted_mean': round(mean_pred, 1),
-            'predicted_lower': round(max(0, mean_pred - uncertainty), 1),
-            'predicted_upper': round(mean_pred + uncertainty, 1),
-            'crps': round(8.5 + i * 1.2, 2)
-        })
-    
-    return pd.DataFrame(forecasts)
+def _cached_batch_forecast(dataset_version, provinces, weeks_ahead, _features, _probe):
+    """Long forecast table (province x horizon) from the stacked compiled forests"""
+    _probe.start()
+    forecast = get_model_registry().batch(list(provinces), _features).forecast(_features, weeks_ahead)
+    _probe.stop()
+    return forecast
+
+@st.cache_resource
+def get_backtester():
+    """Blocked forward-chaining backtests, cached on disk per dataset version and model config"""
+    return Backtester()
+
+def calculate_performance_metrics(features, province, horizon):
+    """Out-of-sample backtest metrics of one province at one horizon"""
+    backtester = get_backtester()
+    metrics = backtester.metrics(features.base_version, province)
+    if metrics is None:
+        # Not precomputed (python backtest.py run): backtest this province once
+        with st.spinner(f"Backtesting {province}..."):
+            backtester.run(features, [province], workers=1)
+        metrics = backtester.metrics(features.base_version, province)
+    return metrics[horizon]
 
 @st.cache_data
-def calculate_performance_metrics(province):
-    """Calculate model performance metrics"""
-    metrics = {
-        'Bangkok': {'MAE': 12.4, 'RMSE': 18.7, 'R2': 0.78, 'MedAE': 9.2, 'MAPE': 15.3, 'Correlation': 0.89},
-        'Chiang Mai': {'MAE': 8.9, 'RMSE': 13.2, 'R2': 0.82, 'MedAE': 6.8, 'MAPE': 12.7, 'Correlation': 0.91},
-        'Phuket': {'MAE': 6.5, 'RMSE': 9.8, 'R2': 0.76, 'MedAE': 5.1, 'MAPE': 14.8, 'Correlation': 0.87},
-        'Khon Kaen': {'MAE': 10.2, 'RMSE': 15.4, 'R2': 0.80, 'MedAE': 7.9, 'MAPE': 13.9, 'Correlation': 0.90},
-        'Songkhla': {'MAE': 7.8, 'RMSE': 11.6, 'R2': 0.79, 'MedAE': 6.2, 'MAPE': 13.2, 'Correlation': 0.88}
-    }
-    return metrics.get(province, metrics['Bangkok'])
-
-def create_risk_alert(current_cases, forecast_mean, historical_avg):
-    """Generate risk alert based on case counts"""
-    if current_cases > historical_avg * 1.5 or forecast_mean > historical_avg * 1.5:
-        return "warning", "Elevated Risk", "Cases above seasonal average"
-    elif forecast_mean > current_cases * 1.2:
-        return "info", "Increasing Trend", "Forecasted rise in cases"
-    else:
-        return "success", "Stable", "Cases within expected range"
+def load_alerts(path, signature):
+    """Batch alert table written by `python alerts.py run` (re-read whenever the file changes)"""
+    return read_alerts(path)
+
+def precomputed_alert(dataset_version, province):
+    """(type, title, message) from the batch alert file, or None if it is missing or stale"""
+    if not os.path.exists(ALERTS_PATH):
+        return None
+    alerts, metadata = load_alerts(ALERTS_PATH, file_signature(ALERTS_PATH))
+    if metadata.get('dataset_version') != dataset_version or province not in alerts.index:
+        return None
+    return describe(alerts.at[province, 'level'])
+
+def create_risk_alert(current_cases, forecast_mean, seasonal_median):
+    """Generate risk alert from case counts and the endemic channel median of the current week"""
+    return describe(DEFAULT_RULES.classify(current_cases, forecast_mean, seasonal_median))
 
 # ============================================================================
-# MAIN DASHBOARD
+# EXPORT
 # ============================================================================
 
-def main():
-    
-    # Load data
-    df = generate_sample_data()
-    
-    # ========================================================================
-    # SIDEBAR
-    # ========================================================================
-    
-    with st.sidebar:
-        # Header title with Thailand flag
-        st.markdown("<h1 style='font-size: 1.75rem; font-weight: 700; margin: 0.25rem 0 0.5rem 0;'>🇹🇭 Dengue EWS</h1>", unsafe_allow_html=True)
-        st.markdown("<p style='color: #6b6b6b; font-size: 0.95rem; margin: 0;'>Thailand Province-Level Forecasting</p>", unsafe_allow_html=True)
-        st.markdown("---")
-        
-        # Province selector
-        province_icons = {}
-        
-        st.markdown("### Location")
-        province = st.selectbox(
-            "Province",
-            options=sorted(df['province'].unique()),
-            format_func=lambda x: x,
-            label_visibility="collapsed"
-        )
-        
-        # Time range with two dropdowns
-        st.markdown("### Time Range")
-        years = sorted(df['year'].unique())
-        col1, col2 = st.columns(2)
-        with col1:
-            start_year = st.selectbox(
-                "Start Year",
-                options=years,
-                index=len(years)-2,
-                label_visibility="collapsed"
-            )
-        with col2:
-            end_year = st.selectbox(
-                "End Year",
-                options=years,
-                index=len(years)-1,
-                label_visibility="collapsed"
+def alert_table(source, features, channel):
+    """The batch alert file when it matches this dataset, otherwise alerts evaluated now"""
+    if os.path.exists(ALERTS_PATH):
+        alerts, metadata = load_alerts(ALERTS_PATH, file_signature(ALERTS_PATH))
+        if metadata.get('dataset_version') == source.version:
+            return alerts
+    return evaluate_alerts(features, get_model_registry(), channel)
+
+def prepare_export(what, fmt, compression, source, features, channel, province, year_range):
+    """Path of the requested export, streamed to disk in batches (reused if already written)"""
+    if what == 'view':
+        name = f"surveillance-{fingerprint(features.province_version(province), year_range)}"
+        frames = surveillance_frames(source, [province], year_range)
+    elif what == 'national':
+        name = f"surveillance-{fingerprint(source.version, year_range)}"
+        frames = surveillance_frames(source, years=year_range)
+    elif what == 'forecasts':
+        horizon = st.session_state.get('horizon', 4)
+        intervals = st.session_state.get('interval_method', 'paths')
+        name = f"forecasts-{fingerprint(features.version, horizon, intervals)}"
+        frames = forecast_frames(features, get_model_registry(), horizon, intervals=intervals)
+    else:
+        name = f"alerts-{fingerprint(source.version)}"
+        frames = alert_frames(alert_table(source, features, channel))
+    return export_file(name, frames, fmt, compression)
+
+def read_export(path):
+    """Bytes of a written export, for the in-memory download fallback"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def render_export_menu(source, features, channel, province, year_range):
+    """Export options and a link to the written file, served from disk by Streamlit"""
+    options = {
+        'view': f"{province}, {year_range[0]}–{year_range[1]}",
+        'national': f"All provinces, {year_range[0]}–{year_range[1]}",
+        'forecasts': "Forecasts, all provinces",
+        'alerts': "Alerts, all provinces"
+    }
+    what = st.radio("Data", list(options), format_func=options.get, key="export_what")
+    fmt = st.radio("Format", list(FORMATS), format_func=str.upper, horizontal=True, key="export_format")
+    compression = st.selectbox(
+        "Compression", list(COMPRESSIONS), key="export_compression",
+        help="Parquet compresses inside the file; CSV is wrapped in .gz or .zst"
+    )
+    if st.button("Prepare file", key="export_prepare", use_container_width=True):
+        with st.spinner("Writing export..."):
+            st.session_state.export_path = prepare_export(
+                what, fmt, compression, source, features, channel, province, year_range
             )
-        year_range = (start_year, end_year)
-        
-        # Forecast settings with button options
-        st.markdown("### Forecast Horizon")
-        
-        # Create 4 columns for week buttons
-        cols = st.columns(4)
-        horizon_options = [2, 4, 6, 8]
-        
-        # Initialize session state for selected horizon
-        if 'horizon' not in st.session_state:
-            st.session_state.horizon = 4
-        
-        # Display buttons
-        for i, weeks in enumerate(horizon_options):
-            with cols[i]:
-                if st.button(f"{weeks}w", key=f"horizon_{weeks}", use_container_width=True):
-                    st.session_state.horizon = weeks
-        
-        horizon = st.session_state.horizon
-        
-        # Show selected value in red
-        st.markdown(f"<p style='color: #6b6b6b; font-size: 0.875rem; margin-top: 0.5rem;'>Selected: <span style='color: #ef4444; font-weight: 600;'>{horizon} weeks</span></p>", unsafe_allow_html=True)
-        
-        # Toggle for prediction intervals
-        show_uncertainty = st.toggle("Prediction intervals", value=True)
-        
-        # Model info with cleaner design
-        st.markdown("---")
-        st.markdown("""
-        <div style='background: #fafafa; padding: 1.25rem; border-radius: 8px; border: 1px solid #e8e8e8;'>
-            <p style='font-size: 0.7rem; font-weight: 700; color: #9b9b9b; text-transform: uppercase; letter-spacing: 0.12em; margin: 0 0 0.75rem 0;'>MODEL</p>
-            <div style='display: flex; align-items: baseline; gap: 0.5rem; margin-bottom: 0.75rem;'>
-                <p style='font-size: 1.25rem; font-weight: 600; margin: 0; color: #1a1a1a;'>XGBoost</p>
-                <span style='background: #1a1a1a; color: white; padding: 0.2rem 0.5rem; border-radius: 4px; font-size: 0.7rem; font-weight: 600;'>v2.3</span>
-            </div>
-            <p style='color: #b5b5b5; font-size: 0.8rem; margin: 0;'>Updated {}</p>
-        </div>
-        """.format(datetime.now().strftime('%b %d, %Y')), unsafe_allow_html=True)
-        
-        # Actions - Icons in one line
-        st.markdown("---")
-        
-        action_col1, action_col2 = st.columns([1, 1])
-        with action_col1:
-            if st.button("Refresh", key="refresh_btn", use_container_width=True, help="Refresh Data"):
-                st.cache_data.clear()
-                st.rerun()
-        with action_col2:
-            st.button("Export", key="export_btn", use_container_width=True, help="Export CSV")
-        
-        # Footer with improved styling
-        st.markdown("---")
-        st.markdown("<p style='font-size: 0.75rem; font-weight: 700; color: #6b6b6b; text-transform: uppercase; letter-spacing: 0.1em; margin-bottom: 0.5rem;'>Data Sources</p>", unsafe_allow_html=True)
-        st.markdown("<p style='color: #9b9b9b; font-size: 0.875rem; margin: 0;'>MoPH DDC · TMD · GEE</p>", unsafe_allow_html=True)
-    
-    # ========================================================================
-    # MAIN CONTENT
-    # ========================================================================
-    
-    # Header with gradient background
-    st.markdown(f"""
-    <div class="header-gradient">
-        <h1 style="font-weight: 600;">{province}</h1>
-        <p style="font-size: 1.1rem; margin: 0.5rem 0 0 0; color: #6b6b6b; font-weight: 500;">
-            Dengue Early Warning & Forecasting System
-        </p>
-        <p style="margin: 0.25rem 0 0 0; color: #9b9b9b; font-size: 0.9rem;">
-            Retrospective assessment and cross-validated prediction
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Filter data
-    province_df = df[
-        (df['province'] == province) & 
-        (df['year'] >= year_range[0]) & 
-        (df['year'] <= year_range[1])
-    ].copy()
-    
-    # Generate forecast
-    forecast_df = generate_forecast_data(df, province, weeks_ahead=horizon)
-    
-    # Calculate risk alert
-    historical_avg = province_df['cases'].mean()
-    current_cases = province_df.iloc[-1]['cases']
-    forecast_mean = forecast_df.iloc[0]['predicted_mean']
-    alert_type, alert_title, alert_message = create_risk_alert(current_cases, forecast_mean, historical_avg)
-    
-    # Show alert
-    st.markdown(f"""
-    <div class="alert alert-{alert_type}">
-        <strong>{alert_title}</strong> — {alert_message}
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # ========================================================================
-    # KPI METRICS ROW with Enhanced Design
-    # ========================================================================
-    
-    st.markdown("")
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    # Current week cases
-    current_cases = province_df.iloc[-1]['cases']
-    prev_cases = province_df.iloc[-2]['cases']
-    delta_cases = current_cases - prev_cases
-    delta_pct = (delta_cases / prev_cases * 100) if prev_cases > 0 else 0
-    
-    with col1:
-        st.metric(
-            label="Current Week",
-            value=f"{current_cases:,}",
-            delta=f"{delta_cases:+.0f} ({delta_pct:+.1f}%)",
-            delta_color="inverse"
-        )
-    
-    # 4-week average
-    avg_4week = province_df.tail(4)['cases'].mean()
-    avg_prev_4week = province_df.iloc[-8:-4]['cases'].mean()
-    delta_avg = avg_4week - avg_prev_4week
-    
-    with col2:
-        st.metric(
-            label="4-Week Avg",
-            value=f"{avg_4week:.0f}",
-            delta=f"{delta_avg:+.1f}",
-            delta_color="inverse"
-        )
-    
-    # Next week prediction
-    next_week_pred = forecast_df.iloc[0]['predicted_mean']
-    pred_change = next_week_pred - current_cases
-    pred_change_pct = (pred_change / current_cases * 100) if current_cases > 0 else 0
-    
-    with col3:
-        st.metric(
-            label="Next Week",
-            value=f"{next_week_pred:.0f}",
-            delta=f"{pred_change:+.0f} ({pred_change_pct:+.1f}%)",
-            delta_color="inverse"
+
+    path = st.session_state.get('export_path')
+    if not path or not os.path.exists(path):
+        return
+    name = os.path.basename(path)
+    size_mb = os.path.getsize(path) / 1024 ** 2
+    if st.get_option('server.enableStaticServing') and size_mb <= STATIC_FILE_LIMIT_MB:
+        st.link_button(f"Download {name}", f"app/static/exports/{name}", use_container_width=True)
+    else:
+        # Without static serving Streamlit holds the file in memory while it is downloaded
+        st.download_button(
+            f"Download {name}", data=lambda: read_export(path), file_name=name,
+            on_click='ignore', use_container_width=True
         )
-    
-    # Peak this year
-    peak_2024 = province_df[province_df['year'] == year_range[1]]['cases'].max()
-    peak_week = province_df[province_df['year'] == year_range[1]]['cases'].idxmax()
-    
-    with col4:
-        st.metric(
-            label=f"{year_range[1]} Peak",
-            value=f"{peak_2024:,}",
-            delta=f"Week {province_df.loc[peak_week, 'week_num']}" if peak_week in province_df.index else None,
-            delta_color="off"
+    st.caption(f"{size_mb:.1f} MB")
+
+# ============================================================================
+# TABS
+# ============================================================================
+
+def render_forecast_controls():
+    """Horizon buttons and interval controls; returns (horizon, show_uncertainty, intervals)"""
+    # Create 4 columns for week buttons
+    cols = st.columns(4)
+    horizon_options = [2, 4, 6, 8]
+    
+    # Initialize session state for selected horizon
+    if 'horizon' not in st.session_state:
+        st.session_state.horizon = 4
+    
+    # Display buttons
+    for i, weeks in enumerate(horizon_options):
+        with cols[i]:
+            if st.button(f"{weeks}w", key=f"horizon_{weeks}", use_container_width=True):
+                st.session_state.horizon = weeks
+    
+    horizon = st.session_state.horizon
+    
+    # Show selected value in red
+    st.markdown(f"<p style='color: #6b6b6b; font-size: 0.875rem; margin-top: 0.5rem;'>Selected: <span style='color: #ef4444; font-weight: 600;'>{horizon} weeks</span></p>", unsafe_allow_html=True)
+    
+    # Toggle for prediction intervals
+    show_uncertainty = st.toggle("Prediction intervals", value=True, key="show_uncertainty")
+    intervals = st.radio(
+        "Interval method",
+        list(INTERVAL_LABELS),
+        format_func=INTERVAL_LABELS.get,
+        key="interval_method",
+        disabled=not show_uncertainty
+    )
+    return horizon, show_uncertainty, intervals
+
+
+def render_forecast_tab(province, province_df, features, channel, data_key):
+    """Forecast tab layout with outbreak probabilities and trend analysis; returns the slot of the forecast chart"""
+    st.markdown("### Weekly Dengue Cases & Forecast")
+    st.caption("Historical observations with model predictions and uncertainty intervals")
+    
+    chart = st.container()
+    render_outbreak_probability(features, channel, province)
+    render_trend_analysis(province_df, data_key)
+    return chart
+
+
+@st.fragment
+def render_outbreak_probability(features, channel, province):
+    """P(cases > multiplier x seasonal median) for every province and horizon from the forecast sample paths.
+
+    The paths are simulated once per feature version; moving the multiplier
+    reruns only this fragment and re-reads them.
+    """
+    st.markdown("#### Outbreak Probability")
+    multiplier = st.slider(
+        "Threshold (× seasonal median)",
+        min_value=1.0, max_value=3.0, value=BASELINE_MULTIPLIER, step=0.1,
+        key="exceedance_multiplier"
+    )
+    with st.spinner("Simulating forecast paths..."):
+        paths = get_path_store().get(features, get_model_registry(), len(HORIZONS))
+    exceedance = ExceedanceAlerts(paths, channel)
+    probabilities = exceedance.probabilities(multiplier)
+    levels = exceedance_levels(probabilities)
+    
+    at_warning = int((levels.max(axis=1) == 2).sum())
+    origins = int(paths.origins[paths.index[province]])
+    st.caption(f"Probability that weekly cases exceed {multiplier:.1f}× the endemic channel median of the target week. "
+               f"{at_warning} of {len(paths.provinces)} provinces reach ≥{WARNING_PROBABILITY:.0%} within "
+               f"{len(HORIZONS)} weeks. {province}'s paths resample {origins} hold-out forecast origins, "
+               f"so its probabilities move in steps of about {1 / max(origins, 1):.0%}.")
+    key = (features.version, channel.version, multiplier)
+    
+    def build_province_bars():
+        i = paths.index[province]
+        colors = {0: '#22c55e', 1: '#3b82f6', 2: '#ef4444'}
+        fig_bars = go.Figure(go.Bar(
+            x=paths.horizons,
+            y=probabilities[i],
+            marker=dict(color=[colors[level] for level in levels[i]]),
+            customdata=exceedance.baseline[i] * multiplier,
+            hovertemplate='<b>%{x} weeks ahead</b><br>P = %{y:.0%}<br>Threshold: %{customdata:.0f} cases<extra></extra>'
+        ))
+        for probability in (WATCH_PROBABILITY, WARNING_PROBABILITY):
+            fig_bars.add_hline(y=probability, line_dash="dot", line_color="#9b9b9b", line_width=1)
+        fig_bars.update_layout(
+            title=province,
+            title_font=dict(size=14),
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#0a0a0a'),
+            xaxis=dict(title='Weeks ahead', dtick=1),
+            yaxis=dict(title='Exceedance probability', range=[0, 1], tickformat='.0%', gridcolor='#f0f0f0'),
+            height=350,
+            margin=dict(l=60, r=30, t=50, b=50)
         )
-    
-    # Year-to-date total
-    ytd_total = province_df[province_df['year'] == year_range[1]]['cases'].sum()
-    ytd_prev = province_df[province_df['year'] == year_range[1]-1]['cases'].sum() if year_range[1] > year_range[0] else ytd_total
-    ytd_change = ((ytd_total - ytd_prev) / ytd_prev * 100) if ytd_prev > 0 else 0
-    
-    with col5:
-        st.metric(
-            label=f"{year_range[1]} Total",
-            value=f"{ytd_total:,}",
-            delta=f"{ytd_change:+.1f}% vs {year_range[1]-1}",
-            delta_color="inverse"
+        return fig_bars
+    
+    def build_national():
+        fig_national = go.Figure(data=go.Heatmap(
+            z=probabilities,
+            x=paths.horizons,
+            y=paths.provinces,
+            colorscale='Reds',
+            zmin=0,
+            zmax=1,
+            hovertemplate='<b>%{y}</b><br>%{x} weeks ahead<br>P = %{z:.0%}<extra></extra>',
+            colorbar=dict(title="P", tickformat='.0%')
+        ))
+        fig_national.update_layout(
+            title='All Provinces',
+            title_font=dict(size=14),
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#0a0a0a'),
+            xaxis=dict(title='Weeks ahead', dtick=1),
+            yaxis=dict(autorange='reversed'),
+            height=max(350, 14 * len(paths.provinces) + 100),
+            margin=dict(l=150, r=30, t=50, b=50)
         )
+        return fig_national
     
-    st.markdown("---")
-    
-    # ========================================================================
-    # TABS FOR ORGANIZED CONTENT
-    # ========================================================================
-    
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "Forecast & Trends",
-        "Climate Drivers", 
-        "Comparative Analysis",
-        "Syndromic Context",
-        "Model Performance"
-    ])
-    
-    # ========================================================================
-    # TAB 1: FORECAST VISUALIZATION
-    # ========================================================================
-    
-    with tab1:
-        st.markdown("### Weekly Dengue Cases & Forecast")
-        st.caption("Historical observations with model predictions and uncertainty intervals")
-        
-        # Prepare plot data
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(get_figure_cache().get(('exceedance', province) + key, build_province_bars), use_container_width=True)
+    with col2:
+        st.plotly_chart(get_figure_cache().get(('exceedance_national',) + key, build_national), use_container_width=True)
+
+
+def render_forecast_chart(province, province_df, forecast_df, channel, show_uncertainty, intervals, data_key):
+    """Observed cases, forecast, prediction interval and seasonal alert threshold"""
+    # Prepare plot data
+    def build_forecast():
         historical_plot = province_df.tail(52).copy()  # Last year
         
         fig = go.Figure()
@@ -930,15 +949,17 @@ def main():
                 hoverinfo='skip'
             ))
         
-        # Add threshold line
-        threshold = historical_avg * 1.5
-        fig.add_hline(
+        # Alert threshold: a multiple of the endemic channel median of each week of the year
+        threshold_weeks = pd.concat([historical_plot['epi_week'], forecast_df['epi_week']], ignore_index=True)
+        threshold = channel.lookup(province, pd.DatetimeIndex(threshold_weeks).isocalendar().week.to_numpy()) * DEFAULT_RULES.baseline_multiplier
+        fig.add_trace(go.Scatter(
+            x=threshold_weeks,
             y=threshold,
-            line_dash="dot",
-            line_color="rgba(255, 165, 0, 0.5)",
-            annotation_text=f"Alert Threshold ({threshold:.0f})",
-            annotation_position="right"
-        )
+            mode='lines',
+            name=f'Alert Threshold ({DEFAULT_RULES.baseline_multiplier:g}x seasonal median)',
+            line=dict(color='rgba(255, 165, 0, 0.6)', width=2, dash='dot', shape='hv'),
+            hovertemplate='<b>Week:</b> %{x|%Y-%m-%d}<br><b>Threshold:</b> %{y:.0f}<extra></extra>'
+        ))
         
         fig.update_layout(
             plot_bgcolor='#ffffff',
@@ -975,15 +996,24 @@ def main():
             margin=dict(l=70, r=30, t=80, b=70),
             height=500
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Time series decomposition view
-        st.markdown("#### Trend Analysis")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Rolling average
+        return fig
+    
+    fig = get_figure_cache().get(
+        ('forecast', data_key, channel.version, len(forecast_df), show_uncertainty and intervals), build_forecast
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def render_trend_analysis(province_df, data_key):
+    """Moving averages and week-over-week changes of the last year"""
+    # Time series decomposition view
+    st.markdown("#### Trend Analysis")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Rolling average
+        def build_rolling():
             fig_rolling = go.Figure()
             
             recent_data = province_df.tail(52)
@@ -1027,11 +1057,15 @@ def main():
                 margin=dict(l=50, r=20, t=40, b=60),
                 height=300
             )
-            
-            st.plotly_chart(fig_rolling, use_container_width=True)
+            return fig_rolling
         
-        with col2:
-            # Week-over-week changes
+        fig_rolling = get_figure_cache().get(('rolling', data_key), build_rolling)
+        
+        st.plotly_chart(fig_rolling, use_container_width=True)
+    
+    with col2:
+        # Week-over-week changes
+        def build_change():
             fig_change = go.Figure()
             
             recent_data = province_df.tail(26)
@@ -1060,18 +1094,20 @@ def main():
                 margin=dict(l=50, r=20, t=40, b=60),
                 height=300
             )
-            
-            st.plotly_chart(fig_change, use_container_width=True)
-    
-    # ========================================================================
-    # TAB 2: CLIMATE CONTEXT
-    # ========================================================================
-    
-    with tab2:
-        st.markdown("### Climate Drivers & Environmental Context")
-        st.caption("Meteorological variables at weekly resolution aligned with epidemiological data")
+            return fig_change
         
-        # Combined climate visualization
+        fig_change = get_figure_cache().get(('change', data_key), build_change)
+        
+        st.plotly_chart(fig_change, use_container_width=True)
+
+
+def render_climate_tab(province, province_df, features, data_key):
+    """Climate series, current conditions, climate-dengue lag correlation and DLNM surfaces"""
+    st.markdown("### Climate Drivers & Environmental Context")
+    st.caption("Meteorological variables at weekly resolution aligned with epidemiological data")
+    
+    # Combined climate visualization
+    def build_climate():
         recent_climate = province_df.tail(52)
         
         fig_climate = make_subplots(
@@ -1136,105 +1172,92 @@ def main():
             height=700,
             margin=dict(l=60, r=30, t=60, b=40)
         )
-        
-        st.plotly_chart(fig_climate, use_container_width=True)
-        
-        # Climate summary cards
-        st.markdown("#### Current Climate Conditions")
-        col1, col2, col3, col4 = st.columns(4)
-        
-        current_temp = province_df.iloc[-1]['temp_mean']
-        avg_temp = province_df['temp_mean'].mean()
-        
-        with col1:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">Temperature</p>
-                <p class="stat-value">{current_temp:.1f}°C</p>
-                <p class="stat-change {'positive' if current_temp > avg_temp else 'negative'}">
-                    {current_temp - avg_temp:+.1f}°C vs avg
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        current_humidity = province_df.iloc[-1]['humidity']
-        avg_humidity = province_df['humidity'].mean()
-        
-        with col2:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">Humidity</p>
-                <p class="stat-value">{current_humidity:.1f}%</p>
-                <p class="stat-change {'positive' if current_humidity > avg_humidity else 'negative'}">
-                    {current_humidity - avg_humidity:+.1f}% vs avg
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        current_rainfall = province_df.iloc[-1]['rainfall']
-        avg_rainfall = province_df['rainfall'].mean()
-        
-        with col3:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">Rainfall (Week)</p>
-                <p class="stat-value">{current_rainfall:.0f}mm</p>
-                <p class="stat-change {'positive' if current_rainfall > avg_rainfall else 'negative'}">
-                    {current_rainfall - avg_rainfall:+.0f}mm vs avg
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        monthly_rainfall = province_df.tail(4)['rainfall'].sum()
-        
-        with col4:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">4-Week Rainfall</p>
-                <p class="stat-value">{monthly_rainfall:.0f}mm</p>
-                <p class="stat-change" style="color: #6b6b6b;">
-                    Cumulative
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Cross-correlation analysis
-        st.markdown("#### Climate-Dengue Correlation")
-        
-        # Calculate correlations at different lags
-        lags = range(0, 9)
-        temp_corr = [province_df['cases'].corr(province_df['temp_mean'].shift(lag)) for lag in lags]
-        humid_corr = [province_df['cases'].corr(province_df['humidity'].shift(lag)) for lag in lags]
-        rain_corr = [province_df['cases'].corr(province_df['rainfall'].shift(lag)) for lag in lags]
+        return fig_climate
+    
+    fig_climate = get_figure_cache().get(('climate', data_key), build_climate)
+    
+    st.plotly_chart(fig_climate, use_container_width=True)
+    
+    # Climate summary cards
+    st.markdown("#### Current Climate Conditions")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    current_temp = province_df.iloc[-1]['temp_mean']
+    avg_temp = province_df['temp_mean'].mean()
+    
+    with col1:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">Temperature</p>
+            <p class="stat-value">{current_temp:.1f}°C</p>
+            <p class="stat-change {'positive' if current_temp > avg_temp else 'negative'}">
+                {current_temp - avg_temp:+.1f}°C vs avg
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    current_humidity = province_df.iloc[-1]['humidity']
+    avg_humidity = province_df['humidity'].mean()
+    
+    with col2:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">Humidity</p>
+            <p class="stat-value">{current_humidity:.1f}%</p>
+            <p class="stat-change {'positive' if current_humidity > avg_humidity else 'negative'}">
+                {current_humidity - avg_humidity:+.1f}% vs avg
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    current_rainfall = province_df.iloc[-1]['rainfall']
+    avg_rainfall = province_df['rainfall'].mean()
+    
+    with col3:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">Rainfall (Week)</p>
+            <p class="stat-value">{current_rainfall:.0f}mm</p>
+            <p class="stat-change {'positive' if current_rainfall > avg_rainfall else 'negative'}">
+                {current_rainfall - avg_rainfall:+.0f}mm vs avg
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    monthly_rainfall = province_df.tail(4)['rainfall'].sum()
+    
+    with col4:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">4-Week Rainfall</p>
+            <p class="stat-value">{monthly_rainfall:.0f}mm</p>
+            <p class="stat-change" style="color: #6b6b6b;">
+                Cumulative
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Cross-correlation analysis
+    st.markdown("#### Climate-Dengue Correlation")
+    
+    # r at lags 0-26 for every climate variable, one batched FFT pass over the selected years
+    def build_corr():
+        cases, climate = frame_arrays(province_df)
+        corr = lag_correlations(cases, climate, MAX_LAG)
+        lags = list(range(MAX_LAG + 1))
         
         fig_corr = go.Figure()
         
-        fig_corr.add_trace(go.Scatter(
-            x=list(lags),
-            y=temp_corr,
-            mode='lines+markers',
-            name='Temperature',
-            line=dict(color='#f97316', width=2.5),
-            marker=dict(size=8, color='#f97316')
-        ))
-        
-        fig_corr.add_trace(go.Scatter(
-            x=list(lags),
-            y=humid_corr,
-            mode='lines+markers',
-            name='Humidity',
-            line=dict(color='#06b6d4', width=2.5),
-            marker=dict(size=8, color='#06b6d4')
-        ))
-        
-        fig_corr.add_trace(go.Scatter(
-            x=list(lags),
-            y=rain_corr,
-            mode='lines+markers',
-            name='Rainfall',
-            line=dict(color='#8b5cf6', width=2.5),
-            marker=dict(size=8, color='#8b5cf6')
-        ))
+        for (name, label), values in zip(CLIMATE_VARIABLES.items(), corr):
+            color, dash = CORR_STYLES[name]
+            fig_corr.add_trace(go.Scatter(
+                x=lags,
+                y=values,
+                mode='lines+markers',
+                name=label,
+                line=dict(color=color, width=2.5, dash=dash),
+                marker=dict(size=5, color=color)
+            ))
         
         fig_corr.add_hline(y=0, line_dash="dot", line_color="#9b9b9b", line_width=1)
         
@@ -1249,36 +1272,176 @@ def main():
                 gridcolor='#f0f0f0',
                 showline=True,
                 linecolor='#e0e0e0',
-                dtick=1
+                dtick=2
             ),
             yaxis=dict(
                 title='Correlation Coefficient',
                 gridcolor='#f0f0f0',
                 showline=True,
                 linecolor='#e0e0e0',
-                range=[-0.5, 0.8]
+                range=[-1, 1]
             ),
             legend=dict(orientation='h', yanchor='top', y=-0.15, xanchor='left', x=0),
             height=350,
             margin=dict(l=60, r=30, t=50, b=80)
         )
-        
-        st.plotly_chart(fig_corr, use_container_width=True)
+        return fig_corr
     
-    # ========================================================================
-    # TAB 3: COMPARATIVE ANALYSIS
-    # ========================================================================
+    fig_corr = get_figure_cache().get(('corr', data_key), build_corr)
     
-    with tab3:
-        st.markdown("### Multi-Province Comparison")
-        st.caption("Comparative epidemiological trends across Thailand provinces")
-        
-        # Get recent data for all provinces
-        recent_year = year_range[1]
-        all_provinces_data = df[df['year'] == recent_year].copy()
-        
-        # Time series comparison
-        st.markdown(f"#### Weekly Cases Comparison ({recent_year})")
+    st.plotly_chart(fig_corr, use_container_width=True)
+    
+    # National view: the lag of the strongest correlation, full history of every province
+    st.markdown("#### Optimal Lag by Province")
+    st.caption(f"Lag (weeks) with the strongest correlation to cases over the full record, searched over 0–{MAX_LAG} weeks")
+    climate_lags = get_climate_lag_store().get(features)
+    
+    def build_lag_heatmap():
+        best_lag, best_r = climate_lags.optimal()
+        fig_lags = go.Figure(data=go.Heatmap(
+            z=best_lag.values,
+            x=list(best_lag.columns),
+            y=list(best_lag.index),
+            customdata=best_r.values,
+            colorscale='Viridis',
+            zmin=0,
+            zmax=MAX_LAG,
+            hovertemplate='<b>%{y}</b><br>%{x}<br>Lag: %{z} weeks<br>r = %{customdata:.2f}<extra></extra>',
+            colorbar=dict(title="Lag (weeks)")
+        ))
+        fig_lags.update_layout(
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#0a0a0a'),
+            yaxis=dict(title='Province', autorange='reversed'),
+            height=max(350, 14 * len(best_lag) + 100),
+            margin=dict(l=150, r=100, t=30, b=50)
+        )
+        return fig_lags
+    
+    fig_lags = get_figure_cache().get(('lag_heatmap', climate_lags.version), build_lag_heatmap)
+    
+    st.plotly_chart(fig_lags, use_container_width=True)
+    
+    render_dlnm_surfaces(features, province)
+
+
+@st.fragment
+def render_dlnm_surfaces(features, province):
+    """Exposure-lag-response surface and cumulative relative risk of one climate variable.
+
+    The DLNM fit covers every province and is refreshed per feature
+    version; switching the variable reruns only this fragment.
+    """
+    st.markdown("#### Exposure-Lag-Response (DLNM)")
+    st.caption(f"Relative risk of cases against the median exposure, lags 0–{DLNM_MAX_LAG} weeks, "
+               "adjusted for season and trend across the full record")
+    variable = st.radio(
+        "Climate variable",
+        list(DLNM_VARIABLES),
+        format_func=lambda name: DLNM_VARIABLES[name][1],
+        horizontal=True,
+        key="dlnm_variable",
+        label_visibility="collapsed"
+    )
+    fit = get_dlnm_store().get(features)
+    if not fit.fitted(province):
+        st.info(f"Insufficient history for {province}: the DLNM needs at least {DLNM_MIN_WEEKS} weeks "
+                f"with every lag (0–{DLNM_MAX_LAG}) observed.")
+        return
+    column, label = DLNM_VARIABLES[variable]
+    color = CORR_STYLES[column][0]
+    
+    def build_surface():
+        grid, lags, rr = fit.surface(province, variable)
+        fig_surface = go.Figure(data=go.Heatmap(
+            z=rr,
+            x=lags,
+            y=grid,
+            colorscale='RdBu_r',
+            zmid=1,
+            hovertemplate=f'{label}: %{{y:.1f}}<br>Lag: %{{x}} weeks<br>RR = %{{z:.3f}}<extra></extra>',
+            colorbar=dict(title="RR")
+        ))
+        fig_surface.update_layout(
+            title='Relative Risk by Exposure and Lag',
+            title_font=dict(size=14),
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#0a0a0a'),
+            xaxis=dict(title='Lag (weeks)', dtick=2),
+            yaxis=dict(title=label),
+            height=380,
+            margin=dict(l=60, r=30, t=50, b=50)
+        )
+        return fig_surface
+    
+    def build_cumulative():
+        overall = fit.cumulative(province, variable)
+        fig_overall = go.Figure()
+        fig_overall.add_trace(go.Scatter(
+            x=pd.concat([overall['exposure'], overall['exposure'][::-1]]),
+            y=pd.concat([overall['upper'], overall['lower'][::-1]]),
+            fill='toself',
+            fillcolor='rgba(107, 107, 107, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            name='95% CI'
+        ))
+        fig_overall.add_trace(go.Scatter(
+            x=overall['exposure'],
+            y=overall['rr'],
+            mode='lines',
+            name='Cumulative RR',
+            line=dict(color=color, width=2.5),
+            hovertemplate=f'{label}: %{{x:.1f}}<br>RR = %{{y:.3f}}<extra></extra>'
+        ))
+        fig_overall.add_hline(y=1, line_dash="dot", line_color="#9b9b9b", line_width=1)
+        fig_overall.update_layout(
+            title=f'Cumulative Relative Risk over Lags 0–{DLNM_MAX_LAG}',
+            title_font=dict(size=14),
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#0a0a0a'),
+            xaxis=dict(title=label, gridcolor='#f0f0f0', showline=True, linecolor='#e0e0e0'),
+            yaxis=dict(title='Relative Risk', type='log', gridcolor='#f0f0f0', showline=True, linecolor='#e0e0e0'),
+            showlegend=False,
+            height=380,
+            margin=dict(l=60, r=30, t=50, b=50)
+        )
+        return fig_overall
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(get_figure_cache().get(('dlnm_surface', fit.version, province, variable), build_surface),
+                        use_container_width=True)
+    with col2:
+        st.plotly_chart(get_figure_cache().get(('dlnm_cumulative', fit.version, province, variable), build_cumulative),
+                        use_container_width=True)
+
+
+@st.fragment
+def render_multi_province_chart(source, year_range):
+    """Weekly cases of every province over the selected years.
+
+    Above the point budget the series are LTTB-downsampled and drawn with
+    WebGL; box-selecting a period reloads just that window at full
+    resolution. Zooming reruns only this fragment.
+    """
+    dataset_key = (source.version, year_range)
+    zoom = st.session_state.get('multi_zoom')
+    window = zoom[1:] if zoom is not None and zoom[0] == dataset_key else None
+    
+    period = f"{year_range[0]}–{year_range[1]}" if year_range[0] != year_range[1] else f"{year_range[1]}"
+    if window is not None:
+        period = f"{window[0]:%Y-%m-%d} to {window[1]:%Y-%m-%d}"
+    st.markdown(f"#### Weekly Cases Comparison ({period})")
+    
+    def build_multi():
+        multi_data = source.load(years=year_range, columns=['province', 'epi_week', 'cases'])
+        if window is not None:
+            multi_data = multi_data[multi_data['epi_week'].between(*window)]
+        multi_data, downsampled = downsample_frame(multi_data, 'epi_week', 'cases', 'province')
         
         fig_multi = go.Figure()
         
@@ -1290,9 +1453,9 @@ def main():
             'Songkhla': '#f59e0b'
         }
         
-        for prov in sorted(df['province'].unique()):
-            prov_data = all_provinces_data[all_provinces_data['province'] == prov]
-            fig_multi.add_trace(go.Scatter(
+        for prov, prov_data in multi_data.groupby('province', observed=True, sort=True):
+            fig_multi.add_trace(scatter_trace(
+                downsampled,
                 x=prov_data['epi_week'],
                 y=prov_data['cases'],
                 mode='lines',
@@ -1308,43 +1471,71 @@ def main():
             xaxis=dict(title='Week', gridcolor='#f0f0f0', showline=True, linecolor='#e0e0e0'),
             yaxis=dict(title='Dengue Cases', gridcolor='#f0f0f0', showline=True, linecolor='#e0e0e0'),
             hovermode='x unified',
+            # Downsampled: dragging selects a period to reload instead of zooming into the reduced points
+            dragmode='select' if downsampled else 'zoom',
             legend=dict(orientation='h', yanchor='top', y=-0.15, xanchor='left', x=0),
             height=450,
             margin=dict(l=60, r=30, t=30, b=100)
         )
-        
-        st.plotly_chart(fig_multi, use_container_width=True)
-        
-        # Summary statistics
-        st.markdown(f"#### Province Summary Statistics ({recent_year})")
-        
-        summary_data = []
-        for prov in sorted(df['province'].unique()):
-            prov_year_data = df[(df['province'] == prov) & (df['year'] == recent_year)]
-            summary_data.append({
-                'Province': prov,
-                'Total Cases': f"{prov_year_data['cases'].sum():,}",
-                'Weekly Average': f"{prov_year_data['cases'].mean():.1f}",
-                'Peak Week': f"{prov_year_data['cases'].max():,}",
-                'Std Dev': f"{prov_year_data['cases'].std():.1f}",
-                'Min': f"{prov_year_data['cases'].min():,}"
-            })
-        
-        summary_df = pd.DataFrame(summary_data)
-        st.dataframe(summary_df, use_container_width=True, hide_index=True)
-        
-        # Heatmap of cases by province and month
-        st.markdown(f"#### Temporal Pattern Heatmap ({recent_year})")
-        
-        # Create month-province matrix
-        heatmap_data = all_provinces_data.copy()
-        heatmap_data['month'] = heatmap_data['epi_week'].dt.month
-        pivot_data = heatmap_data.pivot_table(
-            values='cases',
-            index='province',
-            columns='month',
-            aggfunc='sum'
-        ).fillna(0)
+        return fig_multi
+    
+    fig_multi = get_figure_cache().get(('multi', dataset_key, window), build_multi)
+    
+    event = st.plotly_chart(fig_multi, use_container_width=True, key='multi_chart', on_select='rerun', selection_mode='box')
+    box = event.selection.box if event else None
+    if box:
+        selected = tuple(sorted(pd.to_datetime(box[0]['x'])))
+        if selected != window:
+            st.session_state.multi_zoom = (dataset_key,) + selected
+            st.rerun(scope='fragment')
+    
+    if fig_multi.layout.dragmode == 'select':
+        st.caption("Long series are downsampled; drag across a period to load it at full resolution")
+    if window is not None and st.button("Show full range", key="multi_zoom_reset"):
+        del st.session_state['multi_zoom']
+        st.rerun(scope='fragment')
+
+
+def render_comparison_tab(source, features, year_range):
+    """All provinces: weekly cases over the selected years; summary table and monthly heatmap of the end year"""
+    st.markdown("### Multi-Province Comparison")
+    st.caption("Comparative epidemiological trends across Thailand provinces")
+    
+    # Time series comparison over the selected years
+    render_multi_province_chart(source, year_range)
+    
+    # Summary and heatmap read the precomputed cubes, not the raw weeks
+    recent_year = year_range[1]
+    cubes = get_cube_store().get(source)
+    year_summary = cubes.year_summary(recent_year)
+    
+    # Summary statistics
+    st.markdown(f"#### Province Summary Statistics ({recent_year})")
+    
+    # Next-week forecasts for every province in one batched call
+    next_week = generate_batch_forecast(features, list(year_summary.index)).set_index('province')
+    
+    summary_df = pd.DataFrame({
+        'Province': year_summary.index,
+        'Total Cases': [f"{v:,.0f}" for v in year_summary['total']],
+        'Weekly Average': [f"{v:.1f}" for v in year_summary['mean']],
+        'Peak Week': [f"{v:,.0f}" for v in year_summary['max']],
+        'Std Dev': [f"{v:.1f}" for v in year_summary['std']],
+        'Min': [f"{v:,.0f}" for v in year_summary['min']],
+        'Next Week Forecast': [
+            f"{next_week.at[prov, 'predicted_mean']:.0f} "
+            f"({next_week.at[prov, 'predicted_lower']:.0f}–{next_week.at[prov, 'predicted_upper']:.0f})"
+            for prov in year_summary.index
+        ]
+    })
+    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    
+    # Heatmap of cases by province and month
+    st.markdown(f"#### Temporal Pattern Heatmap ({recent_year})")
+    
+    # Month-province matrix straight from the monthly cube
+    def build_heatmap():
+        pivot_data = cubes.monthly_totals(recent_year)
         
         month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
                       'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
@@ -1375,45 +1566,47 @@ def main():
             height=350,
             margin=dict(l=150, r=100, t=30, b=50)
         )
-        
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        return fig_heatmap
     
-    # ========================================================================
-    # TAB 4: CONTROL DISEASES / SYNDROMIC CONTEXT
-    # ========================================================================
+    fig_heatmap = get_figure_cache().get(('heatmap', source.version, recent_year), build_heatmap)
     
-    with tab4:
-        st.markdown("### Syndromic Context (Control Diseases)")
-        st.caption("Synthetic HFMD and Chikungunya signals for situational awareness")
-        
-        ctrl_col1, ctrl_col2 = st.columns(2)
-        
-        current_hfmd = province_df.iloc[-1]['hfmd']
-        prev_hfmd = province_df.iloc[-2]['hfmd']
-        delta_hfmd = current_hfmd - prev_hfmd
-        delta_hfmd_pct = (delta_hfmd / prev_hfmd * 100) if prev_hfmd > 0 else 0
-        
-        with ctrl_col1:
-            st.metric(
-                label="HFMD (this week)",
-                value=f"{current_hfmd:,}",
-                delta=f"{delta_hfmd:+.0f} ({delta_hfmd_pct:+.1f}%)",
-                delta_color="inverse"
-            )
-        
-        current_chik = province_df.iloc[-1]['chikungunya']
-        prev_chik = province_df.iloc[-2]['chikungunya']
-        delta_chik = current_chik - prev_chik
-        delta_chik_pct = (delta_chik / prev_chik * 100) if prev_chik > 0 else 0
-        
-        with ctrl_col2:
-            st.metric(
-                label="Chikungunya (this week)",
-                value=f"{current_chik:,}",
-                delta=f"{delta_chik:+.0f} ({delta_chik_pct:+.1f}%)",
-                delta_color="inverse"
-            )
-        
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+
+
+def render_syndromic_tab(province_df, data_key):
+    """HFMD and Chikungunya signals next to dengue"""
+    st.markdown("### Syndromic Context (Control Diseases)")
+    st.caption("Synthetic HFMD and Chikungunya signals for situational awareness")
+    
+    ctrl_col1, ctrl_col2 = st.columns(2)
+    
+    current_hfmd = province_df.iloc[-1]['hfmd']
+    prev_hfmd = province_df.iloc[-2]['hfmd']
+    delta_hfmd = current_hfmd - prev_hfmd
+    delta_hfmd_pct = (delta_hfmd / prev_hfmd * 100) if prev_hfmd > 0 else 0
+    
+    with ctrl_col1:
+        st.metric(
+            label="HFMD (this week)",
+            value=f"{current_hfmd:,}",
+            delta=f"{delta_hfmd:+.0f} ({delta_hfmd_pct:+.1f}%)",
+            delta_color="inverse"
+        )
+    
+    current_chik = province_df.iloc[-1]['chikungunya']
+    prev_chik = province_df.iloc[-2]['chikungunya']
+    delta_chik = current_chik - prev_chik
+    delta_chik_pct = (delta_chik / prev_chik * 100) if prev_chik > 0 else 0
+    
+    with ctrl_col2:
+        st.metric(
+            label="Chikungunya (this week)",
+            value=f"{current_chik:,}",
+            delta=f"{delta_chik:+.0f} ({delta_chik_pct:+.1f}%)",
+            delta_color="inverse"
+        )
+    
+    def build_control():
         control_recent = province_df.tail(52)
         fig_control = go.Figure()
         
@@ -1462,162 +1655,459 @@ def main():
             margin=dict(l=50, r=20, t=40, b=80),
             height=340
         )
+        return fig_control
+    
+    fig_control = get_figure_cache().get(('control', data_key), build_control)
+    
+    st.plotly_chart(fig_control, use_container_width=True)
+
+
+def render_performance_tab():
+    """Performance tab layout; returns the slots of the backtest metrics and the forecast table"""
+    st.markdown("### Model Validation & Performance Metrics")
+    st.caption("Out-of-sample validation results and feature importance analysis")
+    
+    metrics_slot = st.container()
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Feature importance and forecast details
+    col1, col2 = st.columns([3, 2])
+    
+    with col1:
+        render_feature_importance()
+    
+    with col2:
+        st.markdown("#### Forecast Details")
+        table_slot = st.container()
+    
+    render_model_configuration()
+    return metrics_slot, table_slot
+
+
+def render_performance_metrics(features, province, horizon):
+    """Backtest metric cards of one province at the selected horizon"""
+    # Performance metrics
+    metrics = calculate_performance_metrics(features, province, horizon)
+    
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">MAE</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['MAE']}</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Mean Abs Error</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">RMSE</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['RMSE']}</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Root MSE</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">R²</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['R2']:.2f}</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Coef of Determ</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">MedAE</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['MedAE']}</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Median AE</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col5:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">MAPE</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['MAPE']:.1f}%</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Mean APE</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col6:
+        st.markdown(f"""
+        <div class="stat-card">
+            <p class="stat-label">Correlation</p>
+            <p class="stat-value" style="font-size: 2rem;">{metrics['Correlation']:.2f}</p>
+            <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Pearson r</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.caption(
+        f"{horizon}-week-ahead forecasts from {get_backtester().n_folds} blocked forward-chaining folds "
+        f"({metrics['n']} out-of-sample weeks) · CRPS {metrics['CRPS']}"
+    )
+
+
+def render_feature_importance():
+    """Relative importance of the main forecast drivers"""
+    st.markdown("#### Feature Importance")
+    st.caption("Top drivers of recent dengue transmission")
+    
+    # Sample feature importance
+    def build_importance():
+        importance = pd.DataFrame({
+            'Feature': ['Cases lag-1', 'Temperature (2w lag)', 'Humidity (1w lag)', 
+                       'Rainfall (4w lag)', 'Week-of-year', 'Cases rolling-mean'],
+            'Importance': [0.32, 0.24, 0.18, 0.12, 0.08, 0.06]
+        }).sort_values('Importance', ascending=True)
+        
+        fig_importance = go.Figure()
+        fig_importance.add_trace(go.Bar(
+            y=importance['Feature'],
+            x=importance['Importance'],
+            orientation='h',
+            marker=dict(
+                color='#1a1a1a',
+                line=dict(color='#0a0a0a', width=1)
+            ),
+            hovertemplate='<b>%{y}</b><br>Importance: %{x:.2f}<extra></extra>'
+        ))
         
-        st.plotly_chart(fig_control, use_container_width=True)
+        fig_importance.update_layout(
+            plot_bgcolor='#ffffff',
+            paper_bgcolor='#ffffff',
+            font=dict(family='Inter, system-ui, sans-serif', color='#1a1a1a'),
+            xaxis=dict(title='Relative Importance', gridcolor='#f0f0f0', range=[0, 0.35]),
+            yaxis=dict(gridcolor='#f0f0f0'),
+            margin=dict(l=180, r=20, t=20, b=50),
+            height=320,
+            showlegend=False
+        )
+        return fig_importance
+    
+    fig_importance = get_figure_cache().get(('importance',), build_importance)
+    
+    st.plotly_chart(fig_importance, use_container_width=True)
+
+
+def render_forecast_table(forecast_df):
+    """Forecast means and intervals by week"""
+    forecast_table = forecast_df.copy()
+    forecast_table['epi_week'] = forecast_table['epi_week'].dt.strftime('%Y-%m-%d')
+    forecast_table = forecast_table[['epi_week', 'predicted_mean', 'predicted_lower', 'predicted_upper']]
+    forecast_table.columns = ['Week', 'Mean', 'Lower', 'Upper']
+    
+    st.dataframe(
+        forecast_table,
+        use_container_width=True,
+        hide_index=True,
+        height=320
+    )
+
+
+def render_model_configuration():
+    """Algorithm, validation and optimization summary cards"""
+    # Model info
+    st.markdown("#### Model Configuration")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("""
+        <div class="alert alert-info">
+            <strong>Algorithm</strong><br>
+            XGBoost Gradient Boosting<br>
+            Ensemble learning method
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="alert alert-info">
+            <strong>Validation</strong><br>
+            Blocked forward-chaining CV<br>
+            80/20 temporal split
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="alert alert-info">
+            <strong>Optimization</strong><br>
+            Bayesian hyperparameter tuning<br>
+            CRPS minimization
+        </div>
+        """, unsafe_allow_html=True)
+
+
+@st.fragment
+def forecast_panel(features, channel, province, province_df, data_key, controls, views):
+    """Horizon and interval controls with every view that depends on them.
+
+    A click on a control reruns only this function: the forecast, its chart
+    and table and the horizon's backtest metrics are redrawn in their slots
+    (``views`` holds those of the open tabs) while the rest of the page,
+    including the data load and KPI row, is left as it is.
+    """
+    with controls:
+        horizon, show_uncertainty, intervals = render_forecast_controls()
+    
+    forecast_df = generate_forecast_data(features, province, weeks_ahead=horizon, intervals=intervals)
+    
+    if 'chart' in views:
+        with views['chart']:
+            render_forecast_chart(province, province_df, forecast_df, channel, show_uncertainty, intervals, data_key)
+    if 'metrics' in views:
+        with views['metrics']:
+            render_performance_metrics(features, province, horizon)
+    if 'table' in views:
+        with views['table']:
+            render_forecast_table(forecast_df)
+
+# ============================================================================
+# MAIN DASHBOARD
+# ============================================================================
+
+def main():
+    
+    # Data backend; slices below are read on demand
+    source = get_data_source()
     
-    # TAB 5: MODEL PERFORMANCE
+    # ========================================================================
+    # SIDEBAR
     # ========================================================================
     
-    with tab5:
-        st.markdown("### Model Validation & Performance Metrics")
-        st.caption("Out-of-sample validation results and feature importance analysis")
-        
-        # Performance metrics
-        metrics = calculate_performance_metrics(province)
-        
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">MAE</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['MAE']}</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Mean Abs Error</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">RMSE</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['RMSE']}</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Root MSE</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">R²</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['R2']:.2f}</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Coef of Determ</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">MedAE</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['MedAE']}</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Median AE</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col5:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">MAPE</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['MAPE']:.1f}%</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Mean APE</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col6:
-            st.markdown(f"""
-            <div class="stat-card">
-                <p class="stat-label">Correlation</p>
-                <p class="stat-value" style="font-size: 2rem;">{metrics['Correlation']:.2f}</p>
-                <p style="font-size: 0.7rem; color: #6b6b6b; margin: 0;">Pearson r</p>
-            </div>
-            """, unsafe_allow_html=True)
+    with st.sidebar:
+        # Header title with Thailand flag
+        st.markdown("<h1 style='font-size: 1.75rem; font-weight: 700; margin: 0.25rem 0 0.5rem 0;'>🇹🇭 Dengue EWS</h1>", unsafe_allow_html=True)
+        st.markdown("<p style='color: #6b6b6b; font-size: 0.95rem; margin: 0;'>Thailand Province-Level Forecasting</p>", unsafe_allow_html=True)
+        st.markdown("---")
         
-        st.markdown("<br>", unsafe_allow_html=True)
+        # Province selector
+        province_icons = {}
         
-        # Feature importance and forecast details
-        col1, col2 = st.columns([3, 2])
+        st.markdown("### Location")
+        province = st.selectbox(
+            "Province",
+            options=source.provinces(),
+            format_func=lambda x: x,
+            label_visibility="collapsed"
+        )
         
+        # Time range with two dropdowns
+        st.markdown("### Time Range")
+        years = source.years()
+        col1, col2 = st.columns(2)
         with col1:
-            st.markdown("#### Feature Importance")
-            st.caption("Top drivers of recent dengue transmission")
-            
-            # Sample feature importance
-            features = pd.DataFrame({
-                'Feature': ['Cases lag-1', 'Temperature (2w lag)', 'Humidity (1w lag)', 
-                           'Rainfall (4w lag)', 'Week-of-year', 'Cases rolling-mean'],
-                'Importance': [0.32, 0.24, 0.18, 0.12, 0.08, 0.06]
-            }).sort_values('Importance', ascending=True)
-            
-            fig_importance = go.Figure()
-            fig_importance.add_trace(go.Bar(
-                y=features['Feature'],
-                x=features['Importance'],
-                orientation='h',
-                marker=dict(
-                    color='#1a1a1a',
-                    line=dict(color='#0a0a0a', width=1)
-                ),
-                hovertemplate='<b>%{y}</b><br>Importance: %{x:.2f}<extra></extra>'
-            ))
-            
-            fig_importance.update_layout(
-                plot_bgcolor='#ffffff',
-                paper_bgcolor='#ffffff',
-                font=dict(family='Inter, system-ui, sans-serif', color='#1a1a1a'),
-                xaxis=dict(title='Relative Importance', gridcolor='#f0f0f0', range=[0, 0.35]),
-                yaxis=dict(gridcolor='#f0f0f0'),
-                margin=dict(l=180, r=20, t=20, b=50),
-                height=320,
-                showlegend=False
+            start_year = st.selectbox(
+                "Start Year",
+                options=years,
+                index=len(years)-2,
+                label_visibility="collapsed"
             )
-            
-            st.plotly_chart(fig_importance, use_container_width=True)
-        
         with col2:
-            st.markdown("#### Forecast Details")
-            
-            forecast_table = forecast_df.copy()
-            forecast_table['epi_week'] = forecast_table['epi_week'].dt.strftime('%Y-%m-%d')
-            forecast_table = forecast_table[['epi_week', 'predicted_mean', 'predicted_lower', 'predicted_upper']]
-            forecast_table.columns = ['Week', 'Mean', 'Lower', 'Upper']
-            
-            st.dataframe(
-                forecast_table,
-                use_container_width=True,
-                hide_index=True,
-                height=320
+            end_year = st.selectbox(
+                "End Year",
+                options=years,
+                index=len(years)-1,
+                label_visibility="collapsed"
             )
+        year_range = (start_year, end_year)
         
-        # Model info
-        st.markdown("#### Model Configuration")
-        
-        col1, col2, col3 = st.columns(3)
+        # Forecast settings; the controls are drawn by forecast_panel so they rerun only it
+        st.markdown("### Forecast Horizon")
+        forecast_controls = st.container()
         
-        with col1:
-            st.markdown("""
-            <div class="alert alert-info">
-                <strong>Algorithm</strong><br>
-                XGBoost Gradient Boosting<br>
-                Ensemble learning method
+        # Model info with cleaner design
+        st.markdown("---")
+        st.markdown("""
+        <div style='background: #fafafa; padding: 1.25rem; border-radius: 8px; border: 1px solid #e8e8e8;'>
+            <p style='font-size: 0.7rem; font-weight: 700; color: #9b9b9b; text-transform: uppercase; letter-spacing: 0.12em; margin: 0 0 0.75rem 0;'>MODEL</p>
+            <div style='display: flex; align-items: baseline; gap: 0.5rem; margin-bottom: 0.75rem;'>
+                <p style='font-size: 1.25rem; font-weight: 600; margin: 0; color: #1a1a1a;'>XGBoost</p>
+                <span style='background: #1a1a1a; color: white; padding: 0.2rem 0.5rem; border-radius: 4px; font-size: 0.7rem; font-weight: 600;'>v2.3</span>
             </div>
-            """, unsafe_allow_html=True)
+            <p style='color: #b5b5b5; font-size: 0.8rem; margin: 0;'>Updated {}</p>
+        </div>
+        """.format(datetime.now().strftime('%b %d, %Y')), unsafe_allow_html=True)
         
-        with col2:
-            st.markdown("""
-            <div class="alert alert-info">
-                <strong>Validation</strong><br>
-                Blocked forward-chaining CV<br>
-                80/20 temporal split
-            </div>
-            """, unsafe_allow_html=True)
+        # Actions - Icons in one line
+        st.markdown("---")
         
-        with col3:
-            st.markdown("""
-            <div class="alert alert-info">
-                <strong>Optimization</strong><br>
-                Bayesian hyperparameter tuning<br>
-                CRPS minimization
-            </div>
-            """, unsafe_allow_html=True)
+        action_col1, action_col2 = st.columns([1, 1])
+        with action_col1:
+            if st.button("Refresh", key="refresh_btn", use_container_width=True, help="Ingest epi-weeks that arrived in the data store (no-op on the synthetic backend)"):
+                # Appends weeks that arrived in the store; only the affected provinces' forecasts recompute
+                if get_ingest().pull() == []:
+                    st.toast("No new epi-weeks")
+                else:
+                    st.rerun()
+        with action_col2:
+            # Filled in below, once the data the export menu offers is loaded
+            export_menu = st.popover("Export", key="export_btn", use_container_width=True, help="Export CSV or Parquet")
+        
+        # Footer with improved styling
+        st.markdown("---")
+        st.markdown("<p style='font-size: 0.75rem; font-weight: 700; color: #6b6b6b; text-transform: uppercase; letter-spacing: 0.1em; margin-bottom: 0.5rem;'>Data Sources</p>", unsafe_allow_html=True)
+        st.markdown("<p style='color: #9b9b9b; font-size: 0.875rem; margin: 0;'>MoPH DDC · TMD · GEE</p>", unsafe_allow_html=True)
+    
+    # ========================================================================
+    # MAIN CONTENT
+    # ========================================================================
+    
+    # Header with gradient background
+    st.markdown(f"""
+    <div class="header-gradient">
+        <h1 style="font-weight: 600;">{province}</h1>
+        <p style="font-size: 1.1rem; margin: 0.5rem 0 0 0; color: #6b6b6b; font-weight: 500;">
+            Dengue Early Warning & Forecasting System
+        </p>
+        <p style="margin: 0.25rem 0 0 0; color: #9b9b9b; font-size: 0.9rem;">
+            Retrospective assessment and cross-validated prediction
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Filter data (indexed slices, no table scans)
+    province_df = source.load(provinces=[province], years=year_range)
+    features = get_feature_store().get(source)
+    channel = get_endemic_store().get(source, features)
+    
+    with export_menu:
+        render_export_menu(source, features, channel, province, year_range)
+    
+    # What this province's figures depend on; keys the shared figure cache
+    data_key = (features.province_version(province), year_range)
+    
+    # Next-week forecast for the alert and KPI row (the same for every horizon)
+    forecast_df = generate_forecast_data(features, province, weeks_ahead=1)
+    
+    # Risk alert: precomputed for every province by the batch job when it matches this dataset
+    alert = precomputed_alert(source.version, province)
+    if alert is None:
+        current_cases = province_df.iloc[-1]['cases']
+        forecast_mean = forecast_df.iloc[0]['predicted_mean']
+        seasonal_median = channel.lookup(province, province_df.iloc[-1]['week_num'])
+        alert = create_risk_alert(current_cases, forecast_mean, seasonal_median)
+    alert_type, alert_title, alert_message = alert
+    
+    # Show alert
+    st.markdown(f"""
+    <div class="alert alert-{alert_type}">
+        <strong>{alert_title}</strong> — {alert_message}
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # ========================================================================
+    # KPI METRICS ROW with Enhanced Design
+    # ========================================================================
+    
+    st.markdown("")
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    # Current week cases
+    current_cases = province_df.iloc[-1]['cases']
+    prev_cases = province_df.iloc[-2]['cases']
+    delta_cases = current_cases - prev_cases
+    delta_pct = (delta_cases / prev_cases * 100) if prev_cases > 0 else 0
+    
+    with col1:
+        st.metric(
+            label="Current Week",
+            value=f"{current_cases:,}",
+            delta=f"{delta_cases:+.0f} ({delta_pct:+.1f}%)",
+            delta_color="inverse"
+        )
+    
+    # 4-week average
+    avg_4week = province_df.tail(4)['cases'].mean()
+    avg_prev_4week = province_df.iloc[-8:-4]['cases'].mean()
+    delta_avg = avg_4week - avg_prev_4week
+    
+    with col2:
+        st.metric(
+            label="4-Week Avg",
+            value=f"{avg_4week:.0f}",
+            delta=f"{delta_avg:+.1f}",
+            delta_color="inverse"
+        )
+    
+    # Next week prediction
+    next_week_pred = forecast_df.iloc[0]['predicted_mean']
+    pred_change = next_week_pred - current_cases
+    pred_change_pct = (pred_change / current_cases * 100) if current_cases > 0 else 0
+    
+    with col3:
+        st.metric(
+            label="Next Week",
+            value=f"{next_week_pred:.0f}",
+            delta=f"{pred_change:+.0f} ({pred_change_pct:+.1f}%)",
+            delta_color="inverse"
+        )
+    
+    # Peak this year
+    peak_2024 = province_df[province_df['year'] == year_range[1]]['cases'].max()
+    peak_week = province_df[province_df['year'] == year_range[1]]['cases'].idxmax()
+    
+    with col4:
+        st.metric(
+            label=f"{year_range[1]} Peak",
+            value=f"{peak_2024:,}",
+            delta=f"Week {province_df.loc[peak_week, 'week_num']}" if peak_week in province_df.index else None,
+            delta_color="off"
+        )
+    
+    # Year-to-date total
+    ytd_total = province_df[province_df['year'] == year_range[1]]['cases'].sum()
+    ytd_prev = province_df[province_df['year'] == year_range[1]-1]['cases'].sum() if year_range[1] > year_range[0] else ytd_total
+    ytd_change = ((ytd_total - ytd_prev) / ytd_prev * 100) if ytd_prev > 0 else 0
+    
+    with col5:
+        st.metric(
+            label=f"{year_range[1]} Total",
+            value=f"{ytd_total:,}",
+            delta=f"{ytd_change:+.1f}% vs {year_range[1]-1}",
+            delta_color="inverse"
+        )
+    
+    st.markdown("---")
+    
+    # ========================================================================
+    # TABS FOR ORGANIZED CONTENT
+    # ========================================================================
+    
+    # With lazy tabs only the selected tab runs; the others are neither computed nor sent
+    tabs = st.tabs(TAB_NAMES, key="tab", on_change="rerun" if LAZY_TABS else "ignore")
+    
+    # Slots filled by forecast_panel, so horizon changes redraw only them
+    views = {}
+    
+    with tabs[0]:
+        if tabs[0].open is not False:
+            views['chart'] = render_forecast_tab(province, province_df, features, channel, data_key)
+    
+    with tabs[1]:
+        if tabs[1].open is not False:
+            render_climate_tab(province, province_df, features, data_key)
+    
+    with tabs[2]:
+        if tabs[2].open is not False:
+            render_comparison_tab(source, features, year_range)
+    
+    with tabs[3]:
+        if tabs[3].open is not False:
+            render_syndromic_tab(province_df, data_key)
+    
+    with tabs[4]:
+        if tabs[4].open is not False:
+            views['metrics'], views['table'] = render_performance_tab()
+    
+    forecast_panel(features, channel, province, province_df, data_key, forecast_controls, views)
     
     # ========================================================================
     # FOOTER
@@ -1632,6 +2122,20 @@ def main():
     Methods: XGBoost with lagged climate & surveillance features | Cross-validation: blocked forward-chaining  
     **Note:** This is a demonstration dashboard with simulated data for visualization purposes only.
     """)
+    
+    # ========================================================================
+    # DIAGNOSTICS
+    # ========================================================================
+    
+    if DEBUG or st.query_params.get('debug') == '1':
+        with st.sidebar.expander("Diagnostics", expanded=True):
+            st.caption(f"Dataset version `{source.version}`")
+            st.dataframe(
+                pd.DataFrame([stats.summary() for stats in all_cache_stats()]),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.dataframe(pd.DataFrame([get_figure_cache().summary()]), use_container_width=True, hide_index=True)
 
     # ========================================================================
 if __name__ == "__main__":
@@ -0,0 +1,457 @@
+"""Data backends for the surveillance table.
+
+Usage:
+    # partitioned Parquet store from the synthetic generator
+    python datasource.py build-parquet data/surveillance --provinces 77 --start 2004-01-05
+    # shared memory-mapped Arrow file, from the generator or an existing store
+    python datasource.py build-shared data/surveillance.arrow --from-parquet data/surveillance
+"""
+
+import abc
+import argparse
+import fcntl
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from synthetic import (DEFAULT_END, DEFAULT_SEED, DEFAULT_START, GENERATOR_VERSION, PROVINCES_INFO,
+                       generate_surveillance_data, province_catalog)
+
+# Canonical column order of the weekly surveillance table
+COLUMNS = ['province', 'epi_week', 'year', 'week_num', 'cases',
+           'temp_mean', 'humidity', 'rainfall', 'chikungunya', 'hfmd']
+
+# Hive-style directory layout: <root>/province=<name>/year=<yyyy>/part-0.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([('province', pa.string()), ('year', pa.int32())]),
+    flavor='hive'
+)
+
+# ============================================================================
+# DATA SOURCES
+# ============================================================================
+
+def fingerprint(*parts):
+    """Short stable hash of a few small values"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def file_signature(path):
+    """(path, size, mtime) of a file; changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+class DataSource(abc.ABC):
+    """Read interface shared by every backend.
+
+    ``load`` returns rows sorted by (province, epi_week) restricted to the
+    requested provinces, inclusive ``(start_year, end_year)`` range and columns.
+    ``version`` is a short fingerprint that changes whenever the data does;
+    caches key on it instead of hashing table contents.
+
+    ``append`` adds later epi-weeks of existing provinces; ``pull`` picks up
+    rows that arrived in the backing store since the last look and returns
+    them, or None when the store changed in a way that is not an append.
+    ``sidecar_path`` is where derived tables (e.g. the endemic channel) are
+    stored next to the data, or None for in-memory sources.
+
+    ``scan`` yields the rows ``load`` would return one province at a time,
+    so streaming readers (exports) never hold more than one province.
+    """
+
+    version = None
+
+    @abc.abstractmethod
+    def provinces(self):
+        """Sorted province names"""
+
+    @abc.abstractmethod
+    def years(self):
+        """Sorted years with at least one row"""
+
+    @abc.abstractmethod
+    def load(self, provinces=None, years=None, columns=None):
+        """Rows of the given provinces, inclusive year range and columns"""
+
+    def scan(self, provinces=None, years=None, columns=None):
+        for province in self.provinces() if provinces is None else provinces:
+            df = self.load([province], years, columns)
+            if len(df):
+                yield df
+
+    def append(self, rows):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    def pull(self):
+        return pd.DataFrame(columns=COLUMNS)
+
+    def sidecar_path(self, name):
+        return None
+
+
+class ProvinceYearIndex:
+    """Row offsets of every (province, year) block of a frame sorted by province then week.
+
+    Built with one pass over the province codes and years; afterwards a
+    province/year-range lookup is a binary search over that province's
+    handful of years, and the rows it names are one contiguous slice.
+    """
+
+    def __init__(self, frame):
+        names = frame['province'].cat.categories
+        codes = frame['province'].cat.codes.to_numpy()
+        years = frame['year'].to_numpy()
+
+        # A new block starts wherever the province or the year changes
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (years[1:] != years[:-1])])
+        stops = np.r_[starts[1:], len(frame)]
+
+        # Consecutive blocks of the same province form that province's run
+        block_codes, block_years = codes[starts], years[starts]
+        runs = np.flatnonzero(np.r_[True, block_codes[1:] != block_codes[:-1], True])
+        if len(runs) - 1 != len(np.unique(block_codes)):
+            raise ValueError("frame must be sorted by province and epi_week")
+
+        self.provinces = []
+        self._years = {}
+        self._bounds = {}
+        for first, last in zip(runs[:-1], runs[1:]):
+            if np.any(np.diff(block_years[first:last]) <= 0):
+                raise ValueError("frame must be sorted by province and epi_week")
+            name = names[block_codes[first]]
+            self.provinces.append(name)
+            self._years[name] = block_years[first:last]
+            self._bounds[name] = np.r_[starts[first:last], stops[last - 1]]
+        self.years = sorted(set(block_years.tolist()))
+
+    def span(self, province, years=None):
+        """(start, stop) row offsets of a province, optionally limited to an inclusive year range"""
+        province_years, bounds = self._years[province], self._bounds[province]
+        if years is None:
+            return int(bounds[0]), int(bounds[-1])
+        first = np.searchsorted(province_years, years[0], side='left')
+        last = np.searchsorted(province_years, years[1], side='right')
+        return int(bounds[first]), int(bounds[max(first, last)])
+
+
+class FrameSource(DataSource):
+    """Backend whose whole table is held as one DataFrame (``frame``).
+
+    Reads go through a ProvinceYearIndex built with the frame, so a single
+    province is a zero-copy positional slice and multi-province reads
+    gather only the rows they return instead of scanning the table. The
+    frame and its index are published together as one (frame, index) tuple
+    under a lock, so a read never pairs one frame with another's offsets.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _build_frame(self):
+        """The full table, sorted by province then week (called once, on first read)"""
+
+    def _snapshot(self):
+        """Current (frame, index) pair"""
+        with self._lock:
+            if self._state is None:
+                frame = self._build_frame()
+                self._state = (frame, ProvinceYearIndex(frame))
+            return self._state
+
+    def _publish(self, frame):
+        state = (frame, ProvinceYearIndex(frame))
+        with self._lock:
+            self._state = state
+
+    @property
+    def frame(self):
+        return self._snapshot()[0]
+
+    @property
+    def index(self):
+        return self._snapshot()[1]
+
+    def provinces(self):
+        return sorted(self.index.provinces)
+
+    def years(self):
+        return self.index.years
+
+    def load(self, provinces=None, years=None, columns=None):
+        frame, index = self._snapshot()
+        spans = [index.span(p, years) for p in (index.provinces if provinces is None else provinces)]
+        spans = [(a, b) for a, b in spans if b > a]
+        column_positions = [frame.columns.get_loc(c) for c in columns or COLUMNS]
+        if len(spans) == 1:
+            return frame.iloc[spans[0][0]:spans[0][1], column_positions]
+        rows = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.array([], dtype=np.int64)
+        return frame.iloc[rows, column_positions]
+
+    def scan(self, provinces=None, years=None, columns=None):
+        frame, index = self._snapshot()
+        column_positions = [frame.columns.get_loc(c) for c in columns or COLUMNS]
+        for province in index.provinces if provinces is None else provinces:
+            start, stop = index.span(province, years)
+            if stop > start:
+                yield frame.iloc[start:stop, column_positions]
+
+    def append(self, rows):
+        """Add later weeks of existing provinces, keeping the frame sorted by province then week"""
+        frame = self.frame
+        rows = rows[COLUMNS].astype({'province': frame['province'].dtype})
+        df = pd.concat([frame, rows], ignore_index=True)
+        order = np.lexsort((df['epi_week'].to_numpy(), df['province'].cat.codes.to_numpy()))
+        self._publish(df.take(order).reset_index(drop=True))
+        self.version = fingerprint(self.version, rows['province'].astype(str).tolist(), rows['epi_week'].astype(str).tolist())
+
+
+class SyntheticSource(FrameSource):
+    """In-process synthetic table generated once on first use.
+
+    Nothing arrives in it between reads, so ``pull`` finds no rows and the
+    dashboard's Refresh leaves it as it is. ``append`` only changes this
+    process's copy; to feed new weeks, build a Parquet store and use
+    ``ingest.py append-synthetic`` on it.
+    """
+
+    def __init__(self, provinces_info=None, start=DEFAULT_START, end=DEFAULT_END, seed=DEFAULT_SEED):
+        super().__init__()
+        self.provinces_info = provinces_info
+        self.start = start
+        self.end = end
+        self.seed = seed
+        # The generator is deterministic, so its inputs identify the data
+        self.version = fingerprint(GENERATOR_VERSION, sorted((provinces_info or PROVINCES_INFO).items()), start, end, seed)
+
+    def _build_frame(self):
+        return generate_surveillance_data(self.provinces_info, self.start, self.end, self.seed)
+
+
+class MappedSource(FrameSource):
+    """Read-only view of a memory-mapped Arrow IPC file.
+
+    Columns are wrapped zero-copy, so every session in a process shares one
+    frame and every process on the host shares the same page-cache pages.
+    If the file is missing and ``build`` is given, the first process to get
+    the lock writes it from ``build()`` and the others wait and map it.
+    """
+
+    def __init__(self, path, build=None):
+        super().__init__()
+        if not os.path.exists(path):
+            if build is None:
+                raise FileNotFoundError(path)
+            ensure_shared_table(path, build)
+        self.path = path
+        self._map()
+
+    def _map(self):
+        self.signature = file_signature(self.path)
+        self.table = pa.ipc.open_file(pa.memory_map(self.path, 'r')).read_all()
+        self._publish(self._build_frame())
+        self.version = fingerprint(*self.signature)
+
+    def _build_frame(self):
+        return self.table.to_pandas(split_blocks=True, self_destruct=False)
+
+    def append(self, rows):
+        raise TypeError("MappedSource is read-only; rebuild the shared file with `datasource.py build-shared`")
+
+    def sidecar_path(self, name):
+        return f"{self.path}.{name}.parquet"
+
+    def pull(self):
+        """Remap the file if it was rebuilt; a rebuilt file is never treated as an append"""
+        if file_signature(self.path) == self.signature:
+            return super().pull()
+        self._map()
+        return None
+
+
+class ParquetSource(DataSource):
+    """Partitioned Parquet store (province/year) read with column pruning and predicate pushdown"""
+
+    def __init__(self, root):
+        self.root = root
+        self._scan()
+
+    def _scan(self):
+        self.dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+        # Partition keys come from the directory names alone; no data is read
+        self._fragments = list(self.dataset.get_fragments())
+        self._keys = [ds.get_partition_keys(f.partition_expression) for f in self._fragments]
+        self.signatures = {f: file_signature(f) for f in self.dataset.files}
+        self.version = fingerprint(*[self.signatures[f] for f in sorted(self.signatures)])
+
+    def sidecar_path(self, name):
+        # Dataset discovery skips names starting with '_', so sidecars never read as data
+        return os.path.join(self.root, f'_{name}.parquet')
+
+    def provinces(self):
+        return sorted({k['province'] for k in self._keys})
+
+    def years(self):
+        return sorted({k['year'] for k in self._keys})
+
+    def load(self, provinces=None, years=None, columns=None):
+        # Partition filters prune whole directories before any file is opened
+        predicate = None
+        if provinces is not None:
+            predicate = ds.field('province').isin(list(provinces))
+        if years is not None:
+            year_filter = (ds.field('year') >= years[0]) & (ds.field('year') <= years[1])
+            predicate = year_filter if predicate is None else predicate & year_filter
+
+        columns = columns or COLUMNS
+        table = self.dataset.to_table(columns=columns, filter=predicate)
+        df = table.to_pandas()
+        if 'province' in df:
+            df['province'] = pd.Categorical(df['province'], categories=sorted(df['province'].unique()))
+        sort_keys = [c for c in ('province', 'epi_week') if c in df]
+        if sort_keys:
+            df = df.sort_values(sort_keys, kind='stable')
+        return df.reset_index(drop=True)[columns]
+
+    def scan(self, provinces=None, years=None, columns=None):
+        """One province at a time, read from just that province's partition files"""
+        columns = columns or COLUMNS
+        fragments = {}
+        for fragment, keys in zip(self._fragments, self._keys):
+            if years is None or years[0] <= keys['year'] <= years[1]:
+                fragments.setdefault(keys['province'], []).append(fragment)
+        for province in sorted(fragments) if provinces is None else provinces:
+            if province not in fragments:
+                continue
+            df = pa.concat_tables([
+                f.to_table(schema=self.dataset.schema, columns=columns) for f in fragments[province]
+            ]).to_pandas()
+            if 'province' in df:
+                df['province'] = pd.Categorical(df['province'], categories=[province])
+            if 'epi_week' in df:
+                df = df.sort_values('epi_week', kind='stable')
+            yield df.reset_index(drop=True)
+
+    def append(self, rows):
+        """Write rows as new files in their partitions; existing files are left untouched"""
+        write_parquet_store(rows, self.root, append=True)
+        self._scan()
+
+    def pull(self):
+        """Rows of files added since the last scan; None if an existing file changed or vanished"""
+        known = self.signatures
+        self._scan()
+        if any(self.signatures.get(f) != signature for f, signature in known.items()):
+            return None
+        new_files = sorted(set(self.signatures) - set(known))
+        if not new_files:
+            return super().pull()
+        table = ds.dataset(new_files, format='parquet', partitioning=PARTITIONING, partition_base_dir=self.root).to_table(columns=COLUMNS)
+        df = table.to_pandas()
+        df['province'] = pd.Categorical(df['province'], categories=sorted(df['province'].unique()))
+        return df.sort_values(['province', 'epi_week'], kind='stable').reset_index(drop=True)
+
+
+def write_parquet_store(df, root, append=False):
+    """Write a surveillance table as a province/year partitioned Parquet store.
+
+    With ``append`` the rows go to new, uniquely named files next to the
+    existing ones instead of replacing each partition.
+    """
+    table = pa.Table.from_pandas(df[COLUMNS], preserve_index=False)
+    table = table.set_column(0, 'province', table.column('province').cast(pa.string()))
+    if append:
+        first, last = df['epi_week'].min(), df['epi_week'].max()
+        basename = f"part-{first:%Y%m%d}-{last:%Y%m%d}-{os.getpid()}-{{i}}.parquet"
+    else:
+        basename = 'part-{i}.parquet'
+    ds.write_dataset(
+        table, root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=basename,
+        existing_data_behavior='overwrite_or_ignore' if append else 'delete_matching'
+    )
+
+
+def write_shared_table(df, path):
+    """Write a surveillance table as a single-batch, uncompressed Arrow IPC file"""
+    # One record batch keeps every column contiguous, which is what makes the
+    # mapped read zero-copy; the rename makes the file appear atomically
+    table = pa.Table.from_pandas(df[COLUMNS], preserve_index=False).combine_chunks()
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def ensure_shared_table(path, build):
+    """Write ``build()`` to ``path`` unless another process already did"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            write_shared_table(build(), path)
+
+
+def source_from_env():
+    """Surveillance backend selected by DENGUE_DATA_SOURCE (synthetic, parquet or mmap)"""
+    seed = int(os.environ.get('DENGUE_SEED', DEFAULT_SEED))
+    backend = os.environ.get('DENGUE_DATA_SOURCE', 'synthetic')
+    if backend == 'parquet':
+        return ParquetSource(os.environ.get('DENGUE_PARQUET_ROOT', 'data/surveillance'))
+    if backend == 'mmap':
+        # Built once by whichever process gets there first, then mapped by all
+        return MappedSource(
+            os.environ.get('DENGUE_SHARED_PATH', 'data/surveillance.arrow'),
+            build=lambda: generate_surveillance_data(PROVINCES_INFO, seed=seed)
+        )
+    return SyntheticSource(PROVINCES_INFO, seed=seed)
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Surveillance data store tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build-parquet', help='write the synthetic table as a partitioned Parquet store')
+    build.add_argument('root')
+    build.add_argument('--provinces', type=int, default=None, help='number of units (default: all 77 provinces)')
+    build.add_argument('--start', default=DEFAULT_START)
+    build.add_argument('--end', default=DEFAULT_END)
+    build.add_argument('--seed', type=int, default=DEFAULT_SEED)
+
+    shared = sub.add_parser('build-shared', help='write the memory-mappable Arrow IPC file')
+    shared.add_argument('path')
+    shared.add_argument('--from-parquet', metavar='ROOT', default=None, help='copy an existing Parquet store')
+    shared.add_argument('--provinces', type=int, default=None, help='number of units (default: all 77 provinces)')
+    shared.add_argument('--start', default=DEFAULT_START)
+    shared.add_argument('--end', default=DEFAULT_END)
+    shared.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    if args.command == 'build-parquet':
+        df = generate_surveillance_data(province_catalog(args.provinces), args.start, args.end, args.seed)
+        write_parquet_store(df, args.root)
+        print(f"Wrote {len(df):,} rows for {df['province'].nunique()} provinces to {args.root}")
+    elif args.command == 'build-shared':
+        if args.from_parquet:
+            df = ParquetSource(args.from_parquet).load()
+        else:
+            df = generate_surveillance_data(province_catalog(args.provinces), args.start, args.end, args.seed)
+        write_shared_table(df, args.path)
+        print(f"Wrote {len(df):,} rows for {df['province'].nunique()} provinces to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""Distributed lag non-linear models (DLNM) of dengue cases on climate, every province at once.
+
+Each climate series enters through a crossbasis: a B-spline basis over the
+exposure value crossed with a B-spline basis over the lag, so a week's
+effect can vary non-linearly with its level and with how long ago it was.
+Every province is fitted in one batch of quasi-Poisson GLMs (IRLS with
+batched normal equations), with seasonal harmonics and a linear trend as
+confounders. The coefficients give exposure-lag-response surfaces (relative
+risk against a reference exposure at each lag) and the overall cumulative
+relative risk with its 95% interval.
+
+The spline knots are fixed by the first fit of a store, so the weekly
+refresh only adds rows and warm-starts IRLS from the previous coefficients.
+
+Usage:
+    python dlnm.py fit                          # fit every province, print timing
+    python dlnm.py show Bangkok temp_mean       # cumulative relative risk over the exposure range
+"""
+
+import argparse
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from features import FEATURE_NAMES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Climate column -> (feature matrix column, label)
+DLNM_VARIABLES = {
+    'temp_mean': ('temp_mean', 'Temperature (°C)'),
+    'humidity': ('humidity', 'Humidity (%)'),
+    'rainfall': ('rainfall_1w', 'Rainfall (mm)')
+}
+
+MAX_LAG = 26
+
+# Quadratic B-splines: exposure basis columns (the first is dropped against the intercept) and lag basis columns
+DEGREE = 2
+EXPOSURE_DF = 4
+LAG_DF = 4
+
+# Exposure grid of the predicted surfaces, between these national percentiles
+GRID_POINTS = 30
+GRID_PERCENTILES = (1, 99)
+
+SEASONAL_COLUMNS = ['season_sin_1', 'season_cos_1', 'season_sin_2', 'season_cos_2']
+
+# Intercept, trend and seasonal harmonics precede the crossbasis columns
+CONFOUNDERS = 2 + len(SEASONAL_COLUMNS)
+
+# Provinces with fewer complete weeks (every lag observed) are not fitted and get NaN surfaces
+MIN_WEEKS = 52
+
+MAX_ITER = 30
+TOL = 1e-8
+
+# Ridge on the crossbasis coefficients, relative to their mean Fisher information;
+# shrinks the surfaces towards no effect where the data cannot tell lags apart
+PENALTY = 0.1
+
+# Provinces per IRLS batch; bounds the design tensor held at once
+CHUNK_PROVINCES = 128
+
+# ============================================================================
+# BASES
+# ============================================================================
+
+def bspline_basis(x, knots, degree=DEGREE):
+    """B-spline basis of ``x`` (any shape) on clamped ``knots``; NaN stays NaN.
+
+    Values outside the boundary knots take the boundary's basis row.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    flat = np.clip(x.ravel(), knots[0], knots[-1])
+    B = ((flat[:, None] >= knots[None, :-1]) & (flat[:, None] < knots[None, 1:])).astype(np.float64)
+    # The right boundary belongs to the last non-empty interval
+    B[flat == knots[-1], np.flatnonzero(knots[:-1] < knots[1:])[-1]] = 1.0
+    # Cox-de Boor recursion, one degree per step for every point at once
+    for d in range(1, degree + 1):
+        left_span = knots[d:-1] - knots[:-d - 1]
+        right_span = knots[d + 1:] - knots[1:-d]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            left = np.where(left_span > 0, (flat[:, None] - knots[:-d - 1]) / left_span, 0.0)
+            right = np.where(right_span > 0, (knots[d + 1:] - flat[:, None]) / right_span, 0.0)
+        B = left * B[:, :-1] + right * B[:, 1:]
+    B[np.isnan(flat)] = np.nan
+    return B.reshape(x.shape + (B.shape[1],))
+
+
+def clamped_knots(interior, low, high, degree=DEGREE):
+    return np.r_[[low] * (degree + 1), interior, [high] * (degree + 1)].astype(np.float64)
+
+
+class CrossBasis:
+    """Exposure x lag spline basis of one climate variable"""
+
+    def __init__(self, exposure_knots, reference, grid, max_lag=MAX_LAG):
+        self.exposure_knots = exposure_knots
+        self.reference = reference
+        self.grid = grid
+        self.max_lag = max_lag
+        lag_interior = np.linspace(0, max_lag, LAG_DF - DEGREE + 1)[1:-1]
+        self.lag_basis = bspline_basis(np.arange(max_lag + 1), clamped_knots(lag_interior, 0, max_lag))
+
+    @classmethod
+    def from_values(cls, values, max_lag=MAX_LAG):
+        """Knots at national quantiles of the exposure; reference at its median"""
+        values = values[np.isfinite(values)]
+        interior = np.quantile(values, np.linspace(0, 1, EXPOSURE_DF - DEGREE + 2)[1:-1])
+        low, high = np.percentile(values, [0, 100])
+        grid = np.linspace(*np.percentile(values, GRID_PERCENTILES), GRID_POINTS)
+        return cls(clamped_knots(interior, low, high), float(np.median(values)), grid, max_lag)
+
+    @property
+    def n_columns(self):
+        return EXPOSURE_DF * LAG_DF
+
+    def exposure(self, x):
+        """Exposure basis without its first column (collinear with the intercept)"""
+        return bspline_basis(x, self.exposure_knots)[..., 1:]
+
+    def matrix(self, series):
+        """(provinces, weeks, EXPOSURE_DF * LAG_DF) crossbasis of (provinces, weeks) series.
+
+        Row t sums exposure_basis(x[t - lag]) (x) lag_basis[lag] over lags, so it
+        is NaN until a province has MAX_LAG weeks of history.
+        """
+        B = self.exposure(series)
+        n_prov, n_weeks, n_exp = B.shape
+        padded = np.concatenate([np.full((n_prov, self.max_lag, n_exp), np.nan), B], axis=1)
+        # (provinces, weeks, exposure, lag window oldest-first) @ lag basis newest-last
+        windows = sliding_window_view(padded, self.max_lag + 1, axis=1)
+        out = windows @ self.lag_basis[::-1]
+        return out.reshape(n_prov, n_weeks, -1)
+
+    def effects(self, beta, cov=None):
+        """Log relative risk vs the reference over (grid, lag), and cumulative over lags (with SE)"""
+        contrast = self.exposure(self.grid) - self.exposure(self.reference)
+        coef = beta.reshape(EXPOSURE_DF, LAG_DF)
+        surface = contrast @ coef @ self.lag_basis.T
+        weights = np.kron(contrast, self.lag_basis.sum(axis=0)[None, :])
+        cumulative = weights @ beta
+        se = None if cov is None else np.sqrt(np.maximum(np.einsum('gk,kl,gl->g', weights, cov, weights), 0))
+        return surface, cumulative, se
+
+# ============================================================================
+# GLM
+# ============================================================================
+
+def fit_poisson(X, y, mask, penalized, beta=None, max_iter=MAX_ITER, tol=TOL, min_weeks=MIN_WEEKS):
+    """Batched penalized quasi-Poisson IRLS: one (weeks x params) design per province.
+
+    ``penalized`` flags the parameters under the PENALTY ridge. Returns
+    (beta, cov, iterations); ``cov`` is the dispersion-scaled inverse of the
+    penalized information. Rows outside ``mask`` carry zero weight.
+    Provinces with fewer than ``min_weeks`` rows in ``mask`` would make the
+    batched solve singular; they are left out and get NaN beta and cov.
+    """
+    n_prov, _, n_params = X.shape
+    fitted = mask.sum(axis=1) >= max(min_weeks, n_params + 1)
+    if not fitted.all():
+        beta_all = np.full((n_prov, n_params), np.nan)
+        cov_all = np.full((n_prov, n_params, n_params), np.nan)
+        iteration = 0
+        if fitted.any():
+            beta_all[fitted], cov_all[fitted], iteration = fit_poisson(
+                X[fitted], y[fitted], mask[fitted], penalized,
+                None if beta is None else beta[fitted], max_iter, tol, min_weeks
+            )
+        return beta_all, cov_all, iteration
+
+    X = np.where(mask[..., None], X, 0.0)
+    y = np.where(mask, y, 0.0)
+    weight = mask.astype(np.float64)
+    start = np.zeros((n_prov, n_params))
+    start[:, 0] = np.log((y * weight).sum(axis=1) / np.maximum(weight.sum(axis=1), 1) + 0.5)
+    # Provinces without a previous fit (e.g. too short last time) start cold
+    beta = start if beta is None else np.where(np.isnan(beta).any(axis=1)[:, None], start, beta)
+    diagonal = np.arange(n_params)[penalized]
+
+    def information(mu):
+        """Penalized Fisher information and the ridge added to its diagonal"""
+        info = (X32.transpose(0, 2, 1) * (mu * weight)[:, None, :].astype(np.float32)) @ X32
+        info = info.astype(np.float64)
+        ridge = PENALTY * info[:, diagonal, diagonal].mean(axis=1)
+        info[:, diagonal, diagonal] += ridge[:, None]
+        return info, ridge
+
+    def deviance(beta):
+        mu = np.exp(np.clip((X @ beta[..., None])[..., 0], -30, 30))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            terms = np.where(y > 0, y * np.log(y / mu), 0.0) - (y - mu)
+        return mu, 2 * (weight * terms).sum(axis=1)
+
+    # Newton steps: the information (the bulk of the work) in float32, the
+    # score in float64, so the solution keeps full precision
+    X32 = X.astype(np.float32)
+    mu, dev = deviance(beta)
+    for iteration in range(1, max_iter + 1):
+        info, ridge = information(mu)
+        score = (X.transpose(0, 2, 1) @ (weight * (y - mu))[..., None])[..., 0]
+        score[:, diagonal] -= ridge[:, None] * beta[:, diagonal]
+        beta = beta + np.linalg.solve(info, score[..., None])[..., 0]
+        mu, new_dev = deviance(beta)
+        # The convergence rule of R's glm: relative change in deviance
+        converged = np.abs(new_dev - dev) / (np.abs(new_dev) + 0.1) < tol
+        dev = new_dev
+        if np.all(converged):
+            break
+
+    # Quasi-Poisson dispersion: Pearson chi-square over residual degrees of freedom
+    dof = np.maximum(weight.sum(axis=1) - n_params, 1)
+    dispersion = (weight * (y - mu) ** 2 / mu).sum(axis=1) / dof
+    cov = np.linalg.inv(information(mu)[0]) * dispersion[:, None, None]
+    return beta, cov, iteration
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+class DlnmFit:
+    """Fitted crossbasis coefficients of every province"""
+
+    def __init__(self, provinces, bases, beta, cov, iterations, version=None):
+        self.provinces = list(provinces)
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.bases = bases
+        self.beta = beta
+        self.cov = cov
+        self.iterations = iterations
+        self.version = version
+        start = CONFOUNDERS
+        self.blocks = {}
+        for name, basis in bases.items():
+            self.blocks[name] = slice(start, start + basis.n_columns)
+            start += basis.n_columns
+
+    @staticmethod
+    def bases_for(features):
+        return {
+            name: CrossBasis.from_values(features.values[:, :, FEATURE_NAMES.index(column)].astype(np.float64))
+            for name, (column, _) in DLNM_VARIABLES.items()
+        }
+
+    @staticmethod
+    def design(features, rows, bases):
+        """(design, cases, mask) of a slice of provinces"""
+        # Weeks past the longest province are spare capacity of the matrix
+        n_weeks = int(features.lengths[rows].max())
+        values = features.values[rows, :n_weeks].astype(np.float64)
+        cases = features.cases[rows, :n_weeks].astype(np.float64)
+        n_prov = len(cases)
+        trend = np.broadcast_to(np.arange(n_weeks) / 52.0, (n_prov, n_weeks))
+        parts = [np.ones((n_prov, n_weeks, 1)), trend[..., None]]
+        parts += [values[:, :, [FEATURE_NAMES.index(c) for c in SEASONAL_COLUMNS]]]
+        parts += [bases[name].matrix(values[:, :, FEATURE_NAMES.index(column)]) for name, (column, _) in DLNM_VARIABLES.items()]
+        X = np.concatenate(parts, axis=2)
+        mask = np.isfinite(X).all(axis=2) & np.isfinite(cases)
+        return X, cases, mask
+
+    @classmethod
+    def fit(cls, features, bases=None, previous=None, chunk=CHUNK_PROVINCES):
+        """Fit every province; ``previous`` (same bases and provinces) warm-starts IRLS"""
+        bases = bases or cls.bases_for(features)
+        warm = previous is not None and previous.provinces == list(features.provinces) and previous.bases is bases
+        penalized = np.repeat([False, True], [CONFOUNDERS, sum(b.n_columns for b in bases.values())])
+        betas, covs, iterations = [], [], 0
+        for start in range(0, len(features.provinces), chunk):
+            rows = slice(start, start + chunk)
+            X, y, mask = cls.design(features, rows, bases)
+            beta, cov, n_iter = fit_poisson(X, y, mask, penalized, previous.beta[rows].copy() if warm else None)
+            betas.append(beta)
+            covs.append(cov)
+            iterations = max(iterations, n_iter)
+        return cls(features.provinces, bases, np.concatenate(betas), np.concatenate(covs), iterations, features.version)
+
+    def fitted(self, province):
+        """False for provinces with too little complete history to fit (their surfaces are NaN)"""
+        return bool(np.isfinite(self.beta[self.index[province], 0]))
+
+    def surface(self, province, variable):
+        """(exposure grid, lags, relative risk (grid x lag)) of one province and variable"""
+        i, block, basis = self.index[province], self.blocks[variable], self.bases[variable]
+        log_rr, _, _ = basis.effects(self.beta[i, block])
+        return basis.grid, np.arange(basis.max_lag + 1), np.exp(log_rr)
+
+    def cumulative(self, province, variable):
+        """Overall relative risk summed over lags, with its 95% interval, across the exposure grid"""
+        i, block, basis = self.index[province], self.blocks[variable], self.bases[variable]
+        _, log_rr, se = basis.effects(self.beta[i, block], self.cov[i, block, block])
+        return pd.DataFrame({
+            'exposure': basis.grid,
+            'rr': np.exp(log_rr),
+            'lower': np.exp(log_rr - 1.96 * se),
+            'upper': np.exp(log_rr + 1.96 * se)
+        })
+
+
+class DlnmStore:
+    """The DLNM fit of the current feature-matrix version, shared by every caller.
+
+    A new version (e.g. the weekly ingest) refits with the knots of the first
+    fit, warm-started from the previous coefficients; a different province
+    set starts over.
+    """
+
+    def __init__(self):
+        self.fit = None
+        self._lock = threading.Lock()
+
+    def get(self, features):
+        with self._lock:
+            if self.fit is None or self.fit.version != features.version:
+                previous = self.fit
+                if previous is not None and previous.provinces != list(features.provinces):
+                    previous = None
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    self.fit = DlnmFit.fit(features, previous.bases if previous else None, previous)
+            return self.fit
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+    from features import FeatureStore
+
+    parser = argparse.ArgumentParser(description='Distributed lag non-linear models of cases on climate')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('fit', help='fit every province and report timing')
+    show = sub.add_parser('show', help='print the cumulative relative risk of one province and variable')
+    show.add_argument('province')
+    show.add_argument('variable', choices=list(DLNM_VARIABLES))
+    args = parser.parse_args()
+
+    features = FeatureStore().get(source_from_env())
+    t0 = time.perf_counter()
+    fit = DlnmStore().get(features)
+    if args.command == 'fit':
+        print(f"{len(fit.provinces)} provinces x {fit.beta.shape[1]} parameters in {time.perf_counter() - t0:.2f}s "
+              f"({fit.iterations} IRLS iterations)")
+    elif not fit.fitted(args.province):
+        print(f"{args.province}: fewer than {MIN_WEEKS} complete weeks, not fitted")
+    else:
+        print(fit.cumulative(args.province, args.variable).round(3).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
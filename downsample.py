@@ -0,0 +1,103 @@
+"""Point budgets for long time series: LTTB downsampling and WebGL traces.
+
+Below the budget figures get every point as regular SVG traces. Above it,
+each series is reduced with largest-triangle-three-buckets (LTTB), which
+keeps peaks and troughs that plain striding would drop, and drawn with
+Scattergl. Charts that downsample re-fetch a zoomed window at full
+resolution from the server instead of zooming into the reduced points.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Points per figure above which series are downsampled and drawn with WebGL
+POINT_BUDGET = int(os.environ.get('DENGUE_POINT_BUDGET', '10000'))
+
+# Fewest points any one series is reduced to
+MIN_POINTS = 64
+
+# ============================================================================
+# LTTB
+# ============================================================================
+
+def lttb_indices(x, Y, n_out):
+    """Indices of the ``n_out`` points LTTB keeps from each row of ``Y`` (series x points).
+
+    All rows share ``x``, so each bucket is one vectorized step over every
+    series. Returns an (S, n_out) int array, or all indices if the series
+    are already short enough.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    n_series, n = Y.shape
+    if n_out >= n or n_out < 3:
+        return np.broadcast_to(np.arange(n), (n_series, n))
+
+    # Interior buckets [edges[i], edges[i + 1]); first and last points are always kept
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Each bucket is scored against the mean of the next one (the last point for the final bucket)
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([np.zeros((n_series, 1)), np.cumsum(Y, axis=1)], axis=1)
+    starts, stops = edges[1:], np.append(edges[2:], n)
+    counts = stops - starts
+    next_x = (cx[stops] - cx[starts]) / counts
+    next_y = (cy[:, stops] - cy[:, starts]) / counts
+
+    rows = np.arange(n_series)
+    keep = np.empty((n_series, n_out), dtype=np.int64)
+    keep[:, 0] = 0
+    keep[:, -1] = n - 1
+    a = np.zeros(n_series, dtype=np.int64)
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], Y[rows, a]
+        area = np.abs((ax - next_x[i])[:, None] * (Y[:, lo:hi] - ay[:, None])
+                      - (ax[:, None] - x[lo:hi]) * (next_y[:, i] - ay)[:, None])
+        a = lo + np.argmax(area, axis=1)
+        keep[:, i + 1] = a
+    return keep
+
+
+def downsample_frame(df, x, y, by, budget=POINT_BUDGET):
+    """Long frame of several series (``by``) cut to ``budget`` points in total.
+
+    Returns (frame, downsampled). Series on a common ``x`` grid are reduced
+    in one batched pass; ragged ones one at a time.
+    """
+    groups = df.groupby(by, observed=True, sort=False)
+    if len(df) <= budget:
+        return df, False
+    n_out = max(MIN_POINTS, budget // max(groups.ngroups, 1))
+
+    wide = df.pivot(index=x, columns=by, values=y)
+    if not wide.isna().any().any():
+        xs = wide.index.to_numpy()
+        keep = lttb_indices(xs.astype(np.int64) if np.issubdtype(xs.dtype, np.datetime64) else xs, wide.to_numpy().T, n_out)
+        parts = [
+            pd.DataFrame({by: name, x: xs[idx], y: wide[name].to_numpy()[idx]})
+            for name, idx in zip(wide.columns, keep)
+        ]
+    else:
+        parts = []
+        for name, group in groups:
+            xs = group[x].to_numpy()
+            idx = lttb_indices(xs.astype(np.int64) if np.issubdtype(xs.dtype, np.datetime64) else xs, group[y].to_numpy(), n_out)[0]
+            parts.append(pd.DataFrame({by: name, x: xs[idx], y: group[y].to_numpy()[idx]}))
+    return pd.concat(parts, ignore_index=True), True
+
+
+def scatter_trace(downsampled, **kwargs):
+    """go.Scatter, or go.Scattergl without per-point markers when the figure is downsampled"""
+    if not downsampled:
+        return go.Scatter(**kwargs)
+    if kwargs.get('mode') == 'lines+markers':
+        kwargs['mode'] = 'lines'
+    return go.Scattergl(**kwargs)
@@ -0,0 +1,209 @@
+"""Endemic channel: week-of-year case quantiles per province over a reference window.
+
+The channel is built in one grouped quantile pass over a (province, year,
+ISO week) grid and stored next to the data (file-backed sources) so every
+process reads the same table. Alert thresholds are multiples of its median.
+
+It is versioned by a fingerprint of the reference-window rows it reads, not
+by the dataset version: a week appended to the current year leaves it as it
+is, and only a year rollover or a rebuilt store builds it again.
+
+Usage:
+    python endemic.py build              # (re)build for the configured source
+    python endemic.py show Bangkok
+"""
+
+import argparse
+import os
+import hashlib
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Complete ISO years before the latest one that form the reference window
+REFERENCE_YEARS = 5
+
+QUANTILES = (0.5, 0.75, 0.9)
+CHANNEL_COLUMNS = ['median', 'q75', 'q90']
+
+WEEKS = 53
+
+# ============================================================================
+# REFERENCE WINDOW
+# ============================================================================
+
+def iso_years(dates):
+    """ISO year of each date: the calendar year of the Thursday of its week"""
+    days = np.asarray(dates, dtype='datetime64[D]')
+    weekday = (days.astype(np.int64) + 3) % 7  # Monday = 0 (1970-01-01 was a Thursday)
+    return ((days - weekday + 3).astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int32)
+
+
+def reference_window(iso_year, reference_years=REFERENCE_YEARS):
+    """Complete ISO years before the latest; a short history uses what it has"""
+    window = np.arange(iso_year.max() - reference_years, iso_year.max())
+    window = window[np.isin(window, iso_year)]
+    return window if len(window) else np.unique(iso_year)
+
+
+def window_fingerprint(provinces, weeks, cases, window):
+    """Hash of the reference-window rows (sorted by province, then week) a channel is built from"""
+    digest = hashlib.sha1(repr((int(window[0]), int(window[-1]))).encode('utf-8'))
+    for values in (np.asarray(provinces).astype(str), np.asarray(weeks, dtype='datetime64[ns]'), np.asarray(cases, dtype=np.float64)):
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def reference_key(features, reference_years=REFERENCE_YEARS):
+    """Fingerprint a channel of ``features``' data would have, from the feature matrix alone"""
+    observed = np.arange(features.weeks.shape[1])[None, :] < features.lengths[:, None]
+    iso_year = iso_years(features.weeks[observed])
+    window = reference_window(iso_year, reference_years)
+    keep = np.isin(iso_year, window)
+    provinces = np.repeat(features.provinces, features.lengths)
+    return window_fingerprint(provinces[keep], features.weeks[observed][keep], features.cases[observed][keep], window)
+
+# ============================================================================
+# CHANNEL
+# ============================================================================
+
+class EndemicChannel:
+    """Per-province (53 ISO weeks x median/q75/q90) case quantiles"""
+
+    def __init__(self, provinces, values, reference_years, version=None):
+        self.provinces = list(provinces)
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.values = values
+        self.reference_years = tuple(reference_years)
+        # Fingerprint of the reference-window rows (window_fingerprint)
+        self.version = version
+
+    @classmethod
+    def build(cls, df, reference_years=REFERENCE_YEARS):
+        """Channel of a (province, epi_week, week_num, cases) table sorted by province and week"""
+        names = list(df['province'].cat.categories)
+        codes = df['province'].cat.codes.to_numpy()
+        present = np.unique(codes)
+        iso_year = iso_years(df['epi_week'].to_numpy())
+        window = reference_window(iso_year, reference_years)
+        keep = np.isin(iso_year, window)
+        version = window_fingerprint(np.asarray(names)[codes[keep]], df['epi_week'].to_numpy()[keep], df['cases'].to_numpy()[keep], window)
+
+        slot = np.full(len(names), -1)
+        slot[present] = np.arange(len(present))
+        grid = np.full((len(present), len(window), WEEKS), np.nan)
+        grid[slot[codes[keep]], iso_year[keep] - window[0], df['week_num'].to_numpy()[keep] - 1] = df['cases'].to_numpy()[keep]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # weeks no reference year reached
+            values = np.nanquantile(grid, QUANTILES, axis=1).transpose(1, 2, 0)
+        # ISO week 53 is rare; fall back to week 52 where no reference year had it
+        values[:, 52] = np.where(np.isnan(values[:, 52]), values[:, 51], values[:, 52])
+        return cls([names[c] for c in present], values.astype(np.float32), (int(window[0]), int(window[-1])), version)
+
+    def lookup(self, province, week_num, column='median'):
+        """Quantile of one province at the given ISO week number(s)"""
+        return self.values[self.index[province], np.asarray(week_num) - 1, CHANNEL_COLUMNS.index(column)]
+
+    def lookup_many(self, provinces, week_nums, column='median'):
+        """One value per (province, ISO week) pair"""
+        slots = np.array([self.index[p] for p in provinces])
+        return self.values[slots, np.asarray(week_nums) - 1, CHANNEL_COLUMNS.index(column)]
+
+    def frame(self):
+        """Long table: province, week_num, median, q75, q90"""
+        n_prov = len(self.provinces)
+        table = pd.DataFrame(self.values.reshape(-1, len(CHANNEL_COLUMNS)), columns=CHANNEL_COLUMNS)
+        table.insert(0, 'week_num', np.tile(np.arange(1, WEEKS + 1, dtype=np.int8), n_prov))
+        table.insert(0, 'province', np.repeat(self.provinces, WEEKS))
+        return table
+
+    def save(self, path):
+        table = pa.Table.from_pandas(self.frame(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            'reference_key': str(self.version),
+            'reference_years': f"{self.reference_years[0]}-{self.reference_years[1]}"
+        })
+        tmp = f"{path}.tmp-{os.getpid()}"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        table = pq.read_table(path)
+        metadata = {k.decode(): v.decode() for k, v in table.schema.metadata.items() if not k.startswith(b'pandas')}
+        df = table.to_pandas()
+        provinces = list(dict.fromkeys(df['province']))
+        values = df[CHANNEL_COLUMNS].to_numpy(dtype=np.float32).reshape(len(provinces), WEEKS, len(CHANNEL_COLUMNS))
+        first, last = metadata['reference_years'].split('-')
+        return cls(provinces, values, (int(first), int(last)), metadata.get('reference_key'))
+
+
+def build_channel(source, key=None):
+    """Channel of a data source, read from its stored copy when that has reference key ``key``"""
+    path = source.sidecar_path('endemic_channel')
+    stored = EndemicChannel.load(path) if path and os.path.exists(path) else None
+    if stored is not None and key is not None and stored.version == key:
+        return stored
+    channel = EndemicChannel.build(source.load(columns=['province', 'epi_week', 'week_num', 'cases']))
+    if path and (stored is None or stored.version != channel.version):
+        channel.save(path)
+    return channel
+
+
+class EndemicStore:
+    """The endemic channel of the current reference window, shared by every caller.
+
+    Each new feature-matrix version only recomputes the reference key from
+    the matrix; the channel is built (or read from beside the data) when
+    that key changes.
+    """
+
+    def __init__(self):
+        self.channel = None
+        self._features_version = None
+        self._lock = threading.Lock()
+
+    def get(self, source, features):
+        with self._lock:
+            if self.channel is None or self._features_version != features.version:
+                key = reference_key(features)
+                if self.channel is None or self.channel.version != key:
+                    self.channel = build_channel(source, key)
+                self._features_version = features.version
+            return self.channel
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+
+    parser = argparse.ArgumentParser(description='Endemic channel (week-of-year quantiles)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='build and store the channel of the configured source')
+    show = sub.add_parser('show', help='print the channel of one province')
+    show.add_argument('province')
+    args = parser.parse_args()
+
+    source = source_from_env()
+    channel = build_channel(source)
+    if args.command == 'build':
+        where = source.sidecar_path('endemic_channel') or 'memory only (synthetic source)'
+        print(f"{len(channel.provinces)} provinces, reference years {channel.reference_years[0]}-{channel.reference_years[1]} -> {where}")
+    else:
+        table = channel.frame()
+        print(table[table['province'] == args.province].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Sample-path forecasts: joint trajectories from bootstrapped hold-out errors.
+
+Every booster's hold-out errors are kept per forecast origin as log1p
+residuals, one column per horizon. A sample path takes the mean forecast of
+every horizon and applies the errors of one resampled origin, so paths keep
+the error correlation across horizons and scale with the province's level
+(Phuket's spread is not Bangkok's). The paths of many provinces are held as
+one float32 (province x horizon x sample) array; quantiles, exceedance
+probabilities and CRPS are read from it without simulating again; the
+first of them sorts a copy of the samples, which every later one reuses.
+
+Usage:
+    python ensemble.py show Bangkok                  # quantiles of every horizon
+    python ensemble.py show Bangkok --above 400      # plus P(cases > 400)
+"""
+
+import argparse
+import os
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from scoring import crps_sorted
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SAMPLES = int(os.environ.get('DENGUE_FORECAST_SAMPLES', 1000))
+
+SEED = 0
+
+# Forecast interval methods: Gaussian from the hold-out RMSE, or quantiles of the sample paths
+INTERVALS = ('gaussian', 'paths')
+
+# Central 95% interval of the sample paths
+INTERVAL_LEVELS = (0.025, 0.975)
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def joint_residuals(residuals):
+    """(origins, horizons) errors from each horizon's hold-out residuals (dict horizon -> array).
+
+    Hold-out pairs are consecutive origins ending ``horizon`` weeks before
+    the last observed week, so aligning the arrays from their ends pairs the
+    errors every horizon made from the same origin.
+    """
+    horizons = sorted(residuals)
+    last = horizons[-1]
+    ends = {h: len(residuals[h]) - (last - h) for h in horizons}
+    n_origins = min(ends.values())
+    return np.stack([residuals[h][ends[h] - n_origins:ends[h]] for h in horizons], axis=1)
+
+
+def origin_counts(residuals):
+    """Hold-out origins of each province in NaN-padded (provinces, origins, horizons) residuals"""
+    return (~np.isnan(residuals[:, :, 0])).sum(axis=1)
+
+
+def bootstrap_paths(provinces, means, residuals, n_samples=SAMPLES, seed=SEED):
+    """(provinces, horizons, samples) float32 sample paths.
+
+    ``means`` is (provinces, horizons); ``residuals`` is (provinces, origins,
+    horizons) log1p errors, NaN-padded after each province's origins. Each
+    province draws from its own seeded stream, so its paths are the same
+    whether it is simulated alone or in a batch. Provinces without any
+    hold-out origin get NaN paths.
+    """
+    means = np.asarray(means, dtype=np.float64)
+    n_horizons = means.shape[1]
+    residuals = residuals[:, :, :n_horizons]
+    counts = origin_counts(residuals)
+    draws = np.stack([
+        np.random.default_rng([seed, zlib.crc32(p.encode('utf-8'))]).integers(0, max(n, 1), n_samples)
+        for p, n in zip(provinces, counts)
+    ])
+    if residuals.shape[1] == 0:
+        return np.full(draws.shape[:1] + (n_horizons, n_samples), np.nan, dtype=np.float32)
+    errors = np.take_along_axis(residuals, draws[:, :, None], axis=1).transpose(0, 2, 1)
+    samples = np.maximum(np.expm1(np.log1p(means)[:, :, None] + errors), 0).astype(np.float32)
+    samples[counts == 0] = np.nan
+    return samples
+
+# ============================================================================
+# SAMPLE PATHS
+# ============================================================================
+
+class SamplePaths:
+    """Mean forecasts and sample paths of many provinces, with the statistics derived from them.
+
+    ``origins`` is each province's number of hold-out origins. The paths
+    only contain that many distinct error trajectories, so probabilities
+    read from them move in steps of about 1 / origins.
+    """
+
+    def __init__(self, provinces, weeks, means, samples, origins=None):
+        self.provinces = list(provinces)
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.weeks = weeks
+        self.means = means
+        self.samples = samples
+        self.origins = origins
+        self._sorted = None
+
+    @property
+    def horizons(self):
+        return np.arange(1, self.samples.shape[1] + 1)
+
+    @property
+    def sorted(self):
+        """Samples sorted per (province, horizon); the paths themselves keep their joint order"""
+        if self._sorted is None:
+            self._sorted = np.sort(self.samples, axis=-1)
+        return self._sorted
+
+    def quantiles(self, levels):
+        """(provinces, horizons, levels) quantiles of the paths (linear interpolation, as np.quantile)"""
+        position = np.asarray(levels, dtype=np.float64) * (self.samples.shape[-1] - 1)
+        below = np.floor(position).astype(np.intp)
+        above = np.minimum(below + 1, self.samples.shape[-1] - 1)
+        x = self.sorted
+        return x[..., below] + (x[..., above] - x[..., below]) * (position - below)
+
+    def exceedance(self, thresholds):
+        """P(cases > threshold) per province and horizon; ``thresholds`` broadcasts to (provinces, horizons)"""
+        thresholds = np.asarray(thresholds, dtype=np.float32)
+        probabilities = (self.samples > thresholds[..., None]).mean(axis=-1)
+        # Provinces without paths have no probability, not zero
+        return np.where(np.isnan(self.samples[..., 0]), np.nan, probabilities)
+
+    def crps(self, observed):
+        """CRPS of every (province, horizon) against observed cases (NaN where not yet observed)"""
+        return crps_sorted(self.sorted, observed)
+
+    def table(self, levels=INTERVAL_LEVELS):
+        """Long forecast table (province x horizon) with the paths' quantiles as the interval"""
+        lower, upper = np.moveaxis(self.quantiles(levels), -1, 0)
+        n_horizons = len(self.horizons)
+        table = pd.DataFrame({
+            'province': np.repeat(self.provinces, n_horizons),
+            'horizon': np.tile(self.horizons, len(self.provinces)),
+            'epi_week': self.weeks.ravel(),
+            'predicted_mean': np.round(self.means, 1).ravel(),
+            'predicted_lower': np.round(lower, 1).ravel(),
+            'predicted_upper': np.round(upper, 1).ravel()
+        })
+        if self.origins is not None:
+            table['origins'] = np.repeat(self.origins, n_horizons)
+        return table
+
+
+class PathStore:
+    """Sample paths of every province for the current feature-matrix version, shared by every caller"""
+
+    def __init__(self):
+        self.paths = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def get(self, features, registry, weeks_ahead):
+        with self._lock:
+            key = (features.version, weeks_ahead)
+            if self._key != key:
+                self.paths = registry.batch(features.provinces, features).sample_paths(features, weeks_ahead)
+                self._key = key
+            return self.paths
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+    from features import FeatureStore
+    from forecasting import HORIZONS, ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Sample-path forecasts from bootstrapped hold-out errors')
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('show', help='print the path quantiles of one province')
+    show.add_argument('province')
+    show.add_argument('--samples', type=int, default=SAMPLES)
+    show.add_argument('--above', type=float, default=None, help='also print P(cases > ABOVE)')
+    args = parser.parse_args()
+
+    features = FeatureStore().get(source_from_env())
+    paths = ModelRegistry().get(args.province, features).sample_paths(features, len(HORIZONS), args.samples)
+    levels = [0.05, 0.25, 0.5, 0.75, 0.95]
+    table = pd.DataFrame(paths.quantiles(levels)[0], index=pd.Index(paths.horizons, name='horizon'),
+                         columns=[f"q{round(q * 100):02d}" for q in levels])
+    table.insert(0, 'mean', paths.means[0])
+    print(f"{args.province}: {paths.origins[0]} hold-out origins")
+    if args.above is not None:
+        table[f'P(>{args.above:g})'] = paths.exceedance(args.above)[0]
+    print(table.round(2).to_string())
+
+
+if __name__ == '__main__':
+    main()
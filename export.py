@@ -0,0 +1,225 @@
+"""Streaming exports of surveillance rows, forecasts and alerts as CSV or Parquet.
+
+Rows come from ``DataSource.scan`` one province at a time, are regrouped
+into batches of EXPORT_BATCH_ROWS and written straight to the output file
+(CSV chunks, or one Parquet row group per batch), optionally gzip or zstd
+compressed. No step holds more than one batch, so memory use does not grow
+with the size of the export. The dashboard writes its exports under
+static/exports/ and links to them through Streamlit's static file serving,
+which streams files from disk.
+
+Usage:
+    python export.py surveillance national.csv.zst --compression zstd
+    python export.py surveillance bangkok.parquet --provinces Bangkok --years 2020 2024
+    python export.py forecasts forecasts.csv --weeks 4
+    python export.py forecasts forecasts.parquet --weeks 8 --intervals paths
+    python export.py alerts alerts.csv.gz --compression gzip
+"""
+
+import argparse
+import gzip
+import os
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from ensemble import INTERVALS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Rows per written chunk / Parquet row group; bounds the memory of an export
+EXPORT_BATCH_ROWS = int(os.environ.get('DENGUE_EXPORT_BATCH_ROWS', '100000'))
+
+# Served by Streamlit as app/static/exports/<name> (server.enableStaticServing)
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'exports')
+
+# Exports older than this, or beyond this total size, are deleted when the next one is
+# written (Streamlit disables static serving at startup if the folder passes 1 GB)
+EXPORT_MAX_AGE = 24 * 3600
+EXPORT_MAX_BYTES = int(float(os.environ.get('DENGUE_EXPORT_MAX_MB', '512')) * 1024 ** 2)
+
+FORMATS = ('csv', 'parquet')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+GZIP_LEVEL = 6
+
+CSV_SUFFIXES = {'none': '.csv', 'gzip': '.csv.gz', 'zstd': '.csv.zst'}
+
+# Parquet compresses inside the file; the codec still goes in the name so each gets its own file
+PARQUET_SUFFIXES = {'none': '.parquet', 'gzip': '.gzip.parquet', 'zstd': '.zstd.parquet'}
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def export_suffix(fmt, compression='none'):
+    """File extension of an export, distinct for every format and compression"""
+    return (PARQUET_SUFFIXES if fmt == 'parquet' else CSV_SUFFIXES)[compression]
+
+
+def rebatch(frames, batch_rows=EXPORT_BATCH_ROWS):
+    """Regroup a stream of DataFrames into Arrow tables of about ``batch_rows`` rows"""
+    pending, n_pending = [], 0
+    for df in frames:
+        if not len(df):
+            continue
+        pending.append(arrow_table(df))
+        n_pending += len(df)
+        if n_pending >= batch_rows:
+            yield pa.concat_tables(pending)
+            pending, n_pending = [], 0
+    if pending:
+        yield pa.concat_tables(pending)
+
+
+def arrow_table(df):
+    """Arrow table of a frame with plain column types, so every batch has the same schema"""
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    for i, field in enumerate(table.schema):
+        # Categories become strings (each batch has its own dictionary) and
+        # timestamps become dates: every date in these tables is a week start
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+        elif pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    return table
+
+
+def write_frames(frames, path, fmt='csv', compression='none', batch_rows=EXPORT_BATCH_ROWS):
+    """Stream DataFrames to one CSV or Parquet file, atomically; returns the number of rows"""
+    if fmt not in FORMATS or compression not in COMPRESSIONS:
+        raise ValueError(f"unsupported export {fmt!r} with compression {compression!r}")
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    writer = sink = schema = None
+    n_rows = 0
+    try:
+        try:
+            for table in rebatch(frames, batch_rows):
+                if writer is None:
+                    schema = table.schema
+                    if fmt == 'parquet':
+                        writer = pq.ParquetWriter(tmp, schema, compression=compression)
+                    else:
+                        if compression == 'gzip':
+                            # Arrow's gzip stream compresses at level 9: twice the time for <1% smaller files
+                            sink = gzip.open(tmp, 'wb', compresslevel=GZIP_LEVEL)
+                        elif compression == 'zstd':
+                            sink = pa.CompressedOutputStream(pa.OSFile(tmp, 'wb'), 'zstd')
+                        else:
+                            sink = pa.OSFile(tmp, 'wb')
+                        writer = pacsv.CSVWriter(sink, schema)
+                writer.write_table(table.cast(schema))
+                n_rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+            if sink is not None:
+                sink.close()
+        if writer is None:
+            raise ValueError("nothing to export")
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return n_rows
+
+
+def export_file(name, frames, fmt='csv', compression='none', directory=EXPORT_DIR):
+    """Path of export ``name``, written from ``frames`` unless a file of that name already exists.
+
+    ``name`` should identify the content (kind, filters, dataset version), so
+    a repeated request reuses the file and ``frames`` is never consumed.
+    """
+    path = os.path.join(directory, name + export_suffix(fmt, compression))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        write_frames(frames, path, fmt, compression)
+        prune_exports(directory, keep=path)
+    return path
+
+
+def prune_exports(directory=EXPORT_DIR, max_age=EXPORT_MAX_AGE, max_bytes=EXPORT_MAX_BYTES, keep=None):
+    """Delete exports (and abandoned partial files) older than ``max_age`` seconds,
+    then the oldest ones until the rest fit in ``max_bytes``"""
+    entries = sorted((e for e in os.scandir(directory) if e.is_file()), key=lambda e: e.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age
+    total = 0
+    for entry in entries:
+        total += entry.stat().st_size
+        if entry.path != keep and (entry.stat().st_mtime < cutoff or total > max_bytes):
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+# ============================================================================
+# EXPORTS
+# ============================================================================
+
+def surveillance_frames(source, provinces=None, years=None, columns=None):
+    """Surveillance rows, one province at a time"""
+    return source.scan(provinces, years, columns)
+
+
+def forecast_frames(features, registry, weeks_ahead, provinces=None, chunk=500, intervals='gaussian'):
+    """Forecast tables (province x horizon) for ``chunk`` provinces at a time"""
+    provinces = features.provinces if provinces is None else list(provinces)
+    for i in range(0, len(provinces), chunk):
+        yield registry.batch(provinces[i:i + chunk], features).forecast(features, weeks_ahead, intervals)
+
+
+def alert_frames(alerts):
+    """An alert table (as from ``evaluate_alerts`` or ``read_alerts``) with level names"""
+    from alerts import alert_categories
+
+    alerts = alerts.reset_index() if 'province' not in alerts else alerts
+    yield alerts.assign(level=alert_categories(alerts['level'].to_numpy(dtype=np.int8)))
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+
+    parser = argparse.ArgumentParser(description='Stream surveillance data, forecasts or alerts to CSV/Parquet')
+    parser.add_argument('kind', choices=['surveillance', 'forecasts', 'alerts'])
+    parser.add_argument('output')
+    parser.add_argument('--format', choices=FORMATS, default=None, help='default: from the output extension')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='none')
+    parser.add_argument('--provinces', nargs='+', default=None)
+    parser.add_argument('--years', nargs=2, type=int, default=None, metavar=('FIRST', 'LAST'))
+    parser.add_argument('--weeks', type=int, default=4, help='forecast horizon in weeks')
+    parser.add_argument('--intervals', choices=INTERVALS, default='gaussian', help='forecast interval method')
+    parser.add_argument('--batch-rows', type=int, default=EXPORT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    fmt = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+    source = source_from_env()
+    t0 = time.perf_counter()
+    if args.kind == 'surveillance':
+        frames = surveillance_frames(source, args.provinces, args.years)
+    elif args.kind == 'forecasts':
+        from features import FeatureStore
+        from forecasting import ModelRegistry
+        frames = forecast_frames(FeatureStore().get(source), ModelRegistry(), args.weeks, args.provinces,
+                                 intervals=args.intervals)
+    else:
+        from alerts import ALERTS_PATH, read_alerts
+        alerts, _ = read_alerts(ALERTS_PATH)
+        frames = alert_frames(alerts if args.provinces is None else alerts.loc[args.provinces])
+    n_rows = write_frames(frames, args.output, fmt, args.compression, args.batch_rows)
+    size = os.path.getsize(args.output) / 1024 ** 2
+    print(f"Wrote {n_rows:,} rows ({size:.1f} MB) to {args.output} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
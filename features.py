@@ -0,0 +1,250 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ============================================================================
+# FEATURE DEFINITIONS
+# ============================================================================
+
+# Longest look-back of any feature (cases lag 8)
+WINDOW = 8
+
+CASE_LAGS = range(1, WINDOW + 1)
+
+FEATURE_NAMES = (
+    [f'cases_lag_{lag}' for lag in CASE_LAGS]
+    + ['cases_mean_4w', 'cases_mean_8w', 'cases_std_8w',
+       'temp_mean', 'temp_mean_4w', 'humidity', 'humidity_4w',
+       'rainfall_1w', 'rainfall_2w', 'rainfall_4w',
+       'season_sin_1', 'season_cos_1', 'season_sin_2', 'season_cos_2']
+)
+
+# Raw columns the features are computed from
+RAW_COLUMNS = ['cases', 'temp_mean', 'humidity', 'rainfall', 'week_num']
+
+
+def _windows(values, size):
+    """Trailing windows of ``size`` weeks that end at each output week"""
+    return sliding_window_view(values, size, axis=-1)[:, WINDOW - size:]
+
+
+def window_features(raw):
+    """Feature tensor (provinces, weeks, features) from raw (provinces, WINDOW - 1 + weeks) arrays.
+
+    Output week j ends at raw position j + WINDOW - 1 and only looks back,
+    so ``cases_lag_1`` is the week itself and row t is the input for
+    predicting week t + h. Missing history (NaN) makes a row incomplete.
+    """
+    cases = _windows(raw['cases'], WINDOW)
+    temp = _windows(raw['temp_mean'], 4)
+    humidity = _windows(raw['humidity'], 4)
+    rain = _windows(raw['rainfall'], 4)
+    angle = 2 * np.pi * raw['week_num'][:, WINDOW - 1:] / 52
+
+    with np.errstate(invalid='ignore'):
+        columns = (
+            [cases[..., -lag] for lag in CASE_LAGS]
+            + [cases[..., -4:].mean(axis=-1), cases.mean(axis=-1), cases.std(axis=-1, ddof=1),
+               temp[..., -1], temp.mean(axis=-1), humidity[..., -1], humidity.mean(axis=-1),
+               rain[..., -1], rain[..., -2:].sum(axis=-1), rain.sum(axis=-1),
+               np.sin(angle), np.cos(angle), np.sin(2 * angle), np.cos(2 * angle)]
+        )
+    return np.stack(columns, axis=-1).astype(np.float32)
+
+# ============================================================================
+# FEATURE MATRIX
+# ============================================================================
+
+class FeatureMatrix:
+    """Features for every (province, week), stored as a padded (provinces, weeks, features) array.
+
+    Built in one pass over the whole table; ``append`` adds new epi-weeks
+    using only the last WINDOW - 1 raw weeks of each province, so history is
+    never recomputed.
+    """
+
+    def __init__(self, df, version=None):
+        names = list(df['province'].cat.categories)
+        codes = df['province'].cat.codes.to_numpy()
+        present = np.unique(codes)
+        self.provinces = [names[c] for c in present]
+        self.index = {p: i for i, p in enumerate(self.provinces)}
+        self.version = version
+        # Version of the bulk build; appends change ``version`` but not this
+        self.base_version = version
+
+        # Position of every row within its province (rows are sorted by province, week)
+        slot = np.full(len(names), -1)
+        slot[present] = np.arange(len(present))
+        rows = slot[codes]
+        self.lengths = np.bincount(rows, minlength=len(present))
+        starts = np.r_[0, np.cumsum(self.lengths)[:-1]]
+        offsets = np.arange(len(df)) - starts[rows]
+
+        n_prov, n_weeks = len(present), int(self.lengths.max()) if len(df) else 0
+        raw = {}
+        for column in RAW_COLUMNS:
+            # WINDOW - 1 leading NaN weeks give the first rows a full (incomplete) window
+            padded = np.full((n_prov, WINDOW - 1 + n_weeks), np.nan)
+            padded[rows, WINDOW - 1 + offsets] = df[column].to_numpy(dtype=np.float64)
+            raw[column] = padded
+
+        self.values = window_features(raw)
+        self.cases = raw['cases'][:, WINDOW - 1:].astype(np.float32)
+        self.weeks = np.full((n_prov, n_weeks), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.weeks[rows, offsets] = df['epi_week'].to_numpy(dtype='datetime64[ns]')
+
+        self.base_lengths = self.lengths.copy()
+
+        # Raw history each province needs for its next feature row
+        self._tail = {c: self._last_raw(raw[c][:, WINDOW - 1:]) for c in RAW_COLUMNS}
+
+    def _last_raw(self, values):
+        """Last WINDOW - 1 weeks of each province's raw series (NaN-padded on the left)"""
+        padded = np.concatenate([np.full((len(values), WINDOW - 1), np.nan), values], axis=1)
+        cols = self.lengths[:, None] + np.arange(WINDOW - 1)[None, :]
+        return np.take_along_axis(padded, cols, axis=1)
+
+    def _reserve(self, n_weeks):
+        """Grow the week axis (doubling) so ``n_weeks`` fit without reallocating every week"""
+        capacity = self.values.shape[1]
+        if n_weeks <= capacity:
+            return
+        new_capacity = max(n_weeks, 2 * capacity)
+        grow = new_capacity - capacity
+        self.values = np.concatenate([self.values, np.full((len(self.provinces), grow, len(FEATURE_NAMES)), np.nan, dtype=np.float32)], axis=1)
+        self.cases = np.concatenate([self.cases, np.full((len(self.provinces), grow), np.nan, dtype=np.float32)], axis=1)
+        self.weeks = np.concatenate([self.weeks, np.full((len(self.provinces), grow), np.datetime64('NaT'), dtype='datetime64[ns]')], axis=1)
+
+    def append(self, new_rows, version=None):
+        """Add the next epi-week(s) for some provinces from their raw rows.
+
+        Provinces receiving the same number of weeks are computed together in
+        one window pass over their stored tails.
+        """
+        if not len(new_rows):
+            return
+        slots = np.array([self.index[p] for p in new_rows['province'].astype(str)])
+        order = np.lexsort((new_rows['epi_week'].to_numpy(), slots))
+        rows, slots = new_rows.iloc[order], slots[order]
+        provinces, first, counts = np.unique(slots, return_index=True, return_counts=True)
+
+        # Every province's new weeks must directly follow its last stored week
+        weeks = rows['epi_week'].to_numpy(dtype='datetime64[ns]')
+        expected = self.weeks[provinces, self.lengths[provinces] - 1] + np.timedelta64(7, 'D')
+        if np.any(weeks[first] != expected) or np.any(np.diff(weeks)[np.diff(slots) == 0] != np.timedelta64(7, 'D')):
+            raise ValueError("appended rows must continue each province's weekly series without gaps")
+        self._reserve(int((self.lengths[provinces] + counts).max()))
+
+        for k in np.unique(counts):
+            group = provinces[counts == k]
+            # Rows of these provinces, k consecutive weeks each
+            take = (first[counts == k][:, None] + np.arange(k)[None, :]).ravel()
+            raw = {
+                c: np.concatenate([self._tail[c][group], rows[c].to_numpy(dtype=np.float64)[take].reshape(-1, k)], axis=1)
+                for c in RAW_COLUMNS
+            }
+            cols = self.lengths[group][:, None] + np.arange(k)[None, :]
+            self.values[group[:, None], cols] = window_features(raw)
+            self.cases[group[:, None], cols] = raw['cases'][:, WINDOW - 1:]
+            self.weeks[group[:, None], cols] = rows['epi_week'].to_numpy(dtype='datetime64[ns]')[take].reshape(-1, k)
+            self.lengths[group] += k
+            for c in RAW_COLUMNS:
+                self._tail[c][group] = raw[c][:, -(WINDOW - 1):]
+        if version is not None:
+            self.version = version
+
+    def latest_row(self, province):
+        """Feature row of the province's last observed week, shape (1, n_features)"""
+        i = self.index[province]
+        return self.values[i, self.lengths[i] - 1][None, :]
+
+    def latest_rows(self, provinces):
+        """Latest feature row of each of ``provinces``, shape (len(provinces), n_features)"""
+        slots = np.array([self.index[p] for p in provinces])
+        return self.values[slots, self.lengths[slots] - 1]
+
+    def last_weeks(self, provinces):
+        slots = np.array([self.index[p] for p in provinces])
+        return self.weeks[slots, self.lengths[slots] - 1]
+
+    def province_version(self, province):
+        """Cache key of one province's rows: changes only when that province gets new weeks"""
+        return (self.base_version, province, int(self.lengths[self.index[province]]))
+
+    def last_week(self, province):
+        i = self.index[province]
+        return pd.Timestamp(self.weeks[i, self.lengths[i] - 1])
+
+    def history_fingerprint(self, province, n_weeks):
+        """Hash of a province's first ``n_weeks`` weeks and cases; None if it has fewer weeks.
+
+        Appending later weeks leaves it unchanged, so artifacts trained on a
+        prefix of the current series can be told from ones trained on other data.
+        """
+        i = self.index.get(province)
+        if i is None or n_weeks > self.lengths[i]:
+            return None
+        digest = hashlib.sha1(self.weeks[i, :n_weeks].tobytes())
+        digest.update(self.cases[i, :n_weeks].tobytes())
+        return digest.hexdigest()[:16]
+
+    def series(self, province, base=False):
+        """(features, cases) of one province's observed weeks, or only those of the bulk build"""
+        i = self.index[province]
+        n = int(self.base_lengths[i] if base else self.lengths[i])
+        return self.values[i, :n], self.cases[i, :n]
+
+    def training_matrix(self, province, horizon, end=None):
+        """(X, y): complete feature rows whose target week is before ``end``"""
+        return supervised_pairs(*self.series(province), horizon, end)
+
+    def frame(self, province):
+        """Features of one province as a DataFrame indexed by epi_week"""
+        i = self.index[province]
+        n = int(self.lengths[i])
+        return pd.DataFrame(self.values[i, :n], index=pd.DatetimeIndex(self.weeks[i, :n], name='epi_week'), columns=FEATURE_NAMES)
+
+
+def supervised_pairs(values, cases, horizon, end=None, start=0):
+    """Complete feature rows paired with the cases ``horizon`` weeks later, for target weeks in [start, end)"""
+    end = len(cases) if end is None else end
+    first = max(start - horizon, 0)
+    X = values[first:end - horizon]
+    y = cases[first + horizon:end]
+    complete = ~np.isnan(X).any(axis=1)
+    return X[complete], y[complete]
+
+
+class FeatureStore:
+    """The FeatureMatrix of the current dataset version, shared by every caller.
+
+    A new version normally means a rebuild; ``append`` instead extends the
+    matrix in place and moves it to the version the source reached.
+    """
+
+    def __init__(self):
+        self.matrix = None
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        with self._lock:
+            if self.matrix is None or self.matrix.version != source.version:
+                df = source.load(columns=['province', 'epi_week'] + RAW_COLUMNS)
+                self.matrix = FeatureMatrix(df, source.version)
+            return self.matrix
+
+    def append(self, rows, version):
+        """Extend the matrix with newly arrived weeks; False (and a rebuild on next get) if they do not fit"""
+        with self._lock:
+            if self.matrix is None:
+                return False
+            try:
+                self.matrix.append(rows, version)
+            except (KeyError, ValueError):
+                self.matrix = None
+                return False
+            return True
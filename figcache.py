@@ -0,0 +1,80 @@
+"""Server-side LRU cache of built Plotly figures with a memory cap.
+
+Building a figure (trace validation, layout merging) costs far more than
+serializing it, and most sessions look at the same few provinces and year
+ranges. Figures are cached by the inputs they depend on and evicted least
+recently used first once their serialized size passes the cap. Cached
+figures are shared between sessions and must not be modified.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from perf import cache_stats
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+FIGURE_CACHE_MB = float(os.environ.get('DENGUE_FIGURE_CACHE_MB', '64'))
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class FigureCache:
+    """Figures keyed by (figure name, *inputs), bounded by their total serialized size"""
+
+    def __init__(self, max_bytes=int(FIGURE_CACHE_MB * 1024 * 1024), name='figures'):
+        self.max_bytes = max_bytes
+        self.stats = cache_stats(name)
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """The cached figure of ``key``, built with ``build()`` on a miss"""
+        t0 = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            self.stats.record(hit=True, key_seconds=time.perf_counter() - t0)
+            return entry[0]
+
+        lookup = time.perf_counter() - t0
+        figure = build()
+        # The JSON size is what the figure costs to keep and to send
+        n_bytes = len(pio.to_json(figure, validate=False))
+        with self._lock:
+            if key not in self._entries and n_bytes <= self.max_bytes:
+                self._entries[key] = (figure, n_bytes)
+                self.bytes += n_bytes
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+                    self.evictions += 1
+        self.stats.record(hit=False, key_seconds=lookup)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        return {
+            'Figures': len(self),
+            'Size (MB)': f"{self.bytes / 1024 ** 2:.2f}",
+            'Cap (MB)': f"{self.max_bytes / 1024 ** 2:.0f}",
+            'Evictions': self.evictions
+        }
@@ -0,0 +1,409 @@
+"""XGBoost forecasting engine: training, persisted boosters and warm inference.
+
+One booster per (province, horizon) predicts cases h weeks after the last
+observed week (direct multi-horizon strategy). Boosters are written to
+DENGUE_MODEL_DIR and loaded once per process by ModelRegistry.
+
+Usage:
+    python forecasting.py train                # every province of the configured source
+    python forecasting.py train --force        # retrain even if artifacts match the data
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from ensemble import INTERVAL_LEVELS, SAMPLES, SamplePaths, bootstrap_paths, joint_residuals, origin_counts
+from features import FEATURE_NAMES, FeatureStore
+from scoring import crps_gaussian
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+HORIZONS = list(range(1, 9))
+
+# Booster hyperparameters; the artifact directory is keyed on a hash of these
+MODEL_CONFIG = {
+    'objective': 'reg:squarederror',
+    'max_depth': 3,
+    'eta': 0.08,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 2,
+    'num_boost_round': 120,
+    'seed': 0,
+    'nthread': 1
+}
+
+# Temporal split used to estimate the per-horizon error scale
+HOLDOUT_FRACTION = 0.2
+
+MODEL_DIR = os.environ.get('DENGUE_MODEL_DIR', 'models')
+
+# Province lists whose stacked ForecastBatch is kept (e.g. all provinces, the comparison picks)
+BATCH_CACHE_SIZE = 4
+
+# ============================================================================
+# TRAINING
+# ============================================================================
+
+def fit_booster(X, y, config=MODEL_CONFIG):
+    params = {k: v for k, v in config.items() if k != 'num_boost_round'}
+    return xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=config['num_boost_round'])
+
+
+def fit_horizon(X, y, config=MODEL_CONFIG):
+    """Booster for one horizon plus its hold-out error scale, CRPS and log1p residuals.
+
+    The error scale comes from a temporal 80/20 split; the returned booster
+    is then refit on all rows.
+    """
+    split = int(len(y) * (1 - HOLDOUT_FRACTION))
+    holdout = fit_booster(X[:split], y[:split], config)
+    pred = holdout.inplace_predict(X[split:])
+    sigma = max(float(np.sqrt(np.mean((y[split:] - pred) ** 2))), 1.0)
+    crps = float(np.mean(crps_gaussian(pred, sigma, y[split:])))
+    residuals = np.log1p(y[split:]) - np.log1p(np.maximum(pred, 0))
+    return fit_booster(X, y, config), sigma, crps, residuals
+
+
+def train_province(features, province, horizons=HORIZONS, config=MODEL_CONFIG):
+    """Boosters, hold-out error scale and CRPS per horizon, and the joint (origin x horizon) residuals"""
+    boosters, sigma, crps, residuals = {}, {}, {}, {}
+    for h in horizons:
+        boosters[h], sigma[h], crps[h], residuals[h] = fit_horizon(*features.training_matrix(province, h), config)
+    return boosters, sigma, crps, joint_residuals(residuals)
+
+# ============================================================================
+# COMPILED FORESTS
+# ============================================================================
+
+class CompiledForest:
+    """Boosted trees as dense heap-layout arrays, evaluated with NumPy gathers.
+
+    Arrays are shaped (..., trees, nodes): one leading axis per horizon, plus
+    one per province once stacked. Every tree is padded to a complete tree of
+    ``depth`` levels; a leaf above the last level becomes an always-left split
+    whose subtree leaves all carry its value.
+    """
+
+    def __init__(self, feature, threshold, default_left, leaves, base_score):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.leaves = leaves
+        self.base_score = base_score
+
+    @classmethod
+    def from_booster(cls, booster, depth):
+        model = json.loads(booster.save_raw('json'))
+        trees = model['learner']['gradient_booster']['model']['trees']
+        base_score = float(model['learner']['learner_model_param']['base_score'].strip('[]'))
+        inner = 2 ** depth - 1
+        feature = np.zeros((len(trees), inner), dtype=np.int16)
+        threshold = np.full((len(trees), inner), np.inf, dtype=np.float32)
+        default_left = np.ones((len(trees), inner), dtype=bool)
+        leaves = np.zeros((len(trees), inner + 1), dtype=np.float32)
+        for t, tree in enumerate(trees):
+            stack = [(0, 0)]  # (tree node, heap position)
+            while stack:
+                node, pos = stack.pop()
+                left = tree['left_children'][node]
+                if pos >= inner:
+                    if left != -1:
+                        raise ValueError(f"tree {t} is deeper than max_depth={depth}")
+                    leaves[t, pos - inner] = tree['split_conditions'][node]
+                elif left == -1:
+                    stack += [(node, 2 * pos + 1), (node, 2 * pos + 2)]
+                else:
+                    feature[t, pos] = tree['split_indices'][node]
+                    threshold[t, pos] = tree['split_conditions'][node]
+                    default_left[t, pos] = bool(tree['default_left'][node])
+                    stack += [(left, 2 * pos + 1), (tree['right_children'][node], 2 * pos + 2)]
+        return cls(feature, threshold, default_left, leaves, np.float32(base_score))
+
+    @classmethod
+    def stack(cls, forests):
+        """One forest with a new leading axis over ``forests`` (which must share their shapes)"""
+        return cls(*(np.stack([getattr(f, name) for f in forests])
+                     for name in ('feature', 'threshold', 'default_left', 'leaves', 'base_score')))
+
+    def predict(self, X, n_outputs=None):
+        """Raw outputs (batch, outputs) for a forest shaped (batch, outputs, trees, nodes) and X (batch, n_features).
+
+        All trees of all rows descend one level per step, so the cost is
+        ``depth`` gathers regardless of how many provinces or horizons there are.
+        """
+        _, all_outputs, t, inner = self.feature.shape
+        n_outputs = n_outputs or all_outputs
+        n = len(X)
+        # Flat offset of every (row, output, tree) into the contiguous node and leaf arrays
+        tree = ((np.arange(n)[:, None, None] * all_outputs + np.arange(n_outputs)[None, :, None]) * t
+                + np.arange(t)[None, None, :])
+        features, thresholds = self.feature.reshape(-1), self.threshold.reshape(-1)
+        default_left = self.default_left.reshape(-1)
+        x_offset = (np.arange(n) * X.shape[1])[:, None, None]
+        X = np.ascontiguousarray(X).reshape(-1)
+
+        node = np.zeros(tree.shape, dtype=np.intp)
+        inner_offset = tree * inner
+        for _ in range(int(np.log2(inner + 1))):
+            at = inner_offset + node
+            x = X[x_offset + features[at]]
+            go_left = np.where(np.isnan(x), default_left[at], x < thresholds[at])
+            node = 2 * node + 2 - go_left
+        leaf = self.leaves.reshape(-1)[tree * (inner + 1) + node - inner]
+        return leaf.sum(axis=-1, dtype=np.float64) + self.base_score[:, :n_outputs]
+
+# ============================================================================
+# ARTIFACTS AND REGISTRY
+# ============================================================================
+
+def config_key(config=MODEL_CONFIG):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def province_slug(province):
+    return re.sub(r'[^a-z0-9]+', '-', province.lower()).strip('-')
+
+
+class ForecastModel:
+    """Resident boosters for one province, one per horizon, plus their compiled forest"""
+
+    def __init__(self, province, boosters, meta):
+        self.province = province
+        self.boosters = boosters
+        self.meta = meta
+        self.horizons = sorted(boosters)
+        self.sigma = {int(h): s for h, s in meta['sigma'].items()}
+        self.crps = {int(h): c for h, c in meta['crps'].items()}
+        # Artifacts trained before sample paths have no residuals (ModelRegistry retrains them)
+        self.residuals = np.asarray(meta['residuals'], dtype=np.float32) if 'residuals' in meta else None
+        depth = meta['config']['max_depth']
+        self.forest = CompiledForest.stack([CompiledForest.from_booster(boosters[h], depth) for h in self.horizons])
+
+    def predict(self, feature_row, weeks_ahead):
+        """Mean forecast for horizons 1..weeks_ahead from one precomputed feature row"""
+        forest = CompiledForest.stack([self.forest])
+        return np.maximum(0.0, forest.predict(feature_row, weeks_ahead)[0])
+
+    def sample_paths(self, features, weeks_ahead, n_samples=SAMPLES):
+        """SamplePaths of this province for horizons 1..weeks_ahead"""
+        means = self.predict(features.latest_row(self.province), weeks_ahead)
+        weeks = features.last_weeks([self.province])[:, None] + np.arange(1, weeks_ahead + 1) * np.timedelta64(7, 'D')
+        samples = bootstrap_paths([self.province], means[None, :], self.residuals[None], n_samples)
+        return SamplePaths([self.province], weeks, means[None, :], samples, origin_counts(self.residuals[None]))
+
+    def forecast(self, features, weeks_ahead, intervals='gaussian'):
+        """Forecast table (mean, 95% interval, hold-out CRPS) for the weeks after the last observed one"""
+        means = self.predict(features.latest_row(self.province), weeks_ahead)
+        if intervals == 'paths':
+            lower, upper = self.sample_paths(features, weeks_ahead).quantiles(INTERVAL_LEVELS)[0].T
+        else:
+            sigma = np.array([self.sigma[h] for h in range(1, weeks_ahead + 1)])
+            lower, upper = np.maximum(0, means - 1.96 * sigma), means + 1.96 * sigma
+        last_date = features.last_week(self.province)
+        return pd.DataFrame({
+            'epi_week': pd.date_range(start=last_date + timedelta(weeks=1), periods=weeks_ahead, freq='W-MON'),
+            'predicted_mean': np.round(means, 1),
+            'predicted_lower': np.round(lower, 1),
+            'predicted_upper': np.round(upper, 1),
+            'crps': [round(self.crps[h], 2) for h in range(1, weeks_ahead + 1)]
+        })
+
+
+class ForecastBatch:
+    """Compiled forests of many provinces stacked for one vectorized evaluation"""
+
+    def __init__(self, models):
+        self.provinces = [m.province for m in models]
+        self.forest = CompiledForest.stack([m.forest for m in models])
+        self.sigma = np.array([[m.sigma[h] for h in m.horizons] for m in models])
+        self.crps = np.array([[m.crps[h] for h in m.horizons] for m in models])
+        # Residuals of every province, NaN-padded to the longest hold-out
+        n_origins = max(len(m.residuals) for m in models)
+        self.residuals = np.full((len(models), n_origins, len(models[0].horizons)), np.nan, dtype=np.float32)
+        for i, m in enumerate(models):
+            self.residuals[i, :len(m.residuals)] = m.residuals
+
+    def predict(self, X, weeks_ahead):
+        """Mean forecasts (provinces, weeks_ahead) from one feature row per province"""
+        return np.maximum(0.0, self.forest.predict(X, weeks_ahead))
+
+    def sample_paths(self, features, weeks_ahead, n_samples=SAMPLES):
+        """SamplePaths of every province for horizons 1..weeks_ahead, simulated in one pass"""
+        means = self.predict(features.latest_rows(self.provinces), weeks_ahead)
+        weeks = features.last_weeks(self.provinces)[:, None] + np.arange(1, weeks_ahead + 1) * np.timedelta64(7, 'D')
+        samples = bootstrap_paths(self.provinces, means, self.residuals, n_samples)
+        return SamplePaths(self.provinces, weeks, means, samples, origin_counts(self.residuals))
+
+    def forecast(self, features, weeks_ahead, intervals='gaussian'):
+        """Long forecast table (province x horizon) for the weeks after each province's last observation"""
+        if intervals == 'paths':
+            table = self.sample_paths(features, weeks_ahead).table()
+            table['crps'] = np.round(self.crps[:, :weeks_ahead], 2).ravel()
+            return table
+        means = self.predict(features.latest_rows(self.provinces), weeks_ahead)
+        sigma = self.sigma[:, :weeks_ahead]
+        steps = np.arange(1, weeks_ahead + 1)
+        weeks = features.last_weeks(self.provinces)[:, None] + steps * np.timedelta64(7, 'D')
+        return pd.DataFrame({
+            'province': np.repeat(self.provinces, weeks_ahead),
+            'horizon': np.tile(steps, len(self.provinces)),
+            'epi_week': weeks.ravel(),
+            'predicted_mean': np.round(means, 1).ravel(),
+            'predicted_lower': np.round(np.maximum(0, means - 1.96 * sigma), 1).ravel(),
+            'predicted_upper': np.round(means + 1.96 * sigma, 1).ravel(),
+            'crps': np.round(self.crps[:, :weeks_ahead], 2).ravel()
+        })
+
+
+class ModelRegistry:
+    """Loads each province's boosters from disk once and keeps them resident.
+
+    Provinces without artifacts are trained on first use and saved, so only
+    the first process to need a province pays for training. Artifacts are
+    only reused for the data they were trained on: their recorded history
+    fingerprint must match the same weeks of the current features (later
+    appended weeks are fine), otherwise the province is retrained.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, config=MODEL_CONFIG):
+        self.config = config
+        self.root = os.path.join(model_dir, config_key(config))
+        self._models = {}
+        # Province -> base_version of the features its resident model was checked against
+        self._checked = {}
+        self._batches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, province):
+        return os.path.join(self.root, province_slug(province))
+
+    def is_current(self, province, features):
+        """True if the province's artifacts exist and were trained on the current data"""
+        try:
+            with open(os.path.join(self.path(province), 'meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return False
+        # Artifacts trained before sample paths or history fingerprints are retrained
+        if 'residuals' not in meta or 'history' not in meta:
+            return False
+        return features.history_fingerprint(province, meta['trained_weeks']) == meta['history']
+
+    def get(self, province, features):
+        with self._lock:
+            if self._checked.get(province) != features.base_version:
+                if not self.is_current(province, features):
+                    self.train(province, features)
+                self._models[province] = self.load(province)
+                self._checked[province] = features.base_version
+            return self._models[province]
+
+    def batch(self, provinces, features):
+        """ForecastBatch over ``provinces``; the last few stacks are kept for reuse.
+
+        Keyed on the feature matrix's base version, which is when resident
+        models are re-checked against the data; appended weeks reuse the stack.
+        """
+        key = (tuple(provinces), features.base_version)
+        with self._lock:
+            if key in self._batches:
+                self._batches.move_to_end(key)
+                return self._batches[key]
+        batch = ForecastBatch([self.get(p, features) for p in provinces])
+        with self._lock:
+            self._batches[key] = batch
+            self._batches.move_to_end(key)
+            while len(self._batches) > BATCH_CACHE_SIZE:
+                self._batches.popitem(last=False)
+        return batch
+
+    def load(self, province):
+        directory = self.path(province)
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        boosters = {}
+        for h in meta['horizons']:
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(directory, f'h{h}.ubj'))
+            booster.set_param({'nthread': 1})
+            boosters[h] = booster
+        return ForecastModel(province, boosters, meta)
+
+    def train(self, province, features, horizons=HORIZONS):
+        """Train and atomically publish one province's artifacts"""
+        n_weeks = features.lengths[features.index[province]]
+        boosters, sigma, crps, residuals = train_province(features, province, horizons, self.config)
+        meta = {
+            'province': province,
+            'horizons': list(horizons),
+            'features': FEATURE_NAMES,
+            'config': self.config,
+            'trained_through': str(features.last_week(province).date()),
+            'trained_weeks': int(n_weeks),
+            'history': features.history_fingerprint(province, n_weeks),
+            'sigma': sigma,
+            'crps': crps,
+            'residuals': np.round(residuals, 4).tolist()
+        }
+
+        # Write into a private directory, then rename it into place
+        final = self.path(province)
+        tmp = f"{final}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp, exist_ok=True)
+        for h, booster in boosters.items():
+            booster.save_model(os.path.join(tmp, f'h{h}.ubj'))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        try:
+            os.replace(tmp, final)
+        except OSError:
+            # Another process published the same province first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._models.pop(province, None)
+        self._checked.pop(province, None)
+        self._batches.clear()
+        return meta
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    from datasource import source_from_env
+
+    parser = argparse.ArgumentParser(description='Train and persist forecasting boosters')
+    sub = parser.add_subparsers(dest='command', required=True)
+    train = sub.add_parser('train', help='train boosters for every province of the configured data source')
+    train.add_argument('--model-dir', default=MODEL_DIR)
+    train.add_argument('--force', action='store_true', help='retrain provinces that already have artifacts')
+    args = parser.parse_args()
+
+    source = source_from_env()
+    features = FeatureStore().get(source)
+    registry = ModelRegistry(args.model_dir)
+    for province in source.provinces():
+        if not args.force and registry.is_current(province, features):
+            continue
+        meta = registry.train(province, features)
+        crps = ', '.join(f"h{h}={c:.1f}" for h, c in meta['crps'].items())
+        print(f"{province}: trained through {meta['trained_through']} (hold-out CRPS {crps})")
+
+
+if __name__ == '__main__':
+    main()
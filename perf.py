@@ -0,0 +1,88 @@
+import threading
+import time
+
+# ============================================================================
+# CACHE INSTRUMENTATION
+# ============================================================================
+
+class CacheStats:
+    """Process-wide hit/miss counters and key-hashing time for one cache"""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.key_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.calls if self.calls else 0.0
+
+    def record(self, hit, key_seconds=0.0):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.key_seconds += key_seconds
+
+    def summary(self):
+        return {
+            'Cache': self.name,
+            'Calls': self.calls,
+            'Hits': self.hits,
+            'Hit rate': f"{self.hit_rate:.0%}",
+            'Key time (ms/call)': f"{self.key_seconds / self.calls * 1000:.3f}" if self.calls else '-'
+        }
+
+
+_STATS = {}
+_STATS_LOCK = threading.Lock()
+
+
+def cache_stats(name):
+    """The shared CacheStats registered under ``name``"""
+    with _STATS_LOCK:
+        if name not in _STATS:
+            _STATS[name] = CacheStats(name)
+        return _STATS[name]
+
+
+def all_cache_stats():
+    return list(_STATS.values())
+
+
+class MissProbe:
+    """Passed into a cached function (as an underscore argument) to detect misses.
+
+    The cached body calls ``start()``/``stop()`` around its work; if it never
+    does, the call was a hit. Whatever time the call took beyond the body's own work
+    is key hashing and cache lookup.
+    """
+
+    def __init__(self):
+        self.missed = False
+        self.compute_seconds = 0.0
+        self._t0 = None
+
+    def start(self):
+        self.missed = True
+        self._t0 = time.perf_counter()
+
+    def stop(self):
+        self.compute_seconds = time.perf_counter() - self._t0
+
+
+def timed_cache_call(stats, fn, *args, **kwargs):
+    """Call a cached ``fn`` that accepts ``_probe`` and record hit/miss and key time on ``stats``"""
+    probe = MissProbe()
+    t0 = time.perf_counter()
+    result = fn(*args, _probe=probe, **kwargs)
+    elapsed = time.perf_counter() - t0
+    stats.record(hit=not probe.missed, key_seconds=elapsed - probe.compute_seconds)
+    return result
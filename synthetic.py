@@ -0,0 +1,184 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# PROVINCE CATALOG
+# ============================================================================
+
+# Provinces with realistic characteristics (the dashboard's default view)
+PROVINCES_INFO = {
+    'Bangkok': {'baseline': 80, 'amplitude': 60, 'trend': 25},
+    'Chiang Mai': {'baseline': 45, 'amplitude': 35, 'trend': 15},
+    'Phuket': {'baseline': 30, 'amplitude': 25, 'trend': 10},
+    'Khon Kaen': {'baseline': 55, 'amplitude': 40, 'trend': 18},
+    'Songkhla': {'baseline': 40, 'amplitude': 30, 'trend': 12}
+}
+
+# All 77 provinces of Thailand (76 provinces + Bangkok)
+THAI_PROVINCES = [
+    'Amnat Charoen', 'Ang Thong', 'Bangkok', 'Bueng Kan', 'Buriram',
+    'Chachoengsao', 'Chai Nat', 'Chaiyaphum', 'Chanthaburi', 'Chiang Mai',
+    'Chiang Rai', 'Chonburi', 'Chumphon', 'Kalasin', 'Kamphaeng Phet',
+    'Kanchanaburi', 'Khon Kaen', 'Krabi', 'Lampang', 'Lamphun',
+    'Loei', 'Lopburi', 'Mae Hong Son', 'Maha Sarakham', 'Mukdahan',
+    'Nakhon Nayok', 'Nakhon Pathom', 'Nakhon Phanom', 'Nakhon Ratchasima', 'Nakhon Sawan',
+    'Nakhon Si Thammarat', 'Nan', 'Narathiwat', 'Nong Bua Lamphu', 'Nong Khai',
+    'Nonthaburi', 'Pathum Thani', 'Pattani', 'Phang Nga', 'Phatthalung',
+    'Phayao', 'Phetchabun', 'Phetchaburi', 'Phichit', 'Phitsanulok',
+    'Phra Nakhon Si Ayutthaya', 'Phrae', 'Phuket', 'Prachinburi', 'Prachuap Khiri Khan',
+    'Ranong', 'Ratchaburi', 'Rayong', 'Roi Et', 'Sa Kaeo',
+    'Sakon Nakhon', 'Samut Prakan', 'Samut Sakhon', 'Samut Songkhram', 'Saraburi',
+    'Satun', 'Sing Buri', 'Sisaket', 'Songkhla', 'Sukhothai',
+    'Suphan Buri', 'Surat Thani', 'Surin', 'Tak', 'Trang',
+    'Trat', 'Ubon Ratchathani', 'Udon Thani', 'Uthai Thani', 'Uttaradit',
+    'Yala', 'Yasothon'
+]
+
+# Bump whenever the generator's output changes, so cached results keyed on it expire
+GENERATOR_VERSION = 1
+
+DEFAULT_START = '2022-01-03'
+DEFAULT_END = '2024-11-11'
+
+
+def province_params(name):
+    """Deterministic baseline/amplitude/trend for a province without curated values"""
+    if name in PROVINCES_INFO:
+        return dict(PROVINCES_INFO[name])
+    h = zlib.crc32(name.encode('utf-8'))
+    baseline = 20 + h % 60
+    return {
+        'baseline': baseline,
+        'amplitude': round(baseline * (0.55 + (h >> 8) % 25 / 100)),
+        'trend': round(baseline * (0.2 + (h >> 16) % 15 / 100))
+    }
+
+
+def province_catalog(n=None):
+    """Parameters for the first ``n`` units: curated provinces, the rest of Thailand, then synthetic units"""
+    names = list(PROVINCES_INFO) + [p for p in THAI_PROVINCES if p not in PROVINCES_INFO]
+    if n is None:
+        n = len(names)
+    names = names[:n] + [f'Unit {i:04d}' for i in range(len(names) + 1, n + 1)]
+    return {name: province_params(name) for name in names}
+
+# ============================================================================
+# SEEDED RANDOM STREAMS
+# ============================================================================
+
+DEFAULT_SEED = 20240101
+
+# Independent stream per (province, variable). The spawn key of a stream is
+# (crc32(province), variable index), i.e. the child that SeedSequence.spawn
+# would hand out, but addressable directly without spawning every sibling.
+STREAMS = ('cases', 'outbreak', 'temp_mean', 'humidity', 'rainfall', 'chikungunya', 'hfmd', 'forecast')
+
+# Counter origin shared by all streams: week k after EPOCH draws from Philox
+# counter k, so any week of any stream can be generated on its own.
+EPOCH = pd.Timestamp('1990-01-01')
+
+# Expected outbreak spikes per week (about 5 over the default ~150 weeks)
+OUTBREAK_RATE = 1 / 30
+
+
+def week_index(dates):
+    """Weeks elapsed since EPOCH for weekly (W-MON) dates"""
+    days = (pd.DatetimeIndex(np.atleast_1d(dates)) - EPOCH).days.to_numpy()
+    if (days < 0).any():
+        raise ValueError(f"synthetic streams start at {EPOCH.date()}")
+    return days // 7
+
+
+def random_stream(seed, province, stream, week=0):
+    """Generator for one province/variable stream, positioned at the given week counter"""
+    seq = np.random.SeedSequence(seed, spawn_key=(zlib.crc32(province.encode('utf-8')), STREAMS.index(stream)))
+    return np.random.Generator(np.random.Philox(key=seq.generate_state(2, np.uint64), counter=week))
+
+
+def weekly_uniforms(seed, provinces, stream, first_week, n_weeks):
+    """Uniforms of shape (provinces, weeks, 4); each Philox counter yields the 4 draws of one week"""
+    out = np.empty((len(provinces), n_weeks, 4))
+    for i, province in enumerate(provinces):
+        random_stream(seed, province, stream, first_week).random(out=out[i])
+    return out
+
+
+def weekly_normals(seed, provinces, stream, first_week, n_weeks):
+    """Standard normals of shape (provinces, weeks) via Box-Muller on each week's uniforms"""
+    u = weekly_uniforms(seed, provinces, stream, first_week, n_weeks)
+    return np.sqrt(-2 * np.log1p(-u[..., 0])) * np.cos(2 * np.pi * u[..., 1])
+
+# ============================================================================
+# COLUMNAR GENERATOR
+# ============================================================================
+
+# Trend ramps up over the reference window and stays flat outside it
+TREND_START = pd.Timestamp(DEFAULT_START)
+TREND_WEEKS = 149
+
+
+def generate_surveillance_data(provinces_info=None, start=DEFAULT_START, end=DEFAULT_END, seed=DEFAULT_SEED):
+    """Generate the weekly surveillance table column-by-column for every province at once.
+
+    Every value is a pure function of (seed, province, variable, week), so any
+    province subset or date slice is bit-identical to the same rows of a full
+    national run and can be generated independently or in parallel.
+    """
+
+    if provinces_info is None:
+        provinces_info = PROVINCES_INFO
+
+    dates = pd.date_range(start=start, end=end, freq='W-MON')
+    names = list(provinces_info)
+    n_prov, n_weeks = len(names), len(dates)
+    first_week = int(week_index(dates[:1])[0]) if n_weeks else 0
+
+    # Per-province parameters as column vectors so they broadcast over weeks
+    baseline = np.array([provinces_info[p]['baseline'] for p in names], dtype=np.float64)[:, None]
+    amplitude = np.array([provinces_info[p]['amplitude'] for p in names], dtype=np.float64)[:, None]
+    trend_total = np.array([provinces_info[p]['trend'] for p in names], dtype=np.float64)[:, None]
+
+    # Calendar columns are computed once for the date grid and tiled per province
+    iso_week = dates.isocalendar().week.to_numpy(dtype=np.int32)
+
+    # Seasonal pattern with noise
+    phase = 2 * np.pi * (iso_week - 1) / 52
+    seasonal = baseline + amplitude * np.sin(phase - np.pi/2)
+
+    # Add trend and realistic noise
+    ramp = np.clip((dates - TREND_START).days.to_numpy() / 7 / TREND_WEEKS, 0, 1)
+    trend = trend_total * ramp
+    noise = weekly_normals(seed, names, 'cases', first_week, n_weeks) * (baseline * 0.2)
+
+    # Occasional outbreak spikes: a spike starting at week w multiplies weeks
+    # w-2..w+2, so draws are padded by two weeks on each side of the slice
+    u = weekly_uniforms(seed, names, 'outbreak', first_week - 2, n_weeks + 4)
+    log_factor = np.where(u[..., 0] < OUTBREAK_RATE, np.log(1.5 + u[..., 1]), 0.0)
+    window = np.cumsum(np.pad(log_factor, ((0, 0), (1, 0))), axis=1)
+    outbreak_factor = np.exp(window[:, 5:] - window[:, :-5])
+
+    cases = np.maximum(0, (seasonal + trend + noise) * outbreak_factor).astype(np.int32)
+
+    # Weather data with realistic patterns
+    temp_mean = 27 + 3 * np.sin(phase) + 1.5 * weekly_normals(seed, names, 'temp_mean', first_week, n_weeks)
+    humidity = 70 + 10 * np.sin(phase + np.pi/4) + 5 * weekly_normals(seed, names, 'humidity', first_week, n_weeks)
+    rainfall = np.maximum(0, 50 + 80 * np.sin(phase) + 30 * weekly_normals(seed, names, 'rainfall', first_week, n_weeks))
+
+    # Control diseases
+    chikungunya = np.maximum(0, seasonal * 0.15 + 5 * weekly_normals(seed, names, 'chikungunya', first_week, n_weeks)).astype(np.int32)
+    hfmd = np.maximum(0, 30 + 20 * np.sin(phase + np.pi/3) + 8 * weekly_normals(seed, names, 'hfmd', first_week, n_weeks)).astype(np.int32)
+
+    return pd.DataFrame({
+        'province': pd.Categorical.from_codes(np.repeat(np.arange(n_prov), n_weeks), categories=names),
+        'epi_week': np.tile(dates.values, n_prov),
+        'year': np.tile(dates.year.to_numpy(dtype=np.int32), n_prov),
+        'week_num': np.tile(iso_week, n_prov),
+        'cases': cases.ravel(),
+        'temp_mean': np.round(temp_mean, 1).astype(np.float32).ravel(),
+        'humidity': np.round(humidity, 1).astype(np.float32).ravel(),
+        'rainfall': np.round(rainfall, 1).astype(np.float32).ravel(),
+        'chikungunya': chikungunya.ravel(),
+        'hfmd': hfmd.ravel()
+    })